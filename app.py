@@ -1,40 +1,61 @@
 import os
 import re
-from flask import Flask, render_template, request, redirect, url_for, session, flash, Response, send_file
+from flask import Flask, render_template, request, redirect, url_for, session, flash, Response, send_file, jsonify, abort, stream_with_context, g, request_finished
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from datetime import datetime, timedelta
 from io import BytesIO
+import click
+import logging
 import threading
 from concurrent.futures import ThreadPoolExecutor
 
-from models import db, User, Upload, QuizResult, DailyChallenge, QuizBattle, BattleParticipant, Review, PuzzleGame, Subject, Chapter
+from config import Config
+from models import db, upgrade_schema, repair_counters, backfill_normalized_identities, get_statistics, record_stat_sample, get_stat_history, cleanup_old_data, ensure_daily_challenge, store_source_text, delete_orphan_source_texts, JobLease, User, Upload, QuizResult, DailyChallenge, QuizBattle, BattleParticipant, Review, PuzzleGame, Subject, Chapter
 from utils.preprocessing import preprocess_text
 from utils.summarizer import summarize_text, summarize_text_with_style, extract_keywords
 from utils.quiz import generate_quiz
-from utils.visualize import create_mindmap
-from utils.visualization import create_bar_chart, create_pie_chart, analyze_quiz_performance
+from utils.visualize import get_mindmap_tree, get_mindmap_key, get_cached_mindmap, render_mindmap_cached, render_mindmap_svg, mindmap_to_json, mindmap_service
+from utils.visualization import get_cached_chart, analyze_quiz_performance, chart_service
 from utils.analytics import calculate_user_stats, generate_performance_report
 from utils.ocr import extract_text_from_image
-from utils.knowledge_base import get_all_categories, get_topics_by_category, get_topic_content, search_topics
+from utils.extraction import extract_text_from_file
+from utils.query_counter import init_query_counter, query_budget
+from utils.structured_logging import init_logging, pipeline as log_pipeline
+from utils.metrics import metrics, init_metrics, stage_timer
+from utils.profiling import init_profiling
+from utils.sqlite_tuning import init_sqlite_pragmas
+from utils.rate_limit_storage import SQLiteStorage  # registers the sqlite:// scheme for RATELIMIT_STORAGE_URI
+from utils.search_index import init_upload_search, search_uploads
+from utils.pagination import paginate_keyset
+from utils.export_stream import EXPORT_FORMATS, ExportSection, stream_export
+from utils.stats_service import StatsService
+from utils.admission import AdmissionController, AdmissionRejected, TokenBucketStore, estimate_file_cost, estimate_text_cost
+from utils.scheduler import Scheduler
+from utils.maintenance import LEGACY_CHART_PATTERN, remove_stale_files
+from utils.knowledge_base import get_all_categories, get_topics_by_category, get_topic_content, get_topic_summary, search_topics
 # ================= Configuration =================
 ALLOWED_EXTENSIONS = {'pdf', 'docx', 'pptx', 'txt', 'png', 'jpg', 'jpeg', 'bmp', 'tiff', 'gif', 'webp'}
+GRADING_TREND_SIZE = 30  # latest results on the grading center's trend chart
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
 STATIC_FOLDER = os.path.join(BASE_DIR, 'static')
 TEMPLATES_FOLDER = os.path.join(BASE_DIR, 'templates')
 
 app = Flask(__name__, static_folder=STATIC_FOLDER, template_folder=TEMPLATES_FOLDER)
-app.secret_key = "vortex-secret-key-2026-pastel-theme"
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///vortex.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 32 * 1024 * 1024
+app.config.from_object(Config)
+UPLOAD_FOLDER = app.config['UPLOAD_FOLDER']
+init_logging(app)
+# Named explicitly so per-module levels work the same under gunicorn and `python app.py`
+logger = logging.getLogger('app')
 
 db.init_app(app)
+init_sqlite_pragmas(app, db)
+init_query_counter(app, db)
+init_metrics(app, db)
+profiler = init_profiling(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
@@ -43,104 +64,183 @@ limiter = Limiter(
     app=app,
     key_func=get_remote_address,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://",
+    storage_uri=app.config['RATELIMIT_STORAGE_URI'],
     headers_enabled=True
 )
 
 executor = ThreadPoolExecutor(max_workers=4)
 
+admission = AdmissionController(
+    TokenBucketStore(app.config['ADMISSION_STORAGE_PATH']),
+    user_capacity=app.config['ADMISSION_USER_CAPACITY'],
+    user_rate=app.config['ADMISSION_USER_REFILL'],
+    global_capacity=app.config['ADMISSION_GLOBAL_CAPACITY'],
+    global_rate=app.config['ADMISSION_GLOBAL_REFILL'],
+    max_queue=app.config['ADMISSION_MAX_QUEUE'],
+    max_wait=app.config['ADMISSION_MAX_WAIT']
+)
+
+admin_stats = StatsService(
+    get_statistics,
+    ttl=app.config['ADMIN_STATS_TTL'],
+    on_refresh=lambda stats: record_stat_sample(stats, app.config['STATS_SAMPLE_INTERVAL'])
+)
+
 for folder in [UPLOAD_FOLDER, os.path.join(STATIC_FOLDER, 'images')]:
     os.makedirs(folder, exist_ok=True)
 
 with app.app_context():
     db.create_all()
+added_columns = upgrade_schema(app)
+if added_columns:
+    # Newly added counter columns start at 0, so fill them from existing rows
+    repair_counters(app)
+if 'user.username_lower' in added_columns or 'user.email_lower' in added_columns:
+    # Too slow to fill at import on a large table (a worker timeout would kill it halfway);
+    # until it is run, User.find_by_username/find_by_email also check unfilled rows
+    logger.warning("⚠️ Lowercase lookup columns added; run `flask backfill-normalized` to fill them")
+init_upload_search(app, db)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return db.session.get(User, int(user_id))
+
+def render_upload_mindmap(upload_id, tree):
+    """Pre-render an upload's PNG mind map in the background so its download is instant"""
+    try:
+        with stage_timer('mindmap_render'):
+            render_mindmap_cached(tree)
+        logger.debug("✅ Mindmap created asynchronously for upload %s", upload_id)
+    except Exception as e:
+        logger.warning("⚠️ Mindmap creation failed: %s", e)
+
+def upload_mindmap_tree(upload):
+    """Mind map tree of the upload's stored cleaned text; uploads from before it was stored use the summary"""
+    return get_mindmap_tree(upload.get_source_text() or upload.summary)
+
+def schedule_mindmap(upload):
+    tree = upload_mindmap_tree(upload)
+    upload.mindmap_key = get_mindmap_key(tree)
+    db.session.commit()
+    
+    if app.config['MINDMAP_PNG_PRERENDER'] and get_cached_mindmap(upload.mindmap_key) is None:
+        executor.submit(render_upload_mindmap, upload.id, tree)
+
+def conditional_mindmap(upload, build_response):
+    """
+    Answer a mind map request under the upload's stored key: a client that
+    already has it gets a 304 without the source text being read, anything
+    else gets build_response(tree)
+    """
+    tree = None if upload.mindmap_key else upload_mindmap_tree(upload)
+    mindmap_key = upload.mindmap_key or get_mindmap_key(tree)
+    if request.if_none_match.contains(mindmap_key):
+        response = Response(status=304)
+    else:
+        response = build_response(tree or upload_mindmap_tree(upload))
+    response.set_etag(mindmap_key)
+    response.cache_control.private = True
+    response.cache_control.max_age = 86400
+    return response
+
+def backfill_mindmap_keys(batch_size=500):
+    """Recompute stored mind map keys from each upload's source text; returns how many changed"""
+    changed, last_id = 0, 0
+    with app.app_context():
+        while True:
+            uploads = Upload.query.filter(Upload.id > last_id).order_by(Upload.id).limit(batch_size).all()
+            if not uploads:
+                break
+            last_id = uploads[-1].id
+            for upload in uploads:
+                mindmap_key = get_mindmap_key(upload_mindmap_tree(upload))
+                if upload.mindmap_key != mindmap_key:
+                    upload.mindmap_key = mindmap_key
+                    changed += 1
+            db.session.commit()
+            db.session.expunge_all()
+    return changed
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def extract_text_from_file(filepath, ext):
-    try:
-        file_text = ""
-        
-        if ext == 'txt':
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                file_text = f.read(10000)
-            print(f"✅ TXT extracted: {len(file_text)} chars")
-        
-        elif ext == 'pdf':
-            import PyPDF2
-            with open(filepath, 'rb') as f:
-                reader = PyPDF2.PdfReader(f)
-                total_pages = len(reader.pages)
-                pages_to_read = min(15, total_pages)
-                
-                text_chunks = []
-                for i in range(pages_to_read):
-                    try:
-                        page_text = reader.pages[i].extract_text() or ""
-                        if page_text.strip():
-                            text_chunks.append(page_text)
-                    except:
-                        continue
-                
-                file_text = "\n".join(text_chunks)[:10000]
-            print(f"✅ PDF extracted: {len(file_text)} chars ({pages_to_read}/{total_pages} pages)")
-        
-        elif ext == 'docx':
-            import docx
-            doc = docx.Document(filepath)
-            
-            paragraphs = []
-            for i, para in enumerate(doc.paragraphs):
-                if i >= 100:
-                    break
-                text = para.text.strip()
-                if text and len(text) > 10:
-                    paragraphs.append(text)
-            
-            file_text = "\n".join(paragraphs)[:10000]
-            print(f"✅ DOCX extracted: {len(file_text)} chars ({len(paragraphs)} paragraphs)")
-        
-        elif ext == 'pptx':
-            from pptx import Presentation
-            prs = Presentation(filepath)
-            total_slides = len(prs.slides)
-            slides_to_read = min(10, total_slides)
-            extracted_text = []
-            
-            for slide_num, slide in enumerate(prs.slides[:slides_to_read]):
-                if len(extracted_text) >= 50:
-                    break
-                
-                for shape in slide.shapes:
-                    if not hasattr(shape, "text"):
-                        continue
-                    
-                    text_content = shape.text.strip()
-                    if not text_content or len(text_content) > 300:
-                        continue
-                    
-                    if hasattr(shape, 'text_frame') and shape.text_frame.paragraphs:
-                        if len(shape.text_frame.paragraphs) == 1:
-                            extracted_text.append(text_content)
-                        else:
-                            for para in shape.text_frame.paragraphs[:5]:
-                                bullet_text = para.text.strip()
-                                if bullet_text and len(bullet_text) > 5:
-                                    extracted_text.append(bullet_text)
-            
-            file_text = "\n".join(extracted_text)[:10000]
-            print(f"✅ PPTX extracted: {len(file_text)} chars ({slides_to_read}/{total_slides} slides)")
-        
-        return file_text
-    
-    except Exception as e:
-        print(f"❌ Error extracting from {ext}: {str(e)}")
-        return ""
+def admit_processing(cost):
+    """Charge processing cost to the user and the host; over capacity this waits or raises a 429 with Retry-After"""
+    if app.config['ADMISSION_ENABLED']:
+        admission.admit(current_user.id, cost)
+
+# ================= Maintenance Jobs =================
+def retention_job():
+    return cleanup_old_data(app.config['RETENTION_DAYS'], app.config['RETENTION_BATCH_SIZE'])
+
+def artifact_gc_job():
+    max_age = app.config['ARTIFACT_MAX_AGE_DAYS'] * 86400
+    legacy_files, legacy_bytes = remove_stale_files(os.path.join(STATIC_FOLDER, 'images'), max_age, LEGACY_CHART_PATTERN)
+    # /summarize deletes its upload when done, so anything older than a day was left by a crash
+    upload_files, upload_bytes = remove_stale_files(UPLOAD_FOLDER, 86400)
+    return {
+        'source_texts_removed': delete_orphan_source_texts(),
+        'charts_trimmed': chart_service.store.trim(),
+        'mindmaps_trimmed': mindmap_service.store.trim(),
+        'legacy_charts_removed': legacy_files,
+        'orphan_uploads_removed': upload_files,
+        'bytes_freed': legacy_bytes + upload_bytes
+    }
+
+def daily_challenge_job():
+    today = datetime.utcnow().date()
+    # Create tomorrow's challenge ahead of time so the first visitor after midnight doesn't have to
+    return [ensure_daily_challenge(today + timedelta(days=offset)).date for offset in (0, 1)]
+
+def analytics_rollup_job():
+    sample = record_stat_sample(get_statistics(), app.config['STATS_SAMPLE_INTERVAL'])
+    return {'sampled_at': sample.sampled_at if sample else None}
+
+scheduler = Scheduler(app, db, JobLease, tick=app.config['SCHEDULER_TICK_SECONDS'])
+scheduler.add('retention', retention_job, interval=6 * 3600)
+scheduler.add('artifact_gc', artifact_gc_job, interval=3600)
+scheduler.add('daily_challenge', daily_challenge_job, interval=3600)
+scheduler.add('analytics_rollup', analytics_rollup_job, interval=app.config['STATS_SAMPLE_INTERVAL'])
+
+@app.before_request
+def start_scheduler():
+    # Started on the first request rather than at import so each forked worker gets its own thread
+    if app.config['SCHEDULER_ENABLED'] and not app.config.get('TESTING'):
+        scheduler.ensure_started()
+
+# ================= Metrics =================
+# Admission, job and logging statistics live in their own objects; these collectors copy them into /metrics
+metrics.counter('vortex_admission_requests_total', 'Admission decisions for processing requests')
+metrics.counter('vortex_admission_cost_total', 'Estimated cost units admitted')
+metrics.gauge('vortex_admission_queue_depth', 'Requests waiting for global processing capacity')
+metrics.counter('vortex_admission_queue_wait_seconds_total', 'Time spent waiting in the admission queue')
+metrics.counter('vortex_job_runs_total', 'Maintenance job runs by this worker')
+metrics.counter('vortex_job_duration_seconds_total', 'Maintenance job run time')
+metrics.gauge('vortex_log_queue_depth', 'Log records waiting to be written')
+metrics.counter('vortex_log_records_dropped_total', 'Log records dropped because the queue was full')
+
+def collect_admission_metrics():
+    snapshot = admission.metrics()
+    for result in ('admitted', 'rejected_user', 'rejected_global', 'rejected_queue_full'):
+        yield 'vortex_admission_requests_total', {'result': result}, snapshot[result]
+    yield 'vortex_admission_cost_total', {}, snapshot['cost_admitted']
+    yield 'vortex_admission_queue_depth', {}, snapshot['queue_depth']
+    yield 'vortex_admission_queue_wait_seconds_total', {}, snapshot['queue_wait_ms_total'] / 1000
+
+def collect_job_metrics():
+    for name, job in scheduler.metrics.items():
+        yield 'vortex_job_runs_total', {'job': name, 'status': 'ok'}, job['runs'] - job['failures']
+        yield 'vortex_job_runs_total', {'job': name, 'status': 'failed'}, job['failures']
+        yield 'vortex_job_duration_seconds_total', {'job': name}, job['total_ms'] / 1000
+
+def collect_log_metrics():
+    snapshot = log_pipeline.stats()
+    yield 'vortex_log_queue_depth', {}, snapshot['queued']
+    yield 'vortex_log_records_dropped_total', {}, snapshot['dropped']
+
+metrics.add_collector(collect_admission_metrics)
+metrics.add_collector(collect_job_metrics)
+metrics.add_collector(collect_log_metrics)
 
 # ================= Authentication Routes =================
 @app.route('/register', methods=['GET', 'POST'])
@@ -184,11 +284,11 @@ def register():
             flash('❌ Password must contain at least one number', 'danger')
             return redirect(url_for('register'))
         
-        if User.query.filter(User.username.ilike(username)).first():
+        if User.find_by_username(username):
             flash('❌ Username already exists', 'danger')
             return redirect(url_for('register'))
         
-        if User.query.filter(User.email.ilike(email)).first():
+        if User.find_by_email(email):
             flash('❌ Email already registered', 'danger')
             return redirect(url_for('register'))
         
@@ -204,12 +304,12 @@ def register():
             db.session.add(new_user)
             db.session.commit()
             flash('✅ Registration successful! Please login.', 'success')
-            print(f"✅ New user registered: {username}")
+            logger.info("✅ New user registered: %s", username)
             return redirect(url_for('login'))
         except Exception as e:
             db.session.rollback()
             flash('❌ Registration failed. Please try again.', 'danger')
-            print(f"❌ Registration error: {e}")
+            logger.exception("❌ Registration error: %s", e)
     
     return render_template('register.html')
 
@@ -224,16 +324,16 @@ def login():
             flash('⚠️ Please enter both username and password', 'danger')
             return redirect(url_for('login'))
         
-        user = User.query.filter(User.username.ilike(username)).first()
+        user = User.find_by_username(username)
         
         if user and check_password_hash(user.password, password):
             login_user(user)
             flash(f'🎉 Welcome back, {user.username}!', 'success')
-            print(f"✅ User logged in: {user.username}")
+            logger.info("✅ User logged in: %s", user.username)
             return redirect(url_for('home'))
         else:
             flash('❌ Invalid username or password', 'danger')
-            print(f"❌ Failed login attempt for: {username}")
+            logger.warning("❌ Failed login attempt for: %s", username)
     
     return render_template('login.html')
 
@@ -249,13 +349,54 @@ def logout():
 def home():
     return render_template('index.html')
 
+# ================= Listing Helpers =================
+def keyset_json(page, template, serialize, **context):
+    """JSON page for infinite scroll: raw items plus the rendered rows to append"""
+    return jsonify({
+        'items': [serialize(item) for item in page.items],
+        'html': render_template(template, items=page.items, **context),
+        'next_cursor': page.next_cursor
+    })
+
+def serialize_upload(upload):
+    return {
+        'id': upload.id,
+        'filename': upload.filename,
+        'uploaded_at': upload.uploaded_at.isoformat(),
+        'is_shared': bool(upload.is_shared)
+    }
+
+def get_start_index():
+    return max(request.args.get('start', 0, type=int), 0)
+
 @app.route('/dashboard')
+@query_budget(5)
 @login_required
 def dashboard():
-    user_uploads = Upload.query.filter_by(user_id=current_user.id).order_by(Upload.uploaded_at.desc()).all()
+    page = get_dashboard_uploads(request.args.get('after'))
     user_quizzes = QuizResult.query.filter_by(user_id=current_user.id).order_by(QuizResult.completed_at.desc()).limit(5).all()
-    
-    return render_template('dashboard.html', uploads=user_uploads, quizzes=user_quizzes)
+    upload_count = db.session.query(db.func.count(Upload.id)).filter(Upload.user_id == current_user.id).scalar()
+    quiz_count = db.session.query(db.func.count(QuizResult.id)).filter(QuizResult.user_id == current_user.id).scalar()
+    
+    return render_template('dashboard.html',
+                         uploads=page.items,
+                         next_cursor=page.next_cursor,
+                         quizzes=user_quizzes,
+                         upload_count=upload_count,
+                         quiz_count=quiz_count)
+
+def get_dashboard_uploads(cursor=None):
+    return paginate_keyset(
+        Upload.query.filter_by(user_id=current_user.id),
+        Upload.uploaded_at, Upload.id, cursor
+    )
+
+@app.route('/api/dashboard/uploads')
+@query_budget(2)
+@login_required
+def api_dashboard_uploads():
+    page = get_dashboard_uploads(request.args.get('after'))
+    return keyset_json(page, 'partials/dashboard_uploads.html', serialize_upload)
 
 @app.route('/about')
 def about():
@@ -276,7 +417,13 @@ def summarize():
     form_text = request.form.get('text', '').strip()
     if form_text:
         text = form_text[:10000]
-        print(f"📝 Text from form: {len(text)} chars")
+        logger.debug("📝 Text from form: %d chars", len(text))
+
+    # Charged before any extraction, so a burst of large OCR jobs can't take every CPU
+    if file and file.filename and allowed_file(secure_filename(file.filename)):
+        admit_processing(estimate_file_cost(file, secure_filename(file.filename).rsplit('.', 1)[1].lower()))
+    else:
+        admit_processing(estimate_text_cost(text))
 
     if file and file.filename:
         filename = secure_filename(file.filename)
@@ -291,17 +438,19 @@ def summarize():
         try:
             file.save(filepath)
             ext = filename.rsplit('.', 1)[1].lower()
-            print(f"📁 File uploaded: {filename} ({ext})")
+            logger.debug("📁 File uploaded: %s (%s)", filename, ext)
             
             # ✅ معالجة الصور
             if ext in ['png', 'jpg', 'jpeg', 'bmp', 'tiff', 'gif', 'webp']:
                 from utils.ocr import extract_text_from_image
-                file_text = extract_text_from_image(filepath)
+                with stage_timer('ocr'):
+                    file_text = extract_text_from_image(filepath)
                 if not file_text or len(file_text.strip()) < 10:
                     flash("⚠️ Could not extract text from image. Make sure Tesseract OCR is installed, or paste the text manually.", 'warning')
                     return redirect(url_for('home'))
             else:
-                file_text = extract_text_from_file(filepath, ext)
+                with stage_timer('extract'):
+                    file_text = extract_text_from_file(filepath, ext)
             
             if file_text:
                 text = file_text
@@ -310,21 +459,19 @@ def summarize():
                 return redirect(url_for('home'))
                 
         except Exception as e:
-            print(f"❌ Error processing file: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Error processing file: %s", e)
             flash(f"❌ Error processing file: {str(e)}", 'danger')
             return redirect(url_for('home'))
         finally:
             try:
                 if os.path.exists(filepath):
                     os.remove(filepath)
-                    print(f"🗑️ Cleaned up: {filename}")
+                    logger.debug("🗑️ Cleaned up: %s", filename)
             except:
                 pass
     
     if not text or len(text.strip()) < 20:
-        print("❌ No text or text too short")
+        logger.debug("❌ No text or text too short")
         flash("⚠️ Please provide text or upload a file with sufficient content (at least 20 characters)", 'warning')
         return redirect(url_for('home'))
 
@@ -332,33 +479,36 @@ def summarize():
         text = text[:10000]
         flash("ℹ️ Text was truncated to 10,000 characters for optimal performance", 'info')
 
-    print(f"📊 Final text length: {len(text)} chars")
+    logger.debug("📊 Final text length: %d chars", len(text))
 
     try:
         summary_style = request.form.get('summary_style', 'paragraphs')
         summary_length = request.form.get('summary_length', 'medium')
         chapter_id = request.form.get('chapter_id')
         
-        print(f"🎨 Summary style: {summary_style}, length: {summary_length}")
+        logger.debug("🎨 Summary style: %s, length: %s", summary_style, summary_length)
         if chapter_id:
-            print(f"📂 Saving to chapter_id: {chapter_id}")
+            logger.debug("📂 Saving to chapter_id: %s", chapter_id)
         
-        cleaned_text = preprocess_text(text)
-        print(f"✅ Cleaned text: {len(cleaned_text)} chars")
+        with stage_timer('preprocess'):
+            cleaned_text = preprocess_text(text)
+        logger.debug("✅ Cleaned text: %d chars", len(cleaned_text))
         
         if len(cleaned_text) < 50:
             flash("⚠️ Text is too short after processing. Please provide more content.", 'warning')
             return redirect(url_for('home'))
         
-        summary = summarize_text_with_style(cleaned_text, style=summary_style, length=summary_length)
-        print(f"✅ Summary ({summary_style}, {summary_length}): {len(summary)} chars")
+        with stage_timer('summarize'):
+            summary = summarize_text_with_style(cleaned_text, style=summary_style, length=summary_length)
+        logger.debug("✅ Summary (%s, %s): %d chars", summary_style, summary_length, len(summary))
         
         if not summary or len(summary.strip()) < 10:
             flash("⚠️ Could not generate a meaningful summary. Please provide more content.", 'warning')
             return redirect(url_for('home'))
         
-        quiz = generate_quiz(summary)
-        print(f"✅ Quiz: {len(quiz)} questions")
+        with stage_timer('quiz'):
+            quiz = generate_quiz(summary)
+        logger.debug("✅ Quiz: %d questions", len(quiz))
         
         if not quiz or len(quiz) == 0:
             flash("⚠️ Could not generate quiz questions. Please try different content.", 'warning')
@@ -368,7 +518,9 @@ def summarize():
             filename=filename_to_save,
             summary=summary,
             user_id=current_user.id,
-            chapter_id=int(chapter_id) if chapter_id else None
+            chapter_id=int(chapter_id) if chapter_id else None,
+            # Kept compressed so later re-processing doesn't need the file or OCR again
+            source_hash=store_source_text(cleaned_text)
         )
         db.session.add(upload)
         db.session.commit()
@@ -377,43 +529,88 @@ def summarize():
         session['quiz'] = quiz
         session['score'] = 0
 
-        def create_mindmap_async():
-            try:
-                words = summary.split()
-                important_words = [
-                    word.strip('.,;:!?"\'•1234567890') 
-                    for word in words 
-                    if len(word) > 4 and word.isalpha()
-                ]
-                
-                if len(important_words) < 6:
-                    important_words = [
-                        word.strip('.,;:!?"\'•1234567890') 
-                        for word in words 
-                        if word.isalpha()
-                    ][:6]
-                else:
-                    important_words = important_words[:6]
-                
-                create_mindmap(important_words)
-                print(f"✅ Mindmap created asynchronously")
-            except Exception as e:
-                print(f"⚠️ Mindmap creation failed: {e}")
-        
-        executor.submit(create_mindmap_async)
+        with stage_timer('mindmap_schedule'):
+            schedule_mindmap(upload)
         
-        print("🎉 SUCCESS! Redirecting to results...")
+        logger.info("🎉 Upload %s processed", upload.id)
         flash('✨ Summary and quiz generated successfully!', 'success')
-        return render_template('result.html', summary=summary, quiz=quiz)
+        return render_template('result.html', summary=summary, quiz=quiz, upload=upload)
         
     except Exception as e:
-        print(f"❌ Processing error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Processing error: %s", e)
         flash(f"❌ Error processing content: {str(e)}", 'danger')
         return redirect(url_for('home'))
+
+# ================= Re-processing Routes =================
+def get_own_source(upload_id):
+    """The user's upload and its stored source text, or (upload, None) with a flash explaining why not"""
+    upload = Upload.query.get_or_404(upload_id)
+    if upload.user_id != current_user.id:
+        flash('❌ You can only re-process your own uploads', 'danger')
+        return upload, None
+    
+    source_text = upload.get_source_text()
+    if not source_text:
+        flash('⚠️ The original text of this upload was not stored. Please upload it again.', 'warning')
+    return upload, source_text
+
+@app.route('/upload/<int:upload_id>/resummarize', methods=['POST'])
+@login_required
+@limiter.limit("20 per hour")
+def resummarize_upload(upload_id):
+    upload, source_text = get_own_source(upload_id)
+    if not source_text:
+        return redirect(url_for('dashboard'))
+    admit_processing(estimate_text_cost(source_text))
+    
+    summary_style = request.form.get('summary_style', 'paragraphs')
+    summary_length = request.form.get('summary_length', 'medium')
+    with stage_timer('summarize'):
+        summary = summarize_text_with_style(source_text, style=summary_style, length=summary_length)
+    if not summary or len(summary.strip()) < 10:
+        flash("⚠️ Could not generate a meaningful summary with these settings.", 'warning')
+        return redirect(url_for('dashboard'))
+    
+    quiz = generate_quiz(summary)
+    upload.summary = summary
+    db.session.commit()
+    
+    session['summary'] = summary
+    session['quiz'] = quiz
+    session['score'] = 0
+    
+    # The mind map comes from the source text, so this only re-renders it for uploads without one
+    schedule_mindmap(upload)
+    
+    flash(f'✨ Summary regenerated ({summary_style}, {summary_length})', 'success')
+    return render_template('result.html', summary=summary, quiz=quiz, upload=upload)
+
+@app.route('/upload/<int:upload_id>/regenerate-quiz', methods=['POST'])
+@login_required
+@limiter.limit("20 per hour")
+def regenerate_quiz(upload_id):
+    upload, source_text = get_own_source(upload_id)
+    if not source_text:
+        return redirect(url_for('dashboard'))
+    admit_processing(estimate_text_cost(source_text))
+    
+    # Drawn from the full text rather than the summary, so repeated quizzes cover more material
+    with stage_timer('quiz'):
+        quiz = generate_quiz(source_text)
+    if not quiz:
+        flash("⚠️ Could not generate quiz questions from this upload.", 'warning')
+        return redirect(url_for('dashboard'))
+    
+    session['summary'] = upload.summary
+    session['quiz'] = quiz
+    session['score'] = 0
+    
+    flash(f'✨ New quiz with {len(quiz)} questions', 'success')
+    return redirect(url_for('quiz_page'))
+
 # ================= Subjects & Chapters Routes =================
 @app.route('/subjects')
+@query_budget(2)
 @login_required
 def subjects():
     user_subjects = Subject.query.filter_by(user_id=current_user.id).order_by(Subject.created_at.desc()).all()
@@ -448,11 +645,12 @@ def create_subject():
         except Exception as e:
             db.session.rollback()
             flash('❌ Error creating subject', 'danger')
-            print(f"❌ Subject creation error: {e}")
+            logger.exception("❌ Subject creation error: %s", e)
     
     return render_template('create_subject.html')
 
 @app.route('/subject/<int:subject_id>')
+@query_budget(3)
 @login_required
 def view_subject(subject_id):
     subject = Subject.query.get_or_404(subject_id)
@@ -463,11 +661,7 @@ def view_subject(subject_id):
     
     chapters = Chapter.query.filter_by(subject_id=subject_id).order_by(Chapter.order).all()
     
-    chapter_stats = {}
-    for chapter in chapters:
-        chapter_stats[chapter.id] = Upload.query.filter_by(chapter_id=chapter.id).count()
-    
-    return render_template('view_subject.html', subject=subject, chapters=chapters, chapter_stats=chapter_stats)
+    return render_template('view_subject.html', subject=subject, chapters=chapters)
 
 @app.route('/subject/<int:subject_id>/chapter/create', methods=['GET', 'POST'])
 @login_required
@@ -502,7 +696,7 @@ def create_chapter(subject_id):
         except Exception as e:
             db.session.rollback()
             flash('❌ Error creating chapter', 'danger')
-            print(f"❌ Chapter creation error: {e}")
+            logger.exception("❌ Chapter creation error: %s", e)
     
     last_chapter = Chapter.query.filter_by(subject_id=subject_id).order_by(Chapter.order.desc()).first()
     next_order = (last_chapter.order + 1) if last_chapter else 1
@@ -541,7 +735,7 @@ def delete_subject(subject_id):
     except Exception as e:
         db.session.rollback()
         flash('❌ Error deleting subject', 'danger')
-        print(f"❌ Subject deletion error: {e}")
+        logger.exception("❌ Subject deletion error: %s", e)
     
     return redirect(url_for('subjects'))
 
@@ -565,11 +759,37 @@ def delete_chapter(chapter_id):
     except Exception as e:
         db.session.rollback()
         flash('❌ Error deleting chapter', 'danger')
-        print(f"❌ Chapter deletion error: {e}")
+        logger.exception("❌ Chapter deletion error: %s", e)
     
     return redirect(url_for('view_subject', subject_id=subject_id))
 
 # ================= Quiz Routes =================
+def score_quiz_answers(quiz, form):
+    """10 points per correct answer; matching questions score their share of correct pairs"""
+    score = 0
+    
+    for i, q in enumerate(quiz):
+        q_type = q.get('type', 'fill_blank')
+        
+        if q_type == 'matching':
+            correct_matches = 0
+            for j in range(len(q.get('list_a', []))):
+                user_match = form.get(f'answer_{i}_{j}', '').strip()
+                correct_answer = q['a'].get(j, '')
+                if user_match == correct_answer:
+                    correct_matches += 1
+            
+            if len(q.get('list_a', [])) > 0:
+                match_score = int((correct_matches / len(q['list_a'])) * 10)
+                score += match_score
+        
+        else:  # mcq, true_false, fill_blank
+            user_answer = form.get(f'answer_{i}', '').strip()
+            if user_answer.lower() == q['a'].lower():
+                score += 10
+    
+    return score
+
 @app.route('/quiz', methods=['GET', 'POST'])
 @login_required
 def quiz_page():
@@ -580,37 +800,7 @@ def quiz_page():
     quiz = session['quiz']
     
     if request.method == 'POST':
-        score = 0
-        
-        for i, q in enumerate(quiz):
-            q_type = q.get('type', 'fill_blank')
-            
-            if q_type == 'mcq':
-                user_answer = request.form.get(f'answer_{i}', '').strip()
-                if user_answer.lower() == q['a'].lower():
-                    score += 10
-            
-            elif q_type == 'true_false':
-                user_answer = request.form.get(f'answer_{i}', '').strip().lower()
-                if user_answer == q['a'].lower():
-                    score += 10
-            
-            elif q_type == 'fill_blank':
-                user_answer = request.form.get(f'answer_{i}', '').strip()
-                if user_answer.lower() == q['a'].lower():
-                    score += 10
-            
-            elif q_type == 'matching':
-                correct_matches = 0
-                for j in range(len(q.get('list_a', []))):
-                    user_match = request.form.get(f'answer_{i}_{j}', '').strip()
-                    correct_answer = q['a'].get(j, '')
-                    if user_match == correct_answer:
-                        correct_matches += 1
-                
-                if len(q.get('list_a', [])) > 0:
-                    match_score = int((correct_matches / len(q['list_a'])) * 10)
-                    score += match_score
+        score = score_quiz_answers(quiz, request.form)
         
         try:
             quiz_result = QuizResult(
@@ -620,8 +810,7 @@ def quiz_page():
             )
             db.session.add(quiz_result)
             
-            current_user.score += score
-            current_user.level = (current_user.score // 100) + 1
+            current_user.add_score(score)
             db.session.commit()
             
             session['score'] = score
@@ -630,7 +819,7 @@ def quiz_page():
         except Exception as e:
             db.session.rollback()
             flash('❌ Error saving quiz results', 'danger')
-            print(f"❌ Quiz save error: {e}")
+            logger.exception("❌ Quiz save error: %s", e)
     
     return render_template('quiz.html', quiz=quiz)
 
@@ -663,15 +852,14 @@ def submit_flashcards():
         )
         db.session.add(quiz_result)
         
-        current_user.score += score
-        current_user.level = (current_user.score // 100) + 1
+        current_user.add_score(score)
         db.session.commit()
         
         flash(f'🎴 Flashcards completed! You scored {score} points!', 'success')
     except Exception as e:
         db.session.rollback()
         flash('❌ Error saving flashcard results', 'danger')
-        print(f"❌ Flashcard save error: {e}")
+        logger.exception("❌ Flashcard save error: %s", e)
     
     return redirect(url_for('gamification'))
 
@@ -689,10 +877,38 @@ def leaderboard():
     return render_template('leaderboard.html', users=top_users)
 
 @app.route('/shared-library')
+@query_budget(2)
 @login_required
 def shared_library():
-    shared_uploads = Upload.query.filter_by(is_shared=True).order_by(Upload.uploaded_at.desc()).all()
-    return render_template('shared_library.html', uploads=shared_uploads)
+    sort = get_shared_sort()
+    page = get_shared_uploads(request.args.get('after'), sort)
+    return render_template('shared_library.html', uploads=page.items, next_cursor=page.next_cursor, sort=sort)
+
+def get_shared_sort():
+    return 'rating' if request.args.get('sort') == 'rating' else 'newest'
+
+def get_shared_uploads(cursor=None, sort='newest'):
+    # Ratings are read from the maintained rating_avg counter, so no review aggregation is needed
+    sort_column = Upload.rating_avg if sort == 'rating' else Upload.uploaded_at
+    return paginate_keyset(
+        Upload.query.options(db.joinedload(Upload.user)).filter_by(is_shared=True),
+        sort_column, Upload.id, cursor
+    )
+
+@app.route('/api/shared-library')
+@query_budget(2)
+@login_required
+def api_shared_library():
+    page = get_shared_uploads(request.args.get('after'), get_shared_sort())
+    return keyset_json(
+        page, 'partials/shared_uploads.html',
+        lambda upload: dict(
+            serialize_upload(upload),
+            username=upload.user.username,
+            average_rating=upload.get_average_rating(),
+            review_count=upload.review_count
+        )
+    )
 
 @app.route('/share-upload/<int:upload_id>')
 @login_required
@@ -710,19 +926,7 @@ def share_upload(upload_id):
 @app.route('/daily-challenge')
 @login_required
 def daily_challenge():
-    today = datetime.utcnow().date()
-    challenge = DailyChallenge.query.filter_by(date=today, active=True).first()
-    
-    if not challenge:
-        challenge = DailyChallenge(
-            title="Complete 3 Quizzes",
-            description="Complete at least 3 quizzes today to earn bonus points!",
-            points=50,
-            date=today
-        )
-        db.session.add(challenge)
-        db.session.commit()
-    
+    challenge = ensure_daily_challenge(datetime.utcnow().date())
     return render_template('daily_challenge.html', challenge=challenge)
 
 # ================= Quiz Battles Routes =================
@@ -756,7 +960,7 @@ def create_battle():
     except Exception as e:
         db.session.rollback()
         flash('❌ Error creating battle', 'danger')
-        print(f"❌ Battle creation error: {e}")
+        logger.exception("❌ Battle creation error: %s", e)
         return redirect(url_for('quiz_battles'))
 
 @app.route('/battle/<int:battle_id>')
@@ -795,18 +999,13 @@ def submit_battle(battle_id):
         flash('⚠️ Quiz not found in session', 'danger')
         return redirect(url_for('quiz_battles'))
     
-    score = 0
-    
-    for i, q in enumerate(quiz):
-        user_answer = request.form.get(f'answer_{i}', '').strip().lower()
-        if user_answer == q['a'].lower():
-            score += 10
+    # Matching questions carry a dict of pairs as their answer, so score them like the solo quiz
+    score = score_quiz_answers(quiz, request.form)
     
     participant.score = score
     participant.completed = True
     
-    current_user.score += score
-    current_user.level = (current_user.score // 100) + 1
+    current_user.add_score(score)
     
     db.session.commit()
     
@@ -875,8 +1074,7 @@ def submit_puzzle(puzzle_id):
     puzzle.score = score
     puzzle.completed = True
     
-    current_user.score += score
-    current_user.level = (current_user.score // 100) + 1
+    current_user.add_score(score)
     
     try:
         db.session.commit()
@@ -884,28 +1082,60 @@ def submit_puzzle(puzzle_id):
     except Exception as e:
         db.session.rollback()
         flash('❌ Error saving puzzle results', 'danger')
-        print(f"❌ Puzzle save error: {e}")
+        logger.exception("❌ Puzzle save error: %s", e)
     
     return redirect(url_for('gamification'))
 
 # ================= Grading Center Routes =================
 @app.route('/grading-center')
+@query_budget(4)
 @login_required
 def grading_center():
-    results = QuizResult.query.filter_by(user_id=current_user.id).order_by(
-        QuizResult.completed_at.desc()
-    ).all()
+    page = get_grading_results(request.args.get('after'))
     
-    total_quizzes = len(results)
-    avg_score = sum(r.score for r in results) / total_quizzes if total_quizzes > 0 else 0
+    # Totals come from SQL so they cover every result, not just the loaded page
+    total_quizzes, avg_score = db.session.query(
+        db.func.count(QuizResult.id), db.func.avg(QuizResult.score)
+    ).filter(QuizResult.user_id == current_user.id).one()
+    # The trend chart shows the latest results whichever page is loaded
+    trend = QuizResult.query.filter_by(user_id=current_user.id).order_by(
+        QuizResult.completed_at.desc(), QuizResult.id.desc()
+    ).limit(GRADING_TREND_SIZE).all()
     
     return render_template('grading_center.html', 
-                         results=results,
+                         results=page.items,
+                         trend=trend,
+                         next_cursor=page.next_cursor,
+                         start=get_start_index(),
                          total_quizzes=total_quizzes,
-                         avg_score=avg_score)
+                         avg_score=avg_score or 0)
+
+def get_grading_results(cursor=None):
+    return paginate_keyset(
+        QuizResult.query.filter_by(user_id=current_user.id),
+        QuizResult.completed_at, QuizResult.id, cursor
+    )
+
+@app.route('/api/grading-center/results')
+@query_budget(2)
+@login_required
+def api_grading_results():
+    page = get_grading_results(request.args.get('after'))
+    return keyset_json(
+        page, 'partials/grading_results.html',
+        lambda result: {
+            'id': result.id,
+            'score': result.score,
+            'total_questions': result.total_questions,
+            'percentage': result.get_percentage(),
+            'completed_at': result.completed_at.isoformat()
+        },
+        start=get_start_index()
+    )
 
 # ================= Review System Routes =================
 @app.route('/review/<int:upload_id>', methods=['GET', 'POST'])
+@query_budget(4)
 @login_required
 def review_upload(upload_id):
     upload = Upload.query.get_or_404(upload_id)
@@ -926,8 +1156,8 @@ def review_upload(upload_id):
         flash('⭐ Review submitted successfully!', 'success')
         return redirect(url_for('review_upload', upload_id=upload_id))
     
-    reviews = Review.query.filter_by(upload_id=upload_id).all()
-    avg_rating = sum(r.rating for r in reviews) / len(reviews) if reviews else 0
+    reviews = Review.query.options(db.joinedload(Review.user)).filter_by(upload_id=upload_id).all()
+    avg_rating = upload.get_average_rating()
     
     return render_template('review_upload.html', 
                          upload=upload, 
@@ -936,6 +1166,7 @@ def review_upload(upload_id):
 
 # ================= Search Routes =================
 @app.route('/search')
+@query_budget(3)
 @login_required
 def search():
     query = request.args.get('q', '').strip()
@@ -943,14 +1174,21 @@ def search():
     if not query:
         return render_template('search.html', results=[], query='')
     
-    results = Upload.query.filter(
-        db.or_(
-            Upload.filename.contains(query),
-            Upload.summary.contains(query)
-        )
-    ).filter_by(is_shared=True).all()
+    hits, next_cursor = search_uploads(db, query, cursor=request.args.get('after'))
     
-    return render_template('search.html', results=results, query=query)
+    uploads = Upload.query.options(db.joinedload(Upload.user)).filter(
+        Upload.id.in_([hit['id'] for hit in hits])
+    ).all() if hits else []
+    uploads_by_id = {upload.id: upload for upload in uploads}
+    
+    results = []
+    for hit in hits:
+        upload = uploads_by_id.get(hit['id'])
+        if upload:
+            upload.snippet = hit['snippet']
+            results.append(upload)
+    
+    return render_template('search.html', results=results, query=query, next_cursor=next_cursor)
 
 # ================= Export Routes =================
 @app.route('/export/<int:upload_id>/<format>')
@@ -968,11 +1206,46 @@ def export_upload(upload_id, format):
     flash('⚠️ Export format not supported yet', 'warning')
     return redirect(url_for('dashboard'))
 
+def export_sections(user_id):
+    return [
+        ExportSection('uploads', [
+            Upload.id, Upload.filename, Upload.uploaded_at, Upload.chapter_id, Upload.is_shared,
+            Upload.review_count, Upload.rating_avg, Upload.keywords, Upload.summary
+        ], [Upload.user_id == user_id], text_column='summary'),
+        ExportSection('quiz_results', [
+            QuizResult.id, QuizResult.score, QuizResult.total_questions, QuizResult.completed_at
+        ], [QuizResult.user_id == user_id]),
+        ExportSection('subjects', [
+            Subject.id, Subject.name, Subject.description, Subject.chapter_count, Subject.created_at
+        ], [Subject.user_id == user_id]),
+    ]
+
+@app.route('/export/all/<format>')
+@login_required
+@limiter.limit("5 per hour")
+def export_all(format):
+    if format not in EXPORT_FORMATS:
+        flash('⚠️ Export format not supported yet', 'warning')
+        return redirect(url_for('dashboard'))
+    
+    mimetype, extension = EXPORT_FORMATS[format]
+    filename = f"vortex_{current_user.username}_{datetime.utcnow().strftime('%Y%m%d')}.{extension}"
+    # Rows are read batch by batch while the response is being sent
+    body = stream_export(format, db.session, export_sections(current_user.id))
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment;filename={secure_filename(filename)}'}
+    )
+
 # ================= Analytics Routes =================
+def get_user_quiz_results(user_id):
+    return QuizResult.query.filter_by(user_id=user_id).order_by(QuizResult.completed_at).all()
+
 @app.route('/analytics')
 @login_required
 def analytics():
-    quiz_results = QuizResult.query.filter_by(user_id=current_user.id).all()
+    quiz_results = get_user_quiz_results(current_user.id)
     uploads = Upload.query.filter_by(user_id=current_user.id).all()
     
     stats = calculate_user_stats(current_user, quiz_results, uploads)
@@ -984,25 +1257,101 @@ def analytics():
                          performance=performance_data,
                          weekly_report=weekly_report)
 
+@app.route('/api/analytics/performance')
+@login_required
+def analytics_performance_data():
+    performance = analyze_quiz_performance(get_user_quiz_results(current_user.id))
+    if not performance:
+        return jsonify({'labels': [], 'scores': []})
+    return jsonify(performance)
+
+@app.route('/analytics/performance.png')
+@login_required
+def analytics_performance_chart():
+    performance = analyze_quiz_performance(get_user_quiz_results(current_user.id))
+    if not performance:
+        return Response(status=404)
+    
+    chart_path = get_cached_chart('line', performance['labels'], performance['scores'], "Your Performance Trend")
+    return send_file(chart_path, mimetype='image/png', max_age=3600)
+
 # ================= Visualization Routes =================
+def get_keyword_frequency(upload):
+    keywords = extract_keywords(upload.summary)
+    summary_lower = upload.summary.lower()
+    return keywords, {kw: summary_lower.count(kw) for kw in keywords}
+
 @app.route('/visualize/<int:upload_id>')
 @login_required
 def visualize_upload(upload_id):
     upload = Upload.query.get_or_404(upload_id)
+    keywords, _ = get_keyword_frequency(upload)
     
-    keywords = extract_keywords(upload.summary)
-    keyword_freq = {kw: upload.summary.lower().count(kw) for kw in keywords}
+    return render_template('visualize.html', 
+                         upload=upload,
+                         keywords=keywords)
+
+@app.route('/api/visualize/<int:upload_id>')
+@login_required
+def visualize_upload_data(upload_id):
+    upload = Upload.query.get_or_404(upload_id)
+    _, keyword_freq = get_keyword_frequency(upload)
     
-    chart_path = create_bar_chart(
+    return jsonify({
+        'title': f"Keyword Frequency: {upload.filename}",
+        'labels': list(keyword_freq.keys()),
+        'values': list(keyword_freq.values())
+    })
+
+@app.route('/visualize/<int:upload_id>/chart.png')
+@login_required
+def visualize_upload_chart(upload_id):
+    upload = Upload.query.get_or_404(upload_id)
+    _, keyword_freq = get_keyword_frequency(upload)
+    
+    chart_path = get_cached_chart(
+        'bar',
         list(keyword_freq.keys()),
         list(keyword_freq.values()),
         f"Keyword Frequency: {upload.filename}"
     )
+    return send_file(chart_path, mimetype='image/png', max_age=3600)
+
+# ================= Mind Map Routes =================
+def get_viewable_upload(upload_id):
+    upload = Upload.query.get_or_404(upload_id)
+    if upload.user_id != current_user.id and not upload.is_shared:
+        abort(404)
+    return upload
+
+@app.route('/api/mindmap/<int:upload_id>')
+@login_required
+def mindmap_data(upload_id):
+    upload = get_viewable_upload(upload_id)
+    return conditional_mindmap(upload, lambda tree: jsonify(mindmap_to_json(tree)))
+
+@app.route('/mindmap/<int:upload_id>.svg')
+@login_required
+def mindmap_svg(upload_id):
+    upload = get_viewable_upload(upload_id)
     
-    return render_template('visualize.html', 
-                         upload=upload,
-                         chart=chart_path,
-                         keywords=keywords)
+    def render(tree):
+        with stage_timer('mindmap_svg'):
+            return Response(render_mindmap_svg(tree), mimetype='image/svg+xml')
+    return conditional_mindmap(upload, render)
+
+@app.route('/mindmap/<int:upload_id>.png')
+@login_required
+def mindmap_image(upload_id):
+    upload = get_viewable_upload(upload_id)
+    
+    mindmap_path = get_cached_mindmap(upload.mindmap_key) if upload.mindmap_key else None
+    if not mindmap_path:
+        # Missing or evicted: render on demand from the stored text
+        with stage_timer('mindmap_render'):
+            mindmap_path = render_mindmap_cached(upload_mindmap_tree(upload))
+    
+    return send_file(mindmap_path, mimetype='image/png', max_age=86400)
 
 # ================= Admin Routes =================
 @app.route('/admin/login', methods=['GET', 'POST'])
@@ -1022,30 +1371,67 @@ def admin_login():
     return render_template('admin_login.html')
 
 @app.route('/admin/panel')
+@query_budget(6)
 def admin_panel():
     if not session.get('is_admin'):
         flash('❌ Admin access required', 'danger')
         return redirect(url_for('admin_login'))
     
-    total_users = User.query.count()
-    total_uploads = Upload.query.count()
-    total_quizzes = QuizResult.query.count()
-    total_battles = QuizBattle.query.count()
-    total_subjects = Subject.query.count()
-    total_chapters = Chapter.query.count()
+    # Counts come from the TTL cache; the growth chart reads stored samples
+    stats = admin_stats.get()
     
     recent_users = User.query.order_by(User.created_at.desc()).limit(10).all()
-    recent_uploads = Upload.query.order_by(Upload.uploaded_at.desc()).limit(10).all()
+    recent_uploads = Upload.query.options(db.joinedload(Upload.user)).order_by(Upload.uploaded_at.desc()).limit(10).all()
     
-    return render_template('admin_panel.html',
-                         total_users=total_users,
-                         total_uploads=total_uploads,
-                         total_quizzes=total_quizzes,
-                         total_battles=total_battles,
-                         total_subjects=total_subjects,
-                         total_chapters=total_chapters,
+    return render_template('admin_dashboard.html',
                          recent_users=recent_users,
-                         recent_uploads=recent_uploads)
+                         recent_uploads=recent_uploads,
+                         stats_history=get_stat_history(),
+                         **stats)
+
+@app.route('/api/admin/stats')
+@query_budget(4)
+def api_admin_stats():
+    if not session.get('is_admin'):
+        abort(403)
+    
+    return jsonify({'stats': admin_stats.get(), 'history': get_stat_history()})
+
+@app.route('/api/admin/jobs')
+@query_budget(2)
+def api_admin_jobs():
+    if not session.get('is_admin'):
+        abort(403)
+    
+    return jsonify(scheduler.snapshot())
+
+@app.route('/metrics')
+@limiter.exempt
+def prometheus_metrics():
+    token = app.config['METRICS_TOKEN']
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            abort(403)
+    elif not session.get('is_admin') and not (
+        app.config['METRICS_ALLOW_LOOPBACK'] and request.remote_addr in ('127.0.0.1', '::1')
+    ):
+        # Without a token, only admins (and local scrapers, when explicitly allowed) may read it
+        abort(403)
+    
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/admin/admission')
+def api_admin_admission():
+    if not session.get('is_admin'):
+        abort(403)
+    
+    return jsonify({
+        'metrics': admission.metrics(),
+        'user_capacity': admission.user_capacity,
+        'user_refill_per_s': admission.user_rate,
+        'global_capacity': admission.global_capacity,
+        'global_refill_per_s': admission.global_rate
+    })
 
 @app.route('/admin/logout')
 def admin_logout():
@@ -1054,12 +1440,30 @@ def admin_logout():
     return redirect(url_for('home'))
 
 @app.route('/admin/users')
+@query_budget(3)
 def admin_users():
     if not session.get('is_admin'):
         return redirect(url_for('admin_login'))
     
-    users = User.query.order_by(User.score.desc()).all()
-    return render_template('admin_users.html', users=users)
+    page = paginate_keyset(User.query, User.score, User.id, request.args.get('after'))
+    total_users = db.session.query(db.func.count(User.id)).scalar()
+    return render_template('admin_users.html', users=page.items, next_cursor=page.next_cursor, total_users=total_users)
+
+@app.route('/api/admin/users')
+@query_budget(2)
+def api_admin_users():
+    if not session.get('is_admin'):
+        abort(403)
+    
+    page = paginate_keyset(User.query, User.score, User.id, request.args.get('after'))
+    return keyset_json(page, 'partials/admin_users.html', lambda user: {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'score': user.score,
+        'level': user.level,
+        'created_at': user.created_at.isoformat()
+    })
 
 @app.route('/admin/delete-user/<int:user_id>')
 def admin_delete_user(user_id):
@@ -1077,6 +1481,42 @@ def admin_delete_user(user_id):
     
     flash(f'✅ User {username} deleted successfully', 'success')
     return redirect(url_for('admin_users'))
+
+@app.route('/admin/profiles')
+def admin_profiles():
+    if not session.get('is_admin'):
+        return redirect(url_for('admin_login'))
+    
+    return render_template('admin_profiles.html', profiles=profiler.store.list(),
+                           selected=None, sample_rate=profiler.sample_rate, endpoints=sorted(profiler.endpoints))
+
+@app.route('/admin/profiles/<name>')
+def admin_profile(name):
+    if not session.get('is_admin'):
+        return redirect(url_for('admin_login'))
+    
+    try:
+        selected = profiler.store.load(name)
+    except ValueError:
+        abort(404)
+    if selected is None:
+        abort(404)
+    return render_template('admin_profiles.html', profiles=profiler.store.list(),
+                           selected=selected, sample_rate=profiler.sample_rate, endpoints=sorted(profiler.endpoints))
+
+@app.route('/admin/profiles/<name>.prof')
+def admin_profile_download(name):
+    if not session.get('is_admin'):
+        abort(403)
+    
+    try:
+        path = profiler.store.path(name, 'prof')
+    except ValueError:
+        abort(404)
+    if not os.path.exists(path):
+        abort(404)
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True, download_name=f'{name}.prof')
+
 # ================= Knowledge Base Routes =================
 @app.route('/knowledge-base')
 @login_required
@@ -1112,21 +1552,20 @@ def use_knowledge_topic(topic_id):
         return redirect(url_for('knowledge_base'))
     
     try:
-        text = topic['content']
-        
         summary_style = request.form.get('summary_style', 'paragraphs')
         summary_length = request.form.get('summary_length', 'medium')
         chapter_id = request.form.get('chapter_id')
         
-        cleaned_text = preprocess_text(text)
-        summary = summarize_text_with_style(cleaned_text, style=summary_style, length=summary_length)
+        # Summaries of the built-in topics are precomputed for every style and length
+        summary = get_topic_summary(topic_id, summary_style, summary_length)
         quiz = generate_quiz(summary)
         
         upload = Upload(
             filename=f"📚 {topic['title']}",
             summary=summary,
             user_id=current_user.id,
-            chapter_id=int(chapter_id) if chapter_id else None
+            chapter_id=int(chapter_id) if chapter_id else None,
+            source_hash=store_source_text(preprocess_text(topic['content']))
         )
         db.session.add(upload)
         db.session.commit()
@@ -1135,8 +1574,10 @@ def use_knowledge_topic(topic_id):
         session['quiz'] = quiz
         session['score'] = 0
         
+        schedule_mindmap(upload)
+        
         flash('✨ Knowledge topic processed successfully!', 'success')
-        return render_template('result.html', summary=summary, quiz=quiz)
+        return render_template('result.html', summary=summary, quiz=quiz, upload=upload)
         
     except Exception as e:
         flash(f'❌ Error processing topic: {str(e)}', 'danger')
@@ -1165,10 +1606,77 @@ def internal_error(error):
 
 @app.errorhandler(429)
 def ratelimit_handler(e):
-    flash('⚠️ Too many requests! Please wait a moment and try again.', 'warning')
-    return render_template('429.html', error=e), 429
+    if isinstance(e, AdmissionRejected):
+        g.admission_retry_after = e.retry_after
+        flash(f'⏳ {e.description}', 'warning')
+    else:
+        flash('⚠️ Too many requests! Please wait a moment and try again.', 'warning')
+    headers = {'Retry-After': str(e.retry_after)} if getattr(e, 'retry_after', None) else {}
+    return render_template('429.html', error=e), 429, headers
+
+@request_finished.connect_via(app)
+def restore_admission_retry_after(sender, response, **extra):
+    # Flask-Limiter rewrites Retry-After to its own window reset after every request;
+    # an admission rejection knows better when capacity will be back
+    retry_after = g.get('admission_retry_after')
+    if retry_after:
+        response.headers['Retry-After'] = str(retry_after)
 
 # ================= Run Server =================
+# ================= CLI Commands =================
+@app.cli.command('repair-counters')
+def repair_counters_command():
+    """Recompute review, upload and chapter counters from the source tables"""
+    for counter, rows in repair_counters(app).items():
+        print(f"🔧 {counter}: {rows} rows repaired")
+
+@app.cli.command('backfill-normalized')
+@click.option('--batch-size', default=5000, show_default=True)
+def backfill_normalized_command(batch_size):
+    """Fill the lowercase username/email lookup columns for users created before they existed"""
+    result = backfill_normalized_identities(app, batch_size=batch_size)
+    for column, rows in result['updated'].items():
+        print(f"🔧 {column}: {rows} users backfilled")
+    for column, user_ids in result['conflicts'].items():
+        if user_ids:
+            print(f"⚠️ {column}: {len(user_ids)} users collide with another user once lowercased and were left empty "
+                  f"(still found through the original column): {', '.join(map(str, user_ids))}")
+
+@app.cli.command('backfill-mindmap-keys')
+@click.option('--batch-size', default=500, show_default=True)
+def backfill_mindmap_keys_command(batch_size):
+    """Point uploads' stored mind map keys at the map of their source text (keys from before it was used name the summary's map)"""
+    print(f"🔧 {backfill_mindmap_keys(batch_size=batch_size)} mind map keys updated")
+
+@app.cli.command('run-jobs')
+def run_jobs_command():
+    """Run every maintenance job that is due and not leased by a running worker"""
+    ran = scheduler.run_pending()
+    print(f"🕒 Ran {len(ran)} job(s): {', '.join(ran) or 'none due'}")
+
+@app.cli.command('generate-data')
+@click.option('--users', default=1000, show_default=True, help='Users to create')
+@click.option('--subjects', default=2.0, show_default=True, help='Average subjects per user')
+@click.option('--chapters', default=3.0, show_default=True, help='Average chapters per subject')
+@click.option('--uploads', default=3.0, show_default=True, help='Average uploads per user')
+@click.option('--quiz-results', default=20.0, show_default=True, help='Average quiz results per user')
+@click.option('--reviews', default=1.0, show_default=True, help='Reviews of shared uploads per user')
+@click.option('--battles', default=0.1, show_default=True, help='Quiz battles per user')
+@click.option('--seed', default=42, show_default=True)
+@click.option('--yes', is_flag=True, help='Do not ask before adding to a database that already has users')
+def generate_data_command(users, subjects, chapters, uploads, quiz_results, reviews, battles, seed, yes):
+    """Bulk-load synthetic users and activity for capacity testing (never run against production)"""
+    from utils.synthetic_data import generate_data, SYNTHETIC_PASSWORD
+    if not yes and User.query.first() is not None:
+        click.confirm(f"{app.config['SQLALCHEMY_DATABASE_URI']} already has users. Add synthetic data anyway?", abort=True)
+    started = datetime.now()
+    counts = generate_data(app, users=users, subjects_per_user=subjects, chapters_per_subject=chapters,
+                           uploads_per_user=uploads, quiz_results_per_user=quiz_results,
+                           reviews_per_user=reviews, battles_per_user=battles, seed=seed)
+    for table, rows in counts.items():
+        print(f"📦 {table}: {rows} rows")
+    print(f"✅ Generated in {(datetime.now() - started).total_seconds():.1f}s; password for every user: {SYNTHETIC_PASSWORD}")
+
 if __name__ == '__main__':
     print("=" * 60)
     print("🚀 VORTEX - AI-Powered Learning Platform")
@@ -0,0 +1,121 @@
+"""
+Logging overhead benchmark: request throughput with logging off, on, and synchronous
+Each mode runs in its own process (logging is configured when app.py is
+imported) against a throwaway database, with stdout redirected to a file the
+way gunicorn's output usually is. Reports requests per second for a cheap
+page and for /summarize on pasted text, how long the log queue took to
+drain afterwards (and how many records a full queue dropped), and the cost of a single disabled or enabled logger call.
+
+Usage:
+    python benchmarks/bench_logging.py [--requests 2000] [--summaries 200] [--calls 200000]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    'off': {'LOG_LEVEL': 'CRITICAL', 'LOG_ASYNC': '1'},
+    'info (queue)': {'LOG_LEVEL': 'INFO', 'LOG_ASYNC': '1'},
+    'debug (queue)': {'LOG_LEVEL': 'DEBUG', 'LOG_ASYNC': '1'},
+    'debug (sync)': {'LOG_LEVEL': 'DEBUG', 'LOG_ASYNC': '0'},
+}
+
+TEXT = ('Photosynthesis is the process by which green plants use sunlight to synthesize food '
+        'from carbon dioxide and water, releasing oxygen as a by-product. ') * 15
+
+
+def run_child(args):
+    sys.path.insert(0, ROOT)
+    import logging
+    from app import app, db, limiter, log_pipeline, User
+
+    limiter.enabled = False
+    with app.app_context():
+        user = User(username='bench', email='bench@example.com', password='x')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    client = app.test_client()
+    result = {}
+
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        client.get('/login')
+    result['login_rps'] = round(args.requests / (time.perf_counter() - start), 1)
+
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    start = time.perf_counter()
+    for _ in range(args.summaries):
+        client.post('/summarize', data={'text': TEXT, 'summary_style': 'bullets', 'summary_length': 'short'})
+    result['summarize_rps'] = round(args.summaries / (time.perf_counter() - start), 1)
+
+    logger = logging.getLogger('app')
+    start = time.perf_counter()
+    for i in range(args.calls):
+        logger.debug('📊 Final text length: %d chars', i)
+    result['debug_call_ns'] = round((time.perf_counter() - start) * 1e9 / args.calls, 1)
+
+    start = time.perf_counter()
+    log_pipeline.stop()
+    result['drain_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    result['dropped'] = log_pipeline.stats()['dropped']
+
+    with open(args.result, 'w') as f:
+        json.dump(result, f)
+
+
+def run(name, overrides, args):
+    workdir = tempfile.mkdtemp()
+    env = dict(os.environ, **overrides,
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+               RATELIMIT_STORAGE_URI='memory://',
+               ADMISSION_ENABLED='0',
+               ADMISSION_STORAGE_PATH=os.path.join(workdir, 'admission.db'),
+               METRICS_DIR=os.path.join(workdir, 'metrics'),
+               SCHEDULER_ENABLED='0')
+    result_path = os.path.join(workdir, 'result.json')
+    log_path = os.path.join(workdir, 'stdout.log')
+    with open(log_path, 'w') as log:
+        subprocess.run(
+            [sys.executable, __file__, '--child', '--result', result_path,
+             '--requests', str(args.requests), '--summaries', str(args.summaries), '--calls', str(args.calls)],
+            env=env, stdout=log, check=True
+        )
+    with open(result_path) as f:
+        result = json.load(f)
+    with open(log_path, encoding='utf-8', errors='ignore') as f:
+        result['log_lines'] = sum(1 for _ in f)
+    return {'mode': name, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--summaries', type=int, default=200)
+    parser.add_argument('--calls', type=int, default=200000)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    results = [run(name, overrides, args) for name, overrides in MODES.items()]
+    for row in results:
+        print(f"{row['mode']:<14} /login {row['login_rps']:>8} req/s   /summarize {row['summarize_rps']:>6} req/s   "
+              f"logger.debug {row['debug_call_ns']:>7} ns   drain {row['drain_ms']} ms   "
+              f"{row['log_lines']} lines, {row['dropped']} dropped")
+    print(json.dumps(results))
+
+
+if __name__ == '__main__':
+    main()
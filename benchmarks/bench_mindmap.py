@@ -0,0 +1,57 @@
+"""
+Mind map renderer benchmark
+Compares the matplotlib PNG renderer with the radial SVG/JSON renderer.
+
+Usage:
+    python benchmarks/bench_mindmap.py [--repeat 5]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.visualize import create_mindmap, build_mindmap_tree, render_mindmap_svg, mindmap_to_json
+
+KEYWORDS = ['Photosynthesis', 'Chlorophyll', 'Oxygen', 'Glucose', 'Stomata', 'Energy']
+
+
+def time_call(func, repeat):
+    """Best-of-N wall time in milliseconds, plus the last result"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    tree = build_mindmap_tree(KEYWORDS)
+    output_path = os.path.join(tempfile.mkdtemp(), 'mindmap.png')
+
+    png_ms, _ = time_call(lambda: create_mindmap(KEYWORDS, output_path=output_path), max(1, args.repeat // 2))
+    svg_ms, svg = time_call(lambda: render_mindmap_svg(tree), args.repeat * 20)
+    json_ms, data = time_call(lambda: json.dumps(mindmap_to_json(tree)), args.repeat * 20)
+
+    results = [
+        {'renderer': 'create_mindmap (PNG, spring layout)', 'ms': round(png_ms, 2), 'bytes': os.path.getsize(output_path)},
+        {'renderer': 'render_mindmap_svg (radial)', 'ms': round(svg_ms, 3), 'bytes': len(svg.encode('utf-8'))},
+        {'renderer': 'mindmap_to_json (radial)', 'ms': round(json_ms, 3), 'bytes': len(data.encode('utf-8'))},
+    ]
+
+    for row in results:
+        print(f"{row['renderer']:<40} {row['ms']:>10} ms {row['bytes']:>10} bytes")
+    print(json.dumps(results))
+
+
+if __name__ == '__main__':
+    main()
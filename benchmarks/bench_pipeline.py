@@ -0,0 +1,274 @@
+"""
+Processing pipeline benchmark suite
+Times every stage of /summarize on its own: text extraction for each upload
+format, preprocessing, summarizing in every style and length, keyword
+extraction, quiz generation, mind maps and the chart renderers. Inputs are
+built deterministically from the KNOWLEDGE_BASE corpus: single topics,
+synthetic documents of increasing size, and TXT/PDF/DOCX/PPTX files
+generated from them.
+
+Results are written as JSON (with the commit they were measured on), and a
+previous results file can be passed to --compare to flag regressions.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--repeat 5] [--filter summarize] [--output results.json]
+    python benchmarks/bench_pipeline.py --compare baseline.json [--threshold 1.2]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.extraction import extract_text_from_file
+from utils.preprocessing import preprocess_text
+from utils.summarizer import summarize_text_with_style, extract_keywords, SUMMARY_STYLES, SUMMARY_LENGTHS
+from utils.quiz import generate_quiz
+from utils.visualize import create_mindmap, get_mindmap_tree, render_mindmap_svg
+from utils.visualization import (create_bar_chart, create_pie_chart, create_line_chart,
+                                 create_table_visualization, analyze_quiz_performance)
+from utils.knowledge_base import KNOWLEDGE_BASE
+
+# Approximate sizes of the synthetic documents, in characters
+DOCUMENT_SIZES = {'small': 2000, 'medium': 10000, 'large': 50000}
+
+
+# ---------- fixtures ----------
+def synthetic_document(size, seed=42):
+    """Knowledge-base paragraphs in a seeded random order until the document reaches size characters"""
+    rng = random.Random(seed)
+    paragraphs = [p.strip() for item in KNOWLEDGE_BASE.values() for p in item['content'].split('\n\n') if p.strip()]
+    chosen, total = [], 0
+    while total < size:
+        paragraph = rng.choice(paragraphs)
+        chosen.append(paragraph)
+        total += len(paragraph) + 2
+    return '\n\n'.join(chosen)[:size]
+
+
+def _pdf_escape(line):
+    line = line.encode('latin-1', 'replace').decode('latin-1')
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_pdf(path, text, lines_per_page=50, width=90):
+    """Minimal text-only PDF (Helvetica, one content stream per page), readable by PyPDF2"""
+    lines = []
+    for paragraph in text.split('\n'):
+        while len(paragraph) > width:
+            cut = paragraph.rfind(' ', 0, width)
+            cut = cut if cut > 0 else width
+            lines.append(paragraph[:cut])
+            paragraph = paragraph[cut:].lstrip()
+        lines.append(paragraph)
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    # Objects: 1 catalog, 2 page tree, 3 font, then a page and its content stream per page
+    objects = {1: b'<< /Type /Catalog /Pages 2 0 R >>', 3: b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>'}
+    kids = []
+    for number, page_lines in enumerate(pages):
+        page_id, content_id = 4 + 2 * number, 5 + 2 * number
+        body = 'BT /F1 10 Tf 14 TL 50 780 Td ' + ' '.join(f'({_pdf_escape(line)}) Tj T*' for line in page_lines) + ' ET'
+        stream = body.encode('latin-1')
+        objects[content_id] = b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream)
+        objects[page_id] = (b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] '
+                            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % content_id)
+        kids.append(b'%d 0 R' % page_id)
+    objects[2] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(kids), len(kids))
+
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(output)
+        output += b'%d 0 obj\n%s\nendobj\n' % (object_id, objects[object_id])
+    xref = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for object_id in sorted(objects):
+        output += b'%010d 00000 n \n' % offsets[object_id]
+    output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    with open(path, 'wb') as f:
+        f.write(output)
+
+
+def write_docx(path, text):
+    import docx
+    document = docx.Document()
+    for paragraph in text.split('\n'):
+        if paragraph.strip():
+            document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def write_pptx(path, text, slides=12, bullets=6):
+    from pptx import Presentation
+    presentation = Presentation()
+    lines = [line.strip() for line in text.split('\n') if 10 < len(line.strip()) < 200]
+    for number in range(slides):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+        slide.shapes.title.text = f'Section {number + 1}'
+        frame = slide.placeholders[1].text_frame
+        chunk = lines[number * bullets:(number + 1) * bullets] or ['Summary of the section']
+        frame.text = chunk[0]
+        for line in chunk[1:]:
+            frame.add_paragraph().text = line
+    presentation.save(path)
+
+
+def build_files(folder, text):
+    paths = {}
+    for ext, write in (('pdf', write_pdf), ('docx', write_docx), ('pptx', write_pptx)):
+        paths[ext] = os.path.join(folder, f'document.{ext}')
+        write(paths[ext], text)
+    paths['txt'] = os.path.join(folder, 'document.txt')
+    with open(paths['txt'], 'w', encoding='utf-8') as f:
+        f.write(text)
+    return paths
+
+
+class FakeResult:
+    """Stand-in for QuizResult rows passed to analyze_quiz_performance"""
+
+    def __init__(self, score, completed_at):
+        self.score = score
+        self.completed_at = completed_at
+
+
+# ---------- cases ----------
+def build_cases(folder):
+    """(name, group, callable) for every benchmarked call"""
+    documents = {name: synthetic_document(size) for name, size in DOCUMENT_SIZES.items()}
+    medium = documents['medium']
+    files = build_files(folder, documents['large'])
+    keywords = extract_keywords(medium, num_keywords=8)
+    tree = get_mindmap_tree(summarize_text_with_style(medium, 'paragraphs', 'medium'))
+    rng = random.Random(7)
+    results = [FakeResult(rng.randint(0, 10), datetime(2026, 1, 1) + timedelta(days=i)) for i in range(30)]
+    chart_path = os.path.join(folder, 'chart.png')
+
+    cases = []
+    for ext in ('txt', 'pdf', 'docx', 'pptx'):
+        cases.append((f'extract_text_from_file/{ext}', 'extract', lambda ext=ext: extract_text_from_file(files[ext], ext)))
+    for name, text in documents.items():
+        cases.append((f'preprocess_text/{name}', 'preprocess', lambda text=text: preprocess_text(text)))
+    for style in SUMMARY_STYLES:
+        for length in SUMMARY_LENGTHS:
+            cases.append((f'summarize_text_with_style/{style}/{length}', 'summarize',
+                          lambda style=style, length=length: summarize_text_with_style(medium, style, length)))
+    cases.append(('summarize_text_with_style/paragraphs/medium/large', 'summarize',
+                  lambda: summarize_text_with_style(documents['large'], 'paragraphs', 'medium')))
+    for name, text in documents.items():
+        cases.append((f'extract_keywords/{name}', 'keywords', lambda text=text: extract_keywords(text)))
+        cases.append((f'generate_quiz/{name}', 'quiz', lambda text=text: generate_quiz(text)))
+    cases += [
+        ('get_mindmap_tree/medium', 'mindmap', lambda: get_mindmap_tree(medium)),
+        ('render_mindmap_svg', 'mindmap', lambda: render_mindmap_svg(tree)),
+        ('create_mindmap (PNG)', 'mindmap', lambda: create_mindmap(keywords, output_path=chart_path)),
+        ('create_bar_chart', 'charts', lambda: create_bar_chart(
+            [f'Quiz {i}' for i in range(12)], [r.score for r in results[:12]], output_path=chart_path)),
+        ('create_pie_chart', 'charts', lambda: create_pie_chart(
+            ['Correct', 'Wrong', 'Skipped'], [62, 30, 8], output_path=chart_path)),
+        ('create_line_chart', 'charts', lambda: create_line_chart(
+            list(range(30)), [r.score for r in results], output_path=chart_path)),
+        ('create_table_visualization', 'charts', lambda: create_table_visualization(
+            {'columns': ['Quiz', 'Score', 'Date'],
+             'values': [[f'Quiz {i}', r.score, r.completed_at.strftime('%m/%d')] for i, r in enumerate(results[:10])]},
+            output_path=chart_path)),
+        ('analyze_quiz_performance', 'charts', lambda: analyze_quiz_performance(results)),
+    ]
+    return cases
+
+
+# ---------- running ----------
+def measure(func, repeat, warmup=1):
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'stdev_ms': round(statistics.stdev(timings), 3) if len(timings) > 1 else 0.0,
+        'repeat': repeat,
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+    }
+
+
+def compare(results, baseline_path, threshold):
+    """Print median ratios against a previous run; returns the names that got slower than threshold"""
+    with open(baseline_path) as f:
+        baseline = {row['name']: row for row in json.load(f)['results']}
+    regressions = []
+    for row in results:
+        previous = baseline.get(row['name'])
+        if not previous or not previous['median_ms']:
+            continue
+        ratio = row['median_ms'] / previous['median_ms']
+        flag = ''
+        if ratio > threshold:
+            flag = '  <-- slower'
+            regressions.append(row['name'])
+        elif ratio < 1 / threshold:
+            flag = '  faster'
+        print(f"{row['name']:<52} {previous['median_ms']:>10} -> {row['median_ms']:>10} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--filter', default='', help='only run cases whose name contains this text')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--compare', help='results JSON of an earlier run to compare medians against')
+    parser.add_argument('--threshold', type=float, default=1.2, help='median ratio counted as a regression')
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    results = []
+    for name, group, func in build_cases(folder):
+        if args.filter and args.filter not in name:
+            continue
+        row = {'name': name, 'group': group, **measure(func, args.repeat)}
+        results.append(row)
+        print(f"{name:<52} median {row['median_ms']:>10} ms   min {row['min_ms']:>10} ms   ±{row['stdev_ms']}")
+
+    report = {'environment': environment(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    regressions = compare(results, args.compare, args.threshold) if args.compare else []
+    print(json.dumps(report))
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than x{args.threshold}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
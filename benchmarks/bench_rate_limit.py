@@ -0,0 +1,101 @@
+"""
+Rate-limit storage benchmark: per-process memory:// vs the shared sqlite:// backend
+Worker processes (like gunicorn workers) hit the same limits through the
+fixed-window strategy Flask-Limiter uses. Reports limiter checks per second,
+per-check latency, and how many hits each backend admitted against a limit
+that should hold across all processes.
+
+Usage:
+    python benchmarks/bench_rate_limit.py [--processes 4] [--seconds 5] [--keys 100]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+import utils.rate_limit_storage  # registers sqlite://
+
+# Every process hammers one shared key with this limit; a correct shared
+# backend admits exactly LIMIT hits in total, memory:// admits LIMIT per process
+SHARED_LIMIT = parse('500 per hour')
+# Typical request: the two default limits plus a route limit on a per-client key
+REQUEST_LIMITS = [parse('200 per day'), parse('50 per hour'), parse('20 per hour')]
+
+
+def worker(uri, seconds, keys, seed, queue):
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    latencies, admitted, checks = [], 0, 0
+    client = seed
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        admitted += limiter.hit(SHARED_LIMIT, 'shared')
+        for item in REQUEST_LIMITS:
+            limiter.hit(item, f'client-{client}')
+        latencies.append((time.perf_counter() - start) * 1000 / (1 + len(REQUEST_LIMITS)))
+        checks += 1 + len(REQUEST_LIMITS)
+        client = (client + 7) % keys
+    queue.put((latencies, admitted, checks))
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))], 4)
+
+
+def run(name, uri, args):
+    queue = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(uri, args.seconds, args.keys, seed, queue))
+        for seed in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    latencies = [ms for values, _, _ in outcomes for ms in values]
+    return {
+        'backend': name,
+        'processes': args.processes,
+        'checks_per_s': round(sum(checks for _, _, checks in outcomes) / args.seconds, 1),
+        'check_p50_ms': percentile(latencies, 0.5),
+        'check_p99_ms': percentile(latencies, 0.99),
+        'shared_limit': SHARED_LIMIT.amount,
+        'shared_admitted': sum(admitted for _, admitted, _ in outcomes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--keys', type=int, default=100)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'ratelimit.db')
+    results = [
+        run('memory:// (per process)', 'memory://', args),
+        run('sqlite:// (shared)', f'sqlite:///{path}', args),
+    ]
+
+    for row in results:
+        print(f"{row['backend']:<26} {row['checks_per_s']:>10} checks/s   p50 {row['check_p50_ms']} ms   "
+              f"p99 {row['check_p99_ms']} ms   admitted {row['shared_admitted']} of {row['shared_limit']}")
+    print(json.dumps(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Database hot-path benchmark for the heaviest read pages
+Drives /leaderboard, /search, /analytics, /shared-library and /admin/panel
+through the Flask test client against a database filled by the synthetic
+data generator (the same one `flask generate-data` uses). Requests rotate
+through a sample of users, since /analytics depends on how much history a
+user has. Reports latency percentiles and SQL queries per request for each
+route.
+
+Usage:
+    python benchmarks/bench_routes.py [--users 10000] [--requests 200]
+    python benchmarks/bench_routes.py --database /tmp/vortex-100k.db   # reuse a generated database
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SEARCH_TERMS = ['photosynthesis', 'python', 'calculus', 'cell membrane', 'shakespeare', 'energy', 'zzqx']
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))], 2)
+
+
+def configure(database, workdir):
+    """Point the app at the benchmark database before app.py is imported"""
+    os.environ.update({
+        'DATABASE_URL': f'sqlite:///{os.path.abspath(database)}',
+        'RATELIMIT_STORAGE_URI': 'memory://',
+        'ADMISSION_STORAGE_PATH': os.path.join(workdir, 'admission.db'),
+        'METRICS_DIR': os.path.join(workdir, 'metrics'),
+        'SCHEDULER_ENABLED': '0',
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING'),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', help='SQLite file to use; generated at --users scale when it has no users')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--quiz-results', type=float, default=20, help='average quiz results per generated user')
+    parser.add_argument('--requests', type=int, default=200, help='requests per route')
+    parser.add_argument('--sample-users', type=int, default=100, help='distinct users the requests rotate through')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    configure(args.database or os.path.join(workdir, 'bench.db'), workdir)
+
+    from app import app, db, limiter, User
+    from utils.synthetic_data import generate_data
+
+    limiter.enabled = False
+    app.config['QUERY_COUNT_HEADER'] = True
+
+    with app.app_context():
+        empty = User.query.first() is None
+    if empty:
+        start = time.perf_counter()
+        counts = generate_data(app, users=args.users, quiz_results_per_user=args.quiz_results, seed=args.seed)
+        print(f"generated {counts} in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        user_count = User.query.count()
+        max_id = db.session.query(db.func.max(User.id)).scalar()
+    user_ids = [rng.randint(1, max_id) for _ in range(args.sample_users)]
+
+    routes = [
+        ('leaderboard', None, lambda i: '/leaderboard'),
+        ('search', 'user', lambda i: f'/search?q={SEARCH_TERMS[i % len(SEARCH_TERMS)]}'),
+        ('analytics', 'user', lambda i: '/analytics'),
+        ('shared_library', 'user', lambda i: '/shared-library'),
+        ('shared_library (rating)', 'user', lambda i: '/shared-library?sort=rating'),
+        ('admin_panel', 'admin', lambda i: '/admin/panel'),
+    ]
+
+    client = app.test_client()
+    client.get('/leaderboard')  # warm up templates and the connection pool
+    results = []
+    for name, identity, path in routes:
+        latencies, queries, errors = [], [], 0
+        for i in range(args.requests):
+            with client.session_transaction() as session:
+                session.clear()
+                if identity == 'user':
+                    session['_user_id'] = str(user_ids[i % len(user_ids)])
+                elif identity == 'admin':
+                    session['is_admin'] = True
+            start = time.perf_counter()
+            response = client.get(path(i))
+            latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(int(response.headers.get('X-Query-Count', 0)))
+            errors += response.status_code >= 400
+        results.append({
+            'route': name,
+            'requests': args.requests,
+            'p50_ms': percentile(latencies, 0.5),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'max_ms': round(max(latencies), 2),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+            'errors': errors,
+        })
+
+    print(f"users: {user_count}")
+    for row in results:
+        print(f"{row['route']:<24} p50 {row['p50_ms']:>8} ms   p95 {row['p95_ms']:>8} ms   p99 {row['p99_ms']:>8} ms   "
+              f"queries {row['queries_mean']:>6} (max {row['queries_max']})   errors {row['errors']}")
+    print(json.dumps({'users': user_count, 'results': results}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Upload search benchmark: FTS5 + BM25 vs LIKE '%q%'
+Builds a synthetic corpus of shared uploads in a throwaway SQLite database.
+
+Usage:
+    python benchmarks/bench_search.py [--rows 1000000] [--repeat 5]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import text
+
+from models import db, Upload
+from utils.search_index import init_upload_search, search_uploads
+from utils.knowledge_base import KNOWLEDGE_BASE
+
+QUERIES = ['calculus', 'cell blood', 'python programming', 'shakespeare', 'zzqx']
+
+
+def build_corpus(rows, batch=20000, seed=42):
+    """Synthetic summaries sampled from the knowledge base vocabulary"""
+    rng = random.Random(seed)
+    words = sorted({w.strip('.,:;()').lower() for item in KNOWLEDGE_BASE.values() for w in item['content'].split() if len(w) > 3})
+    titles = [item['title'] for item in KNOWLEDGE_BASE.values()]
+
+    for start in range(0, rows, batch):
+        yield [
+            {
+                'filename': f"{rng.choice(titles)} notes {i}.pdf",
+                'summary': ' '.join(rng.choice(words) for _ in range(rng.randint(40, 90))) + '.',
+                'is_shared': 1,
+                'user_id': 1,
+            }
+            for i in range(start, min(start + batch, rows))
+        ]
+
+
+def time_query(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(min(timings), 2), round(sorted(timings)[len(timings) // 2], 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_search.db')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        init_upload_search(app, db)
+
+        start = time.perf_counter()
+        insert = text("INSERT INTO upload (filename, summary, is_shared, user_id) VALUES (:filename, :summary, :is_shared, :user_id)")
+        for rows in build_corpus(args.rows):
+            db.session.execute(insert, rows)
+            db.session.commit()
+        load_seconds = time.perf_counter() - start
+        print(f"Loaded {args.rows:,} uploads (indexed by triggers) in {load_seconds:.1f}s")
+
+        results = []
+        for query in QUERIES:
+            def like():
+                return Upload.query.filter(
+                    db.or_(Upload.filename.contains(query), Upload.summary.contains(query))
+                ).filter_by(is_shared=True).all()
+
+            def fts():
+                return search_uploads(db, query)
+
+            _, like_median = time_query(like, args.repeat)
+            _, fts_median = time_query(fts, args.repeat)
+            results.append({
+                'query': query,
+                'like_matches': len(like()),
+                'like_ms': like_median,
+                'fts_page_ms': fts_median,
+                'speedup': round(like_median / fts_median, 1) if fts_median else None,
+            })
+            print(f"{query!r:<22} LIKE {like_median:>9} ms ({results[-1]['like_matches']} rows)   FTS5 first page {fts_median:>8} ms")
+
+    print(json.dumps({'rows': args.rows, 'results': results}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+SQLite concurrency benchmark: default rollback journal vs the tuned PRAGMAs
+Reader and writer processes (like gunicorn workers) share one database file.
+Writers insert quiz results one commit at a time; readers run the dashboard
+count and first-page queries.
+
+Usage:
+    python benchmarks/bench_sqlite_concurrency.py [--readers 4] [--writers 2] [--seconds 5]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+from config import Config
+from utils.sqlite_tuning import apply_pragmas
+
+SCHEMA = [
+    "CREATE TABLE quiz_result (id INTEGER PRIMARY KEY, score INTEGER NOT NULL, total_questions INTEGER NOT NULL, "
+    "completed_at DATETIME NOT NULL, user_id INTEGER NOT NULL)",
+    "CREATE INDEX ix_quiz_result_user_completed_at ON quiz_result (user_id, completed_at)",
+]
+USERS = 100
+
+
+def make_engine(path, pragmas):
+    engine = create_engine(f'sqlite:///{path}')
+    if pragmas:
+        event.listen(engine, 'connect', lambda dbapi_connection, record: apply_pragmas(dbapi_connection, pragmas))
+    return engine
+
+
+def setup(path, pragmas, rows=20000):
+    engine = make_engine(path, pragmas)
+    with engine.begin() as conn:
+        for statement in SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(
+            text("INSERT INTO quiz_result (score, total_questions, completed_at, user_id) "
+                 "VALUES (:score, 5, datetime('now', :offset), :user_id)"),
+            [{'score': i % 50, 'offset': f'-{i} minutes', 'user_id': i % USERS} for i in range(rows)]
+        )
+    engine.dispose()
+
+
+def worker(role, path, pragmas, seconds, seed, queue):
+    engine = make_engine(path, pragmas)
+    latencies, errors = [], 0
+    user_id = seed % USERS
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if role == 'writer':
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("INSERT INTO quiz_result (score, total_questions, completed_at, user_id) "
+                             "VALUES (:score, 5, datetime('now'), :user_id)"),
+                        {'score': seed % 50, 'user_id': user_id}
+                    )
+            else:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT count(*), avg(score) FROM quiz_result WHERE user_id = :u"), {'u': user_id}).one()
+                    conn.execute(text("SELECT * FROM quiz_result WHERE user_id = :u ORDER BY completed_at DESC, id DESC LIMIT 21"),
+                                 {'u': user_id}).all()
+            latencies.append((time.perf_counter() - start) * 1000)
+        except OperationalError:
+            errors += 1
+        user_id = (user_id + 7) % USERS
+    engine.dispose()
+    queue.put((role, latencies, errors))
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))], 2)
+
+
+def run(mode, pragmas, args):
+    path = os.path.join(tempfile.mkdtemp(), f'{mode}.db')
+    setup(path, pragmas)
+
+    queue = multiprocessing.Queue()
+    roles = ['reader'] * args.readers + ['writer'] * args.writers
+    processes = [
+        multiprocessing.Process(target=worker, args=(role, path, pragmas, args.seconds, seed, queue))
+        for seed, role in enumerate(roles)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    result = {'mode': mode}
+    for role in ('reader', 'writer'):
+        latencies = [ms for r, values, _ in outcomes if r == role for ms in values]
+        result[f'{role}_ops_per_s'] = round(len(latencies) / args.seconds, 1)
+        result[f'{role}_p50_ms'] = percentile(latencies, 0.5)
+        result[f'{role}_p99_ms'] = percentile(latencies, 0.99)
+        result[f'{role}_errors'] = sum(errors for r, _, errors in outcomes if r == role)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    results = [
+        run('default (rollback journal, synchronous=FULL)', {}, args),
+        run('tuned (Config.SQLITE_PRAGMAS)', Config.SQLITE_PRAGMAS, args),
+    ]
+
+    for row in results:
+        print(row['mode'])
+        for role in ('reader', 'writer'):
+            print(f"  {role:<7} {row[f'{role}_ops_per_s']:>10} ops/s   p50 {row[f'{role}_p50_ms']} ms   "
+                  f"p99 {row[f'{role}_p99_ms']} ms   errors {row[f'{role}_errors']}")
+    print(json.dumps(results))
+
+
+if __name__ == '__main__':
+    main()
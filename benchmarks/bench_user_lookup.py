@@ -0,0 +1,132 @@
+"""
+Case-insensitive user lookup benchmark
+Compares the login/register lookups before and after the lowercase lookup
+columns: `username ILIKE ?` (SQLite compiles it to lower(x) LIKE lower(?),
+a full table scan) against User.find_by_username/find_by_email (a unique
+index search, plus an indexed look at unfilled rows when it misses).
+Names are looked up in mixed case, with some misses, which is the normal
+registration case. Password hashing is left out, since it costs the same
+either way.
+
+Also times `backfill_normalized_identities` over the whole table, which is
+the one-off migration cost for an existing database.
+
+Usage:
+    python benchmarks/bench_user_lookup.py [--users 1000000] [--lookups 200]
+    python benchmarks/bench_user_lookup.py --database /tmp/vortex-1m.db   # reuse a generated database
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))], 3)
+
+
+def mixed_case(name, rng):
+    return ''.join(c.upper() if rng.random() < 0.5 else c for c in name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', help='SQLite file to use; generated at --users scale when it has no users')
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=200, help='lookups per query shape')
+    parser.add_argument('--skip-backfill', action='store_true', help='do not time the backfill')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.abspath(args.database or os.path.join(workdir, 'bench.db'))}",
+        'RATELIMIT_STORAGE_URI': 'memory://',
+        'ADMISSION_STORAGE_PATH': os.path.join(workdir, 'admission.db'),
+        'METRICS_DIR': os.path.join(workdir, 'metrics'),
+        'SCHEDULER_ENABLED': '0',
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING'),
+    })
+
+    from app import app, db, User
+    from models import backfill_normalized_identities
+    from utils.synthetic_data import generate_data, SYNTHETIC_EMAIL_DOMAIN
+
+    with app.app_context():
+        empty = User.query.first() is None
+    if empty:
+        start = time.perf_counter()
+        generate_data(app, users=args.users, subjects_per_user=0, uploads_per_user=0, quiz_results_per_user=0,
+                      reviews_per_user=0, battles_per_user=0, seed=args.seed)
+        print(f"generated {args.users} users in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        user_count = User.query.count()
+        max_id = db.session.query(db.func.max(User.id)).scalar()
+        names = [row.username for row in User.query.filter(
+            User.id.in_([rng.randint(1, max_id) for _ in range(args.lookups)])).all()]
+        names += [f'nobody{n}' for n in range(max(1, len(names) // 4))]
+        rng.shuffle(names)
+        names = [mixed_case(name, rng) for name in names]
+        emails = [mixed_case(f'{name}@{SYNTHETIC_EMAIL_DOMAIN}', rng) for name in names]
+
+        shapes = [
+            ('username ilike (before)', lambda name, email: User.query.filter(User.username.ilike(name)).first()),
+            ('find_by_username (after)', lambda name, email: User.find_by_username(name)),
+            ('register checks ilike (before)', lambda name, email: (
+                User.query.filter(User.username.ilike(name)).first(),
+                User.query.filter(User.email.ilike(email)).first())),
+            ('register checks find_by (after)', lambda name, email: (User.find_by_username(name), User.find_by_email(email))),
+        ]
+
+        def query_plan(query):
+            sql = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+            return db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')).all()[0][-1]
+
+        plans = {
+            'before': query_plan(User.query.filter(User.username.ilike('learner1'))),
+            'after': query_plan(User.query.filter_by(username_lower='learner1')),
+        }
+
+        results = []
+        for label, lookup in shapes:
+            # The scans are slow at this size, so they get a tenth of the lookups
+            sample = names if '(after)' in label else names[:max(10, len(names) // 10)]
+            latencies = []
+            for name, email in zip(sample, emails):
+                start = time.perf_counter()
+                lookup(name, email)
+                latencies.append((time.perf_counter() - start) * 1000)
+                db.session.rollback()
+            results.append({'lookup': label, 'count': len(latencies), 'p50_ms': percentile(latencies, 0.5),
+                            'p95_ms': percentile(latencies, 0.95), 'mean_ms': round(sum(latencies) / len(latencies), 3)})
+
+        backfill = None
+        if not args.skip_backfill:
+            db.session.execute(User.__table__.update().values(username_lower=None, email_lower=None))
+            db.session.commit()
+            start = time.perf_counter()
+            outcome = backfill_normalized_identities(app)
+            backfill = {'seconds': round(time.perf_counter() - start, 1), 'updated': outcome['updated'],
+                        'conflicts': {column: len(ids) for column, ids in outcome['conflicts'].items()}}
+
+    print(f"users: {user_count}")
+    print(f"plan before: {plans['before']}\nplan after:  {plans['after']}")
+    for row in results:
+        print(f"{row['lookup']:<32} {row['count']:>5} lookups   p50 {row['p50_ms']:>9} ms   "
+              f"p95 {row['p95_ms']:>9} ms   mean {row['mean_ms']:>9} ms")
+    if backfill:
+        print(f"backfill: {backfill['updated']} rows in {backfill['seconds']}s (conflicts {backfill['conflicts']})")
+    print(json.dumps({'users': user_count, 'plans': plans, 'results': results, 'backfill': backfill}))
+
+
+if __name__ == '__main__':
+    main()
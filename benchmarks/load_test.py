@@ -0,0 +1,271 @@
+"""
+Load test that replays complete user sessions
+Each virtual user repeatedly walks the main journey as a new account:
+register -> login -> summarize -> quiz -> leaderboard -> battles (list,
+create, submit). Virtual users run concurrently for a fixed time, and the
+run reports throughput, p50/p95/p99 latency and error rate per endpoint.
+
+By default the script starts its own gunicorn on 127.0.0.1 with a
+throwaway SQLite database, rate limits off (every virtual user comes from
+one address) and the production admission settings, then stops it. Pass
+--url to aim it at a server that is already running instead. Everything
+runs offline.
+
+Usage:
+    python benchmarks/load_test.py [--users 8] [--seconds 60] [--workers 4]
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --users 4 --seconds 30
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.cookiejar
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.knowledge_base import KNOWLEDGE_BASE
+
+PASSWORD = 'LoadTest2026'
+TEXTS = [item['content'].strip() for item in KNOWLEDGE_BASE.values()]
+
+
+class StepFailed(Exception):
+    """A journey step got an unexpected response; the rest of that journey is skipped"""
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Time every request on its own instead of folding the redirect target into it
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Recorder:
+    """Latencies and errors per endpoint label, shared by all virtual users"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}   # label -> [latency ms, ...]
+        self.errors = {}    # label -> {reason: count}
+        self.journeys = 0
+
+    def record(self, label, elapsed_ms, error=None):
+        with self._lock:
+            self.samples.setdefault(label, []).append(elapsed_ms)
+            if error:
+                reasons = self.errors.setdefault(label, {})
+                reasons[error] = reasons.get(error, 0) + 1
+
+    def journey_done(self):
+        with self._lock:
+            self.journeys += 1
+
+
+class VirtualUser:
+    def __init__(self, base_url, recorder, rng, think_ms):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.rng = rng
+        self.think_ms = think_ms
+        self.opener = None
+
+    def request(self, label, method, path, form=None, expect=(200,), location=None):
+        """Send one request; raises StepFailed (after recording the error) on an unexpected response"""
+        data = urllib.parse.urlencode(form, doseq=True).encode() if form is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=120) as response:
+                status, headers, body = response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            status, headers, body = e.code, e.headers, e.read()
+        except (urllib.error.URLError, OSError) as e:
+            self.recorder.record(label, (time.perf_counter() - start) * 1000, type(e).__name__)
+            raise StepFailed(label)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        error = None
+        target = headers.get('Location', '')
+        if status not in expect:
+            error = f'HTTP {status}'
+        elif location and not re.search(location, target):
+            # Failed form posts redirect back to themselves (or home) with a flash message
+            error = f'redirect to {urllib.parse.urlparse(target).path or target}'
+        self.recorder.record(label, elapsed_ms, error)
+        if error:
+            raise StepFailed(label)
+        if self.think_ms:
+            time.sleep(self.rng.uniform(0.5, 1.5) * self.think_ms / 1000)
+        return target, body
+
+    def journey(self):
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect()
+        )
+        name = 'lt' + uuid.uuid4().hex[:12]
+
+        self.request('GET /register', 'GET', '/register')
+        self.request('POST /register', 'POST', '/register', {
+            'username': name, 'email': f'{name}@loadtest.vortex.test', 'password': PASSWORD
+        }, expect=(302,), location=r'/login$')
+        self.request('POST /login', 'POST', '/login', {'username': name, 'password': PASSWORD},
+                     expect=(302,), location=r'/$')
+        self.request('GET /', 'GET', '/')
+
+        text = self.rng.choice(TEXTS)
+        self.request('POST /summarize', 'POST', '/summarize', {
+            'text': text, 'summary_style': self.rng.choice(['paragraphs', 'bullets', 'numbered']),
+            'summary_length': self.rng.choice(['short', 'medium', 'long'])
+        })
+        self.request('GET /quiz', 'GET', '/quiz')
+        answers = {f'answer_{i}': self.rng.choice(['true', 'false', '']) for i in range(10)}
+        self.request('POST /quiz', 'POST', '/quiz', answers, expect=(302,), location=r'/gamification$')
+        self.request('GET /leaderboard', 'GET', '/leaderboard')
+
+        self.request('GET /quiz-battles', 'GET', '/quiz-battles')
+        target, _ = self.request('POST /create-battle', 'POST', '/create-battle',
+                                 {'title': f'{name} battle'}, expect=(302,), location=r'/battle/\d+$')
+        battle_path = urllib.parse.urlparse(target).path
+        self.request('GET /battle/<id>', 'GET', battle_path)
+        self.request('POST /submit-battle/<id>', 'POST', battle_path.replace('/battle/', '/submit-battle/'),
+                     answers, expect=(302,), location=r'/quiz-battles$')
+        self.recorder.journey_done()
+
+    def run(self, deadline):
+        while time.monotonic() < deadline:
+            try:
+                self.journey()
+            except StepFailed:
+                continue
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args):
+    """Start gunicorn against a throwaway database; returns (process, base URL, log path)"""
+    workdir = tempfile.mkdtemp(prefix='vortex-load-')
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'vortex.db')}",
+               RATELIMIT_STORAGE_URI=f"sqlite:///{os.path.join(workdir, 'ratelimit.db')}",
+               RATELIMIT_ENABLED='0',
+               ADMISSION_STORAGE_PATH=os.path.join(workdir, 'ratelimit.db'),
+               METRICS_DIR=os.path.join(workdir, 'metrics'),
+               SCHEDULER_ENABLED='0',
+               LOG_LEVEL=os.environ.get('LOG_LEVEL', 'WARNING'),
+               SECRET_KEY='load-test')
+    # Create the schema once, so the workers don't race to create the same tables
+    subprocess.run([sys.executable, '-c', 'import app'], cwd=ROOT, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    port = free_port()
+    log_path = os.path.join(workdir, 'gunicorn.log')
+    log = open(log_path, 'w')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '--bind', f'127.0.0.1:{port}',
+         '--workers', str(args.workers), '--threads', str(args.threads), '--timeout', '120'],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'gunicorn exited with {process.returncode}; see {log_path}')
+        try:
+            urllib.request.urlopen(base_url + '/login', timeout=2).read()
+            return process, base_url, log_path
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.25)
+    process.terminate()
+    raise SystemExit(f'gunicorn did not answer within 60s; see {log_path}')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))], 1)
+
+
+def report(recorder, seconds):
+    rows = []
+    for label, latencies in recorder.samples.items():
+        errors = sum(recorder.errors.get(label, {}).values())
+        rows.append({
+            'endpoint': label,
+            'requests': len(latencies),
+            'rps': round(len(latencies) / seconds, 2),
+            'p50_ms': percentile(latencies, 0.5),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'error_rate': round(errors / len(latencies), 4),
+            'errors': recorder.errors.get(label, {}),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='target an already running server instead of starting gunicorn')
+    parser.add_argument('--users', type=int, default=8, help='concurrent virtual users')
+    parser.add_argument('--seconds', type=float, default=60)
+    parser.add_argument('--think-ms', type=float, default=0, help='average pause between a user\'s requests')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        base_url = args.url
+    else:
+        process, base_url, log_path = start_server(args)
+        print(f'gunicorn: {args.workers} workers x {args.threads} threads at {base_url} (log: {log_path})')
+
+    recorder = Recorder()
+    try:
+        deadline = time.monotonic() + args.seconds
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=VirtualUser(base_url, recorder, random.Random(args.seed + n), args.think_ms).run,
+                             args=(deadline,), daemon=True)
+            for n in range(args.users)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    rows = report(recorder, elapsed)
+    total = sum(row['requests'] for row in rows)
+    errors = sum(sum(row['errors'].values()) for row in rows)
+    for row in rows:
+        print(f"{row['endpoint']:<26} {row['requests']:>6} req {row['rps']:>8} req/s   p50 {row['p50_ms']:>8} ms   "
+              f"p95 {row['p95_ms']:>8} ms   p99 {row['p99_ms']:>8} ms   errors {row['error_rate']:.2%} {row['errors'] or ''}")
+    print(f"{recorder.journeys} journeys, {total} requests in {elapsed:.1f}s "
+          f"({total / elapsed:.1f} req/s, {recorder.journeys / elapsed:.2f} journeys/s), {errors} errors")
+    print(json.dumps({
+        'users': args.users, 'seconds': round(elapsed, 1), 'journeys': recorder.journeys,
+        'requests': total, 'errors': errors, 'endpoints': rows,
+    }))
+
+
+if __name__ == '__main__':
+    main()
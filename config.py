@@ -1,8 +1,103 @@
 import os
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def database_url():
+    """DATABASE_URL from the environment, falling back to SQLite in the instance folder"""
+    url = os.environ.get('DATABASE_URL') or 'sqlite:///vortex.db'
+    # Some hosts still hand out the deprecated postgres:// scheme, which SQLAlchemy 2 rejects
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url):
+    """Connection-pool settings for server databases (SQLite keeps SQLAlchemy's defaults)"""
+    if url.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
+
 class Config:
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'vortex-secret-key-2026'
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///vortex.db'
+    SECRET_KEY = os.environ.get('SECRET_KEY') or 'vortex-secret-key-2026-pastel-theme'
+    SQLALCHEMY_DATABASE_URI = database_url()
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    UPLOAD_FOLDER = 'uploads'
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024
\ No newline at end of file
+    UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
+    MAX_CONTENT_LENGTH = 32 * 1024 * 1024
+
+    # Applied to every new SQLite connection: WAL lets readers run alongside a writer,
+    # NORMAL sync is durable across app crashes in WAL mode, busy_timeout waits for
+    # the write lock instead of failing with "database is locked"
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    }
+
+    # Admin statistics are served from a per-worker cache and sampled into stat_sample for growth charts
+    ADMIN_STATS_TTL = int(os.environ.get('ADMIN_STATS_TTL', 60))
+    STATS_SAMPLE_INTERVAL = int(os.environ.get('STATS_SAMPLE_INTERVAL', 3600))
+
+    # Rate-limit counters live in a SQLite file shared by all workers on the host (see
+    # utils/rate_limit_storage.py); memory:// or redis:// URIs also work
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI') or \
+        'sqlite:///' + os.path.join(BASE_DIR, 'instance', 'ratelimit.db')
+    # Load tests send every virtual user from one address, so they turn limits off
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', '1') == '1'
+
+    # Admission control for /summarize: requests are charged an estimated cost (about one unit
+    # per CPU-second) against a per-user and a host-wide token bucket (see utils/admission.py)
+    ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', '1') == '1'
+    ADMISSION_STORAGE_PATH = os.environ.get('ADMISSION_STORAGE_PATH') or os.path.join(BASE_DIR, 'instance', 'ratelimit.db')
+    ADMISSION_USER_CAPACITY = float(os.environ.get('ADMISSION_USER_CAPACITY', 30))
+    ADMISSION_USER_REFILL = float(os.environ.get('ADMISSION_USER_REFILL', 0.1))
+    ADMISSION_GLOBAL_CAPACITY = float(os.environ.get('ADMISSION_GLOBAL_CAPACITY', 60))
+    ADMISSION_GLOBAL_REFILL = float(os.environ.get('ADMISSION_GLOBAL_REFILL', os.cpu_count() or 1))
+    ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', 8))
+    ADMISSION_MAX_WAIT = float(os.environ.get('ADMISSION_MAX_WAIT', 10))
+
+    # Each worker writes its metrics here so /metrics can report totals across workers;
+    # set METRICS_TOKEN to require "Authorization: Bearer <token>" from the scraper. Without one only
+    # admins may read it; METRICS_ALLOW_LOOPBACK=1 also trusts 127.0.0.1, which is unsafe behind a
+    # reverse proxy on the same host (every client then arrives from loopback)
+    METRICS_DIR = os.environ.get('METRICS_DIR') or os.path.join(BASE_DIR, 'instance', 'metrics')
+    METRICS_FLUSH_SECONDS = int(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_ALLOW_LOOPBACK = os.environ.get('METRICS_ALLOW_LOOPBACK', '0') == '1'
+
+    # Logs go to stdout through a per-worker queue (see utils/structured_logging.py);
+    # LOG_LEVELS overrides single loggers, e.g. "utils.ocr=DEBUG,vortex.access=WARNING"
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+    LOG_ASYNC = os.environ.get('LOG_ASYNC', '1') == '1'
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+
+    # Admins can profile a request with "X-Profile: 1" or ?_profile=1; PROFILE_SAMPLE_RATE=N also
+    # profiles one in N requests to PROFILE_ENDPOINTS (see utils/profiling.py)
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(BASE_DIR, 'instance', 'profiles')
+    PROFILE_SAMPLE_RATE = int(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_ENDPOINTS = os.environ.get('PROFILE_ENDPOINTS', 'summarize,analytics')
+    PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 50))
+    PROFILE_MAX_BYTES = int(os.environ.get('PROFILE_MAX_MB', 100)) * 1024 * 1024
+    PROFILE_TRACEMALLOC = os.environ.get('PROFILE_TRACEMALLOC', '1') == '1'
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+
+    # Maintenance jobs run on a background thread in every worker; a DB lease lets only one run each job
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', '1') == '1'
+    SCHEDULER_TICK_SECONDS = int(os.environ.get('SCHEDULER_TICK_SECONDS', 30))
+    RETENTION_DAYS = int(os.environ.get('RETENTION_DAYS', 30))
+    RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', 500))
+    ARTIFACT_MAX_AGE_DAYS = int(os.environ.get('ARTIFACT_MAX_AGE_DAYS', 7))
+
+    # Mind maps are shown as SVG; PNG export is rendered on demand unless pre-rendering is enabled
+    MINDMAP_PNG_PRERENDER = os.environ.get('MINDMAP_PNG_PRERENDER', '0') == '1'
@@ -1,9 +1,18 @@
+import logging
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import validates
+
+logger = logging.getLogger(__name__)
 
 db = SQLAlchemy()
 
+def normalize_identity(value):
+    """الصيغة الموحّدة لاسم المستخدم والبريد (للمقارنة دون اعتبار حالة الأحرف)"""
+    return value.strip().lower() if value is not None else None
+
 # ================= User Model =================
 class User(UserMixin, db.Model):
     """نموذج المستخدم الرئيسي"""
@@ -12,6 +21,9 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
+    # نسخ بأحرف صغيرة للبحث بالمساواة عبر فهرس (ilike لا يستخدم الفهارس)؛ تُملأ تلقائياً عند الكتابة
+    username_lower = db.Column(db.String(80), unique=True, nullable=True, index=True)
+    email_lower = db.Column(db.String(120), unique=True, nullable=True, index=True)
     password = db.Column(db.String(200), nullable=False)
     score = db.Column(db.Integer, default=0, index=True)
     level = db.Column(db.Integer, default=1)
@@ -28,6 +40,33 @@ class User(UserMixin, db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
     
+    @validates('username', 'email')
+    def _normalize_identity(self, key, value):
+        setattr(self, f'{key}_lower', normalize_identity(value))
+        return value
+    
+    @classmethod
+    def find_by_username(cls, username):
+        return cls._find_by_identity('username', username)
+    
+    @classmethod
+    def find_by_email(cls, email):
+        return cls._find_by_identity('email', email)
+    
+    @classmethod
+    def _find_by_identity(cls, key, value):
+        """
+        بحث دون اعتبار حالة الأحرف عبر فهرس العمود الموحّد، ثم بين الصفوف التي بقي عمودها
+        فارغاً (لم يُرحَّل بعد أو تعارض عند الترحيل) بالمقارنة القديمة على العمود الأصلي
+        """
+        normalized = getattr(cls, f'{key}_lower')
+        user = cls.query.filter(normalized == normalize_identity(value)).first()
+        if user is None:
+            user = cls.query.filter(
+                normalized.is_(None), db.func.lower(getattr(cls, key)) == db.func.lower(value.strip())
+            ).first()
+        return user
+    
     def get_total_uploads(self):
         """الحصول على عدد الملفات المرفوعة"""
         return self.uploads.count()
@@ -49,11 +88,26 @@ class User(UserMixin, db.Model):
         """تحديث المستوى بناءً على النقاط"""
         self.level = (self.score // 100) + 1
         return self.level
+    
+    def add_score(self, points):
+        """إضافة نقاط بجملة UPDATE واحدة، فلا يضيع ما أضافه طلب آخر متزامن"""
+        table = User.__table__
+        score = table.c.score + points
+        db.session.execute(
+            table.update().where(table.c.id == self.id).values(score=score, level=score // 100 + 1)
+        )
+        db.session.expire(self, ['score', 'level'])
 
 # ================= Upload Model =================
 class Upload(db.Model):
     """نموذج الملفات المرفوعة"""
     __tablename__ = 'upload'
+    __table_args__ = (
+        # فهارس مركبة لترقيم الصفحات بالمفتاح (keyset) في لوحة التحكم والمكتبة المشتركة
+        db.Index('ix_upload_user_uploaded_at', 'user_id', 'uploaded_at'),
+        db.Index('ix_upload_shared_uploaded_at', 'is_shared', 'uploaded_at'),
+        db.Index('ix_upload_shared_rating_avg', 'is_shared', 'rating_avg'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(200), nullable=False)
@@ -64,6 +118,12 @@ class Upload(db.Model):
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
     chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id', ondelete='SET NULL'), nullable=True, index=True)
+    mindmap_key = db.Column(db.String(64), nullable=True)       # hash of the mind map inputs
+    source_hash = db.Column(db.String(64), db.ForeignKey('source_text.hash', ondelete='SET NULL'), nullable=True, index=True)
+    # عدادات محفوظة تُحدَّث مع كل مراجعة (انظر Counter Maintenance)
+    review_count = db.Column(db.Integer, default=0, nullable=False)
+    rating_sum = db.Column(db.Integer, default=0, nullable=False)
+    rating_avg = db.Column(db.Float, default=0, nullable=False)
     
     # العلاقات
     reviews = db.relationship('Review', backref='upload', lazy='dynamic', cascade='all, delete-orphan')
@@ -73,14 +133,32 @@ class Upload(db.Model):
     
     def get_average_rating(self):
         """حساب متوسط التقييمات"""
-        reviews = self.reviews.all()
-        if not reviews:
+        if not self.review_count:
             return 0
-        return round(sum(r.rating for r in reviews) / len(reviews), 1)
+        return round(self.rating_sum / self.review_count, 1)
     
     def get_review_count(self):
         """الحصول على عدد المراجعات"""
-        return self.reviews.count()
+        return self.review_count
+    
+    def get_source_text(self):
+        """النص الأصلي المنظّف المحفوظ مع الملف (None للملفات القديمة)"""
+        if not self.source_hash:
+            return None
+        return load_source_text(self.source_hash)
+
+# ================= SourceText Model =================
+class SourceText(db.Model):
+    """النص المستخرج من الملف مضغوطاً، مفهرساً بالبصمة فيُحفظ مرة واحدة مهما تكرر رفعه"""
+    __tablename__ = 'source_text'
+    
+    hash = db.Column(db.String(64), primary_key=True)   # sha256 للنص المنظّف
+    data = db.Column(db.LargeBinary, nullable=False)     # zlib
+    size = db.Column(db.Integer, nullable=False)         # حجم النص قبل الضغط بالبايت
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SourceText {self.hash[:12]} {len(self.data)}/{self.size} bytes>'
 
 # ================= Subject Model =================
 class Subject(db.Model):
@@ -94,6 +172,7 @@ class Subject(db.Model):
     color = db.Column(db.String(20), default='#5DBAA4')
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    chapter_count = db.Column(db.Integer, default=0, nullable=False)
     
     # العلاقات
     chapters = db.relationship('Chapter', backref='subject', lazy='dynamic', cascade='all, delete-orphan', order_by='Chapter.order')
@@ -103,22 +182,22 @@ class Subject(db.Model):
     
     def get_chapter_count(self):
         """عدد الشباتر"""
-        return self.chapters.count()
+        return self.chapter_count
     
     def get_total_uploads(self):
-        """عدد الملفات في كل الشباتر"""
-        total = 0
-        for chapter in self.chapters:
-            total += chapter.get_upload_count()
-        return total
+        """عدد الملفات في كل الشباتر (من عدادات الشباتر)"""
+        return db.session.query(db.func.sum(Chapter.upload_count)).filter(
+            Chapter.subject_id == self.id
+        ).scalar() or 0
     
     def get_progress_percentage(self):
         """نسبة الإنجاز (بناءً على عدد الملفات)"""
-        total_chapters = self.get_chapter_count()
-        if total_chapters == 0:
+        if not self.chapter_count:
             return 0
-        chapters_with_uploads = sum(1 for c in self.chapters if c.get_upload_count() > 0)
-        return round((chapters_with_uploads / total_chapters) * 100, 1)
+        chapters_with_uploads = Chapter.query.filter(
+            Chapter.subject_id == self.id, Chapter.upload_count > 0
+        ).count()
+        return round((chapters_with_uploads / self.chapter_count) * 100, 1)
 
 # ================= Chapter Model =================
 class Chapter(db.Model):
@@ -131,6 +210,7 @@ class Chapter(db.Model):
     order = db.Column(db.Integer, default=1, index=True)
     subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete='CASCADE'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    upload_count = db.Column(db.Integer, default=0, nullable=False)
     
     # العلاقات
     uploads = db.relationship('Upload', backref='chapter', lazy='dynamic', cascade='all, delete-orphan')
@@ -140,7 +220,7 @@ class Chapter(db.Model):
     
     def get_upload_count(self):
         """عدد الملفات في هذا الشابتر"""
-        return self.uploads.count()
+        return self.upload_count
     
     def get_latest_upload(self):
         """آخر ملف تم رفعه"""
@@ -154,6 +234,9 @@ class Chapter(db.Model):
 class QuizResult(db.Model):
     """نموذج نتائج الاختبارات"""
     __tablename__ = 'quiz_result'
+    __table_args__ = (
+        db.Index('ix_quiz_result_user_completed_at', 'user_id', 'completed_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     score = db.Column(db.Integer, nullable=False)
@@ -351,12 +434,253 @@ class Admin(UserMixin, db.Model):
         """Override لـ Flask-Login"""
         return f"admin_{self.id}"
 
+# ================= StatSample Model =================
+class StatSample(db.Model):
+    """لقطات دورية لإحصائيات المنصة لعرض النمو دون فحص الجداول"""
+    __tablename__ = 'stat_sample'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    sampled_at = db.Column(db.DateTime, nullable=False, unique=True, index=True)  # بداية الفترة
+    total_users = db.Column(db.Integer, default=0)
+    total_uploads = db.Column(db.Integer, default=0)
+    total_quizzes = db.Column(db.Integer, default=0)
+    total_battles = db.Column(db.Integer, default=0)
+    total_reviews = db.Column(db.Integer, default=0)
+    total_subjects = db.Column(db.Integer, default=0)
+    total_chapters = db.Column(db.Integer, default=0)
+    active_battles = db.Column(db.Integer, default=0)
+    
+    def __repr__(self):
+        return f'<StatSample {self.sampled_at}>'
+    
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in STAT_FIELDS}
+        data['sampled_at'] = self.sampled_at.isoformat()
+        return data
+
+# ================= JobLease Model =================
+class JobLease(db.Model):
+    """عقد تشغيل المهام الدورية: يضمن أن عاملاً واحداً فقط ينفذ المهمة في كل فترة"""
+    __tablename__ = 'job_lease'
+    
+    name = db.Column(db.String(64), primary_key=True)
+    owner = db.Column(db.String(120), nullable=True)      # host:pid:id للعامل الحامل للعقد
+    lease_until = db.Column(db.DateTime, nullable=True)
+    last_started_at = db.Column(db.DateTime, nullable=True)
+    last_finished_at = db.Column(db.DateTime, nullable=True)
+    last_duration_ms = db.Column(db.Float, nullable=True)
+    last_status = db.Column(db.String(20), nullable=True)  # ok, failed
+    last_result = db.Column(db.Text, nullable=True)        # JSON أو نص الخطأ
+    run_count = db.Column(db.Integer, default=0, nullable=False)
+    failure_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<JobLease {self.name} owner:{self.owner}>'
+    
+    def to_dict(self):
+        data = {column: getattr(self, column) for column in (
+            'name', 'owner', 'last_duration_ms', 'last_status', 'last_result', 'run_count', 'failure_count'
+        )}
+        for column in ('lease_until', 'last_started_at', 'last_finished_at'):
+            value = getattr(self, column)
+            data[column] = value.isoformat() if value else None
+        return data
+
+# ================= Counter Maintenance =================
+# العدادات تُحدَّث بجملة UPDATE داخل نفس الـ flush، فتُحفظ أو تُلغى مع التغيير الأصلي في نفس المعاملة
+
+def _adjust_counter(connection, model, column, row_id, delta):
+    if row_id is None or not delta:
+        return
+    table = model.__table__
+    connection.execute(
+        table.update().where(table.c.id == row_id).values({column: table.c[column] + delta})
+    )
+
+def _maintain_child_count(child, foreign_key, parent, column):
+    """عداد في الجدول الأب لعدد الصفوف التابعة (إضافة، حذف، نقل)"""
+    
+    # active_history يحمّل القيمة القديمة عند تغيير المفتاح حتى لو كان الكائن منتهي الصلاحية
+    @event.listens_for(getattr(child, foreign_key), 'set', active_history=True)
+    def parent_changed(target, value, oldvalue, initiator):
+        return value
+    
+    @event.listens_for(child, 'after_insert')
+    def child_inserted(mapper, connection, target):
+        _adjust_counter(connection, parent, column, getattr(target, foreign_key), 1)
+    
+    @event.listens_for(child, 'after_delete')
+    def child_deleted(mapper, connection, target):
+        _adjust_counter(connection, parent, column, getattr(target, foreign_key), -1)
+    
+    @event.listens_for(child, 'after_update')
+    def child_moved(mapper, connection, target):
+        history = db.inspect(target).attrs[foreign_key].history
+        if history.has_changes():
+            for old_id in history.deleted:
+                _adjust_counter(connection, parent, column, old_id, -1)
+            _adjust_counter(connection, parent, column, getattr(target, foreign_key), 1)
+
+_maintain_child_count(Upload, 'chapter_id', Chapter, 'upload_count')
+_maintain_child_count(Chapter, 'subject_id', Subject, 'chapter_count')
+
+def _apply_review(connection, upload_id, count_delta, rating_delta):
+    table = Upload.__table__
+    count = table.c.review_count + count_delta
+    total = table.c.rating_sum + rating_delta
+    # rating_avg أولاً: بعض قواعد البيانات (MySQL) تستخدم القيم الجديدة في بقية الإسنادات
+    connection.execute(
+        table.update().where(table.c.id == upload_id).ordered_values(
+            (table.c.rating_avg, db.case((count > 0, db.cast(total, db.Float) / count), else_=0.0)),
+            (table.c.review_count, count),
+            (table.c.rating_sum, total),
+        )
+    )
+
+@event.listens_for(Review, 'after_insert')
+def review_inserted(mapper, connection, review):
+    _apply_review(connection, review.upload_id, 1, review.rating)
+
+@event.listens_for(Review, 'after_delete')
+def review_deleted(mapper, connection, review):
+    _apply_review(connection, review.upload_id, -1, -review.rating)
+
+@event.listens_for(Review, 'after_update')
+def review_updated(mapper, connection, review):
+    history = db.inspect(review).attrs.rating.history
+    if history.has_changes() and history.deleted:
+        _apply_review(connection, review.upload_id, 0, review.rating - history.deleted[0])
+
+def repair_counters(app):
+    """إعادة حساب كل العدادات من الجداول الأصلية وإصلاح المختلف منها فقط"""
+    upload, chapter, subject, review = Upload.__table__, Chapter.__table__, Subject.__table__, Review.__table__
+    
+    def count_of(table, foreign_key, parent):
+        return db.select(db.func.count()).select_from(table).where(foreign_key == parent.c.id).scalar_subquery()
+    
+    counters = [
+        (upload, 'review_count', count_of(review, review.c.upload_id, upload)),
+        (upload, 'rating_sum', db.select(db.func.coalesce(db.func.sum(review.c.rating), 0)).where(
+            review.c.upload_id == upload.c.id).scalar_subquery()),
+        # يعتمد على العمودين السابقين بعد إصلاحهما
+        (upload, 'rating_avg', db.case(
+            (upload.c.review_count > 0, db.cast(upload.c.rating_sum, db.Float) / upload.c.review_count), else_=0.0)),
+        (chapter, 'upload_count', count_of(upload, upload.c.chapter_id, chapter)),
+        (subject, 'chapter_count', count_of(chapter, chapter.c.subject_id, subject)),
+    ]
+    
+    repaired = {}
+    with app.app_context():
+        for table, column, expected in counters:
+            result = db.session.execute(
+                table.update().where(table.c[column].is_distinct_from(expected)).values({column: expected})
+            )
+            repaired[f'{table.name}.{column}'] = result.rowcount
+        db.session.commit()
+    return repaired
+
+def backfill_normalized_identities(app, batch_size=5000):
+    """
+    ملء username_lower و email_lower للصفوف القديمة على دفعات (آمن لإعادة التشغيل).
+    كل عمود يُملأ وحده، فتعارض البريد لا يمنع ملء اسم المستخدم. الصفوف التي تتعارض
+    صيغتها الموحّدة مع مستخدم آخر تبقى فارغة (ويجدها البحث بالعمود الأصلي) وتُعاد أرقامها.
+    """
+    from sqlalchemy.exc import IntegrityError
+    
+    table = User.__table__
+    updated, conflicts = {}, {}
+    with app.app_context():
+        for source in ('username', 'email'):
+            target = f'{source}_lower'
+            updated[target], conflicts[target], last_id = 0, [], 0
+            statement = table.update().where(table.c.id == db.bindparam('row_id'))
+            while True:
+                rows = db.session.execute(
+                    db.select(table.c.id, table.c[source])
+                    .where(table.c.id > last_id, table.c[target].is_(None))
+                    .order_by(table.c.id).limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                values = [{'row_id': row.id, target: normalize_identity(row[1])} for row in rows]
+                try:
+                    db.session.execute(statement, values)
+                    db.session.commit()
+                    updated[target] += len(values)
+                except IntegrityError:
+                    # صف واحد مكرر يُفشل الدفعة كلها، فنعيدها صفاً صفاً
+                    db.session.rollback()
+                    for value in values:
+                        try:
+                            db.session.execute(statement, [value])
+                            db.session.commit()
+                            updated[target] += 1
+                        except IntegrityError:
+                            db.session.rollback()
+                            conflicts[target].append(value['row_id'])
+            if conflicts[target]:
+                logger.warning("⚠️ Users whose lowercase %s collides with another user (left empty): %s",
+                               source, conflicts[target])
+    return {'updated': updated, 'conflicts': conflicts}
+
 # ================= Utility Functions =================
 def init_db(app):
     """تهيئة قاعدة البيانات"""
     with app.app_context():
         db.create_all()
-        print("✅ Database tables created successfully!")
+        logger.info("✅ Database tables created successfully!")
+
+def upgrade_schema(app):
+    """
+    إضافة الأعمدة الجديدة للجداول الموجودة (create_all لا يعدّل الجداول القديمة).
+    كل عامل في gunicorn ينفّذها عند الإقلاع، فإن سبقه عامل آخر إلى عمود أو فهرس
+    يُعاد الفحص ويُتجاوز بدل أن يسقط العامل.
+    """
+    from sqlalchemy import inspect, text, literal
+    from sqlalchemy.exc import DBAPIError
+    
+    with app.app_context():
+        engine = db.engine
+        inspector = inspect(engine)
+        added = []
+        
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                
+                ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column.type.compile(dialect=engine.dialect)}'
+                if column.default is not None and column.default.is_scalar:
+                    default = literal(column.default.arg, type_=column.type).compile(
+                        dialect=engine.dialect, compile_kwargs={'literal_binds': True}
+                    )
+                    ddl += f' DEFAULT {default}'
+                
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(text(ddl))
+                except DBAPIError:
+                    # عامل آخر أضاف العمود بعد فحصنا (duplicate column)
+                    if column.name not in {c['name'] for c in inspect(engine).get_columns(table.name)}:
+                        raise
+                    continue
+                added.append(f'{table.name}.{column.name}')
+            
+            for index in table.indexes:
+                try:
+                    index.create(bind=engine, checkfirst=True)
+                except DBAPIError:
+                    if index.name not in {i['name'] for i in inspect(engine).get_indexes(table.name)}:
+                        raise
+        
+        if added:
+            logger.info("✅ Database schema upgraded: %s", ', '.join(added))
+        return added
 
 def create_default_admin(app):
     """إنشاء مسؤول افتراضي"""
@@ -370,44 +694,148 @@ def create_default_admin(app):
             )
             db.session.add(admin)
             db.session.commit()
-            print("✅ Default admin created!")
-            print("   Username: admin")
-            print("   Password: vortex2026")
+            logger.warning("✅ Default admin created (username: admin, password: vortex2026) - change the password")
+
+STAT_FIELDS = ('total_users', 'total_uploads', 'total_quizzes', 'total_battles',
+               'total_reviews', 'total_subjects', 'total_chapters', 'active_battles')
 
 def get_statistics():
-    """إحصائيات عامة للمنصة"""
-    return {
-        'total_users': User.query.count(),
-        'total_uploads': Upload.query.count(),
-        'total_quizzes': QuizResult.query.count(),
-        'total_battles': QuizBattle.query.count(),
-        'total_reviews': Review.query.count(),
-        'total_subjects': Subject.query.count(),
-        'total_chapters': Chapter.query.count(),
-        'active_battles': QuizBattle.query.filter_by(status='active').count()
-    }
+    """إحصائيات عامة للمنصة (كل العدادات في استعلام واحد)"""
+    def count(model, *criteria):
+        return db.select(db.func.count()).select_from(model).where(*criteria).scalar_subquery()
+    
+    row = db.session.query(
+        count(User), count(Upload), count(QuizResult), count(QuizBattle),
+        count(Review), count(Subject), count(Chapter),
+        count(QuizBattle, QuizBattle.status == 'active')
+    ).one()
+    return dict(zip(STAT_FIELDS, row))
 
-def cleanup_old_data(days=30):
+def record_stat_sample(stats, interval_seconds=3600):
+    """حفظ لقطة للفترة الحالية إن لم تُحفظ بعد (آمن مع عدة عمّال بفضل القيد الفريد)"""
+    from datetime import timedelta
+    from sqlalchemy.exc import IntegrityError
+    
+    epoch = datetime(1970, 1, 1)
+    elapsed = int((datetime.utcnow() - epoch).total_seconds())
+    bucket = epoch + timedelta(seconds=elapsed // interval_seconds * interval_seconds)
+    if StatSample.query.filter_by(sampled_at=bucket).first():
+        return None
+    
+    sample = StatSample(sampled_at=bucket, **{name: stats[name] for name in STAT_FIELDS})
+    db.session.add(sample)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # عامل آخر سجّل نفس الفترة
+        db.session.rollback()
+        return None
+    return sample
+
+def get_stat_history(limit=168):
+    """آخر اللقطات بترتيب زمني تصاعدي"""
+    samples = StatSample.query.order_by(StatSample.sampled_at.desc()).limit(limit).all()
+    return [sample.to_dict() for sample in reversed(samples)]
+
+def _delete_in_batches(model, criteria, batch_size):
+    """حذف على دفعات، كل دفعة في معاملة قصيرة حتى لا يُحجب الكُتّاب الآخرون"""
+    deleted = 0
+    while True:
+        ids = [row.id for row in db.session.query(model.id).filter(*criteria).limit(batch_size)]
+        if not ids:
+            break
+        deleted += model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        if len(ids) < batch_size:
+            break
+    return deleted
+
+def cleanup_old_data(days=30, batch_size=500):
     """تنظيف البيانات القديمة"""
     from datetime import timedelta
     
     cutoff_date = datetime.utcnow() - timedelta(days=days)
     
     # حذف الألعاب القديمة المكتملة
-    old_puzzles = PuzzleGame.query.filter(
+    old_puzzles = _delete_in_batches(PuzzleGame, (
         PuzzleGame.completed == True,
         PuzzleGame.completed_at < cutoff_date
-    ).delete()
+    ), batch_size)
     
     # حذف التحديات القديمة غير النشطة
-    old_challenges = DailyChallenge.query.filter(
+    old_challenges = _delete_in_batches(DailyChallenge, (
         DailyChallenge.active == False,
         DailyChallenge.created_at < cutoff_date
-    ).delete()
-    
-    db.session.commit()
+    ), batch_size)
     
     return {
         'puzzles_deleted': old_puzzles,
         'challenges_deleted': old_challenges
-    }
\ No newline at end of file
+    }
+
+def ensure_daily_challenge(day):
+    """تحدي اليوم المحدد، يُنشأ مرة واحدة حتى لو طلبه عدة عمّال في نفس اللحظة"""
+    from sqlalchemy.exc import IntegrityError
+    
+    challenge = DailyChallenge.query.filter_by(date=day).first()
+    if challenge:
+        return challenge
+    
+    challenge = DailyChallenge(
+        title="Complete 3 Quizzes",
+        description="Complete at least 3 quizzes today to earn bonus points!",
+        points=50,
+        date=day
+    )
+    db.session.add(challenge)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # القيد الفريد على التاريخ: عامل آخر أنشأه أولاً
+        db.session.rollback()
+        challenge = DailyChallenge.query.filter_by(date=day).first()
+    return challenge
+
+def store_source_text(text):
+    """حفظ النص مضغوطاً وإرجاع بصمته؛ النص المكرر لا يُحفظ مرتين"""
+    import hashlib
+    import zlib
+    from sqlalchemy.exc import IntegrityError
+    
+    raw = text.encode('utf-8')
+    digest = hashlib.sha256(raw).hexdigest()
+    if db.session.query(SourceText.hash).filter_by(hash=digest).first():
+        return digest
+    
+    try:
+        # نقطة حفظ حتى لا يُلغي تعارضُ البصمة باقي المعاملة
+        with db.session.begin_nested():
+            db.session.add(SourceText(hash=digest, data=zlib.compress(raw, 6), size=len(raw)))
+    except IntegrityError:
+        # عامل آخر حفظ نفس النص في نفس اللحظة
+        pass
+    return digest
+
+def load_source_text(digest):
+    import zlib
+    
+    source = db.session.get(SourceText, digest)
+    if source is None:
+        return None
+    return zlib.decompress(source.data).decode('utf-8')
+
+def delete_orphan_source_texts(batch_size=500):
+    """حذف النصوص التي لم يعد أي ملف يشير إليها"""
+    referenced = db.session.query(Upload.source_hash).filter(Upload.source_hash.isnot(None))
+    deleted = 0
+    while True:
+        hashes = [row.hash for row in db.session.query(SourceText.hash).filter(
+            SourceText.hash.notin_(referenced)
+        ).limit(batch_size)]
+        if not hashes:
+            break
+        deleted += SourceText.query.filter(SourceText.hash.in_(hashes)).delete(synchronize_session=False)
+        db.session.commit()
+        if len(hashes) < batch_size:
+            break
+    return deleted
\ No newline at end of file
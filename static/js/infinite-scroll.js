@@ -0,0 +1,56 @@
+// Infinite scroll for keyset-paginated lists.
+// A "Load More" link marked with data-infinite-scroll works as a plain link
+// without JavaScript; with it, the next page is fetched from the JSON endpoint
+// and appended when the link scrolls into view.
+document.querySelectorAll('[data-infinite-scroll]').forEach(function (link) {
+    const target = document.querySelector(link.dataset.target);
+    let loading = false;
+    let failed = false;
+
+    async function loadMore() {
+        if (loading || !link.dataset.next) return;
+        loading = true;
+
+        const url = new URL(link.dataset.endpoint, window.location.origin);
+        url.searchParams.set('after', link.dataset.next);
+        url.searchParams.set('start', target.children.length);
+
+        try {
+            const response = await fetch(url, { credentials: 'same-origin' });
+            if (!response.ok) throw new Error(response.status);
+            const page = await response.json();
+
+            target.insertAdjacentHTML('beforeend', page.html);
+            link.dataset.next = page.next_cursor || '';
+            if (!page.next_cursor) {
+                link.parentElement.remove();
+                observer.disconnect();
+            } else {
+                const href = new URL(link.href);
+                href.searchParams.set('after', page.next_cursor);
+                href.searchParams.set('start', target.children.length);
+                link.href = href;
+                // Re-observe so a link that is still in view loads the next page too
+                observer.unobserve(link);
+                observer.observe(link);
+            }
+        } catch (error) {
+            // Leave the link in place so it still works as a normal page link
+            failed = true;
+            observer.disconnect();
+        } finally {
+            loading = false;
+        }
+    }
+
+    const observer = new IntersectionObserver(function (entries) {
+        if (entries.some(function (entry) { return entry.isIntersecting; })) loadMore();
+    }, { rootMargin: '400px' });
+
+    link.addEventListener('click', function (event) {
+        if (failed) return;
+        event.preventDefault();
+        loadMore();
+    });
+    observer.observe(link);
+});
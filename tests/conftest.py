@@ -0,0 +1,42 @@
+"""
+Shared test setup
+app.py configures itself from the environment at import time, so the
+environment is pointed at a throwaway directory before anything imports it.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORKDIR = tempfile.mkdtemp(prefix='vortex-tests-')
+os.environ.update({
+    'DATABASE_URL': f"sqlite:///{os.path.join(WORKDIR, 'vortex.db')}",
+    'RATELIMIT_STORAGE_URI': 'memory://',
+    'ADMISSION_STORAGE_PATH': os.path.join(WORKDIR, 'admission.db'),
+    'METRICS_DIR': os.path.join(WORKDIR, 'metrics'),
+    'PROFILE_DIR': os.path.join(WORKDIR, 'profiles'),
+    'SCHEDULER_ENABLED': '0',
+    'LOG_LEVEL': 'WARNING',
+})
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app as flask_app, limiter
+    from utils.synthetic_data import generate_data
+
+    flask_app.testing = True
+    limiter.enabled = False
+    # Enough rows per user that a query per row shows up as a budget overrun
+    generate_data(flask_app, users=30, subjects_per_user=3, chapters_per_subject=3, uploads_per_user=6,
+                  quiz_results_per_user=8, reviews_per_user=3, battles_per_user=0.5, seed=7)
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
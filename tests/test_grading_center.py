@@ -0,0 +1,34 @@
+"""
+The grading center's trend chart covers the latest results, not the
+20-row page of the results list that happens to be loaded.
+"""
+import re
+from datetime import datetime, timedelta
+
+from app import GRADING_TREND_SIZE
+
+
+def chart_points(html):
+    return re.search(r'const data = \[(.*?)\];', html, re.S).group(1).count(',')
+
+
+def test_trend_chart_is_independent_of_the_results_page(app, client):
+    from models import db, User, QuizResult
+
+    with app.app_context():
+        user = User(username='trendchart', email='trendchart@example.test', password='x')
+        db.session.add(user)
+        db.session.flush()
+        start = datetime(2024, 1, 1)
+        db.session.add_all([QuizResult(user_id=user.id, score=n % 10 * 10, total_questions=10,
+                                       completed_at=start + timedelta(days=n)) for n in range(45)])
+        db.session.commit()
+        user_id = user.id
+
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    first = client.get('/grading-center').get_data(as_text=True)
+    cursor = re.search(r'after=([^&"]+)', first).group(1)
+    later = client.get(f'/grading-center?after={cursor}').get_data(as_text=True)
+
+    assert chart_points(first) == chart_points(later) == GRADING_TREND_SIZE
@@ -0,0 +1,35 @@
+"""
+/metrics exposes per-endpoint latency, SQL timings and cache statistics.
+Behind a reverse proxy on the same host every client arrives from
+127.0.0.1, so loopback is only trusted when explicitly allowed.
+"""
+import pytest
+
+
+@pytest.fixture
+def metrics_config(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', None)
+    monkeypatch.setitem(app.config, 'METRICS_ALLOW_LOOPBACK', False)
+    return app.config
+
+
+def test_loopback_without_token_is_refused_by_default(client, metrics_config):
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '127.0.0.1'}).status_code == 403
+
+
+def test_admin_and_opted_in_loopback_may_read(client, metrics_config, monkeypatch):
+    with client.session_transaction() as session:
+        session['is_admin'] = True
+    assert client.get('/metrics').status_code == 200
+
+    with client.session_transaction() as session:
+        session.clear()
+    monkeypatch.setitem(metrics_config, 'METRICS_ALLOW_LOOPBACK', True)
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '127.0.0.1'}).status_code == 200
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '203.0.113.9'}).status_code == 403
+
+
+def test_token_is_required_when_set(client, metrics_config, monkeypatch):
+    monkeypatch.setitem(metrics_config, 'METRICS_TOKEN', 'scrape-secret')
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
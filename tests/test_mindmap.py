@@ -0,0 +1,66 @@
+"""
+Mind map requests are served under the upload's stored key: a conditional
+request must not read the source text, and no GET writes to the database.
+"""
+import pytest
+
+SOURCE = ('Photosynthesis converts light energy into chemical energy in plants. '
+          'Chlorophyll absorbs light energy inside the chloroplast membranes. '
+          'Plants store chemical energy as glucose made from carbon dioxide and water. '
+          'Cellular respiration releases the chemical energy stored in glucose. ') * 5
+
+
+@pytest.fixture(scope='module')
+def upload(app):
+    from app import schedule_mindmap
+    from models import db, Upload, User, store_source_text
+
+    with app.app_context():
+        user = db.session.query(User).order_by(User.id).first()
+        upload = Upload(filename='mindmap.txt', summary='Short summary about plants.', user_id=user.id,
+                        source_hash=store_source_text(SOURCE))
+        db.session.add(upload)
+        db.session.commit()
+        with app.test_request_context():
+            schedule_mindmap(upload)
+        return {'id': upload.id, 'user': user.id, 'key': upload.mindmap_key}
+
+
+def log_in(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+
+
+def test_conditional_request_does_not_build_the_tree(client, upload, monkeypatch):
+    from models import Upload
+
+    log_in(client, upload['user'])
+    response = client.get(f"/mindmap/{upload['id']}.svg")
+    assert response.status_code == 200
+    assert response.get_etag()[0] == upload['key']
+
+    def unexpected(self):
+        raise AssertionError('source text read for a request the client already has')
+    monkeypatch.setattr(Upload, 'get_source_text', unexpected)
+    for path in (f"/mindmap/{upload['id']}.svg", f"/api/mindmap/{upload['id']}"):
+        response = client.get(path, headers={'If-None-Match': f'"{upload["key"]}"'})
+        assert response.status_code == 304
+
+
+def test_png_is_served_from_the_stored_key_without_writes(app, client, upload):
+    from models import db, Upload
+
+    with app.app_context():
+        db.session.get(Upload, upload['id']).mindmap_key = 'mindmap_stale'
+        db.session.commit()
+
+    log_in(client, upload['user'])
+    response = client.get(f"/mindmap/{upload['id']}.png")
+    assert response.status_code == 200
+    with app.app_context():
+        assert db.session.get(Upload, upload['id']).mindmap_key == 'mindmap_stale'
+
+    from app import backfill_mindmap_keys
+    assert backfill_mindmap_keys() >= 1
+    with app.app_context():
+        assert db.session.get(Upload, upload['id']).mindmap_key == upload['key']
@@ -0,0 +1,71 @@
+"""
+Every view decorated with @query_budget(n) is requested against the seeded
+database. Under app.testing an overrun raises QueryBudgetExceeded out of the
+request, so a page that starts issuing a query per row fails here.
+"""
+import pytest
+
+from utils.query_counter import QueryBudgetExceeded
+
+# endpoint -> (who is logged in, path); {subject}/{upload} are filled from the seeded data
+BUDGETED_PAGES = {
+    'dashboard': ('user', '/dashboard'),
+    'api_dashboard_uploads': ('user', '/api/dashboard/uploads'),
+    'subjects': ('user', '/subjects'),
+    'view_subject': ('user', '/subject/{subject}'),
+    'shared_library': ('user', '/shared-library'),
+    'api_shared_library': ('user', '/api/shared-library?sort=rating'),
+    'grading_center': ('user', '/grading-center'),
+    'api_grading_results': ('user', '/api/grading-center/results'),
+    'review_upload': ('user', '/review/{upload}'),
+    'search': ('user', '/search?q=energy'),
+    'admin_panel': ('admin', '/admin/panel'),
+    'api_admin_stats': ('admin', '/api/admin/stats'),
+    'api_admin_jobs': ('admin', '/api/admin/jobs'),
+    'admin_users': ('admin', '/admin/users'),
+    'api_admin_users': ('admin', '/api/admin/users'),
+}
+
+
+@pytest.fixture(scope='module')
+def seeded(app):
+    """The busiest user, their largest subject and the most reviewed shared upload"""
+    from models import db, Upload, Subject
+
+    with app.app_context():
+        user_id = db.session.query(Upload.user_id).group_by(Upload.user_id).order_by(
+            db.func.count(Upload.id).desc()).limit(1).scalar()
+        subject_id = db.session.query(Subject.id).filter(Subject.user_id == user_id).order_by(
+            Subject.chapter_count.desc()).limit(1).scalar()
+        upload_id = db.session.query(Upload.id).filter(Upload.is_shared.is_(True)).order_by(
+            Upload.review_count.desc()).limit(1).scalar()
+    assert user_id and subject_id and upload_id, 'seed data is missing rows the pages need'
+    return {'user': user_id, 'subject': subject_id, 'upload': upload_id}
+
+
+def test_every_budgeted_view_is_covered(app):
+    budgeted = {name for name, view in app.view_functions.items() if hasattr(view, 'query_budget')}
+    assert budgeted == set(BUDGETED_PAGES)
+
+
+@pytest.mark.parametrize('endpoint', sorted(BUDGETED_PAGES))
+def test_page_stays_within_query_budget(app, client, seeded, endpoint):
+    from app import admin_stats
+
+    identity, path = BUDGETED_PAGES[endpoint]
+    with client.session_transaction() as session:
+        if identity == 'admin':
+            session['is_admin'] = True
+        else:
+            session['_user_id'] = str(seeded['user'])
+    # Cold caches, so the budget covers the worst case
+    admin_stats.invalidate()
+
+    try:
+        response = client.get(path.format(**seeded))
+    except QueryBudgetExceeded as e:
+        pytest.fail(str(e))
+
+    assert response.status_code == 200, response.status_code
+    budget = app.view_functions[endpoint].query_budget
+    assert int(response.headers['X-Query-Count']) <= budget
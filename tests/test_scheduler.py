@@ -0,0 +1,66 @@
+"""
+The scheduler thread has to survive database errors: once it dies, its
+worker never runs maintenance again.
+"""
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from utils.scheduler import Scheduler
+
+
+def locked(*args, **kwargs):
+    raise OperationalError('UPDATE job_lease', {}, Exception('database is locked'))
+
+
+def test_scheduler_thread_survives_database_errors(app, monkeypatch):
+    from models import db, JobLease
+
+    runs = []
+    scheduler = Scheduler(app, db, JobLease, tick=0.05)
+    scheduler.add('test_resilience', lambda: runs.append(1), interval=0)
+
+    failures = {'create': 1, 'run': 2}
+    create_leases, run_pending = scheduler._create_leases, scheduler.run_pending
+
+    def flaky(name, func):
+        def call():
+            if failures[name]:
+                failures[name] -= 1
+                locked()
+            return func()
+        return call
+
+    monkeypatch.setattr(scheduler, '_create_leases', flaky('create', create_leases))
+    monkeypatch.setattr(scheduler, 'run_pending', flaky('run', run_pending))
+    scheduler.ensure_started()
+    try:
+        deadline = time.monotonic() + 5
+        while not runs and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        scheduler.stop()
+    assert runs, 'the scheduler stopped running jobs after a database error'
+
+
+def test_lease_release_failure_does_not_escape(app, monkeypatch):
+    from models import db, JobLease
+
+    scheduler = Scheduler(app, db, JobLease, tick=60)
+    scheduler.add('test_release', lambda: 'done', interval=0)
+    with app.app_context():
+        scheduler._create_leases()
+
+    original_commit = db.session.commit
+    commits = []
+
+    def commit():
+        commits.append(1)
+        # The first commit claims the lease; the second releases it
+        if len(commits) == 2:
+            locked()
+        return original_commit()
+
+    monkeypatch.setattr(db.session, 'commit', commit)
+    assert scheduler.run_pending() == ['test_release']
+    assert scheduler.metrics['test_release']['runs'] == 1
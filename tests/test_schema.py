@@ -0,0 +1,33 @@
+"""
+Every gunicorn worker runs upgrade_schema at import. A worker that loses
+the race to add a column must carry on, not die on "duplicate column".
+"""
+import sqlalchemy
+
+
+def test_column_added_by_another_worker_is_skipped(app, monkeypatch):
+    from models import upgrade_schema
+
+    real_inspect = sqlalchemy.inspect
+    calls = []
+
+    class BeforeTheOtherWorker:
+        """The view this worker had before another one added user.username_lower"""
+        def __init__(self, inspector):
+            self.inspector = inspector
+
+        def __getattr__(self, name):
+            return getattr(self.inspector, name)
+
+        def get_columns(self, table_name):
+            columns = self.inspector.get_columns(table_name)
+            return [c for c in columns if not (table_name == 'user' and c['name'] == 'username_lower')]
+
+    def inspect(subject):
+        calls.append(subject)
+        inspector = real_inspect(subject)
+        return BeforeTheOtherWorker(inspector) if len(calls) == 1 else inspector
+
+    monkeypatch.setattr(sqlalchemy, 'inspect', inspect)
+    assert upgrade_schema(app) == []
+    assert len(calls) > 1, 'the duplicate column was never hit'
@@ -0,0 +1,24 @@
+"""
+Points are added with a single UPDATE, so points another request added
+after this one loaded the user are kept.
+"""
+
+
+def test_add_score_keeps_concurrent_points(app):
+    from models import db, User
+
+    with app.app_context():
+        user = User(username='scorerace', email='scorerace@example.test', password='x', score=90)
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        loaded = db.session.get(User, user_id)
+        assert loaded.score == 90
+
+        # Another worker adds 5 points after this request loaded the user
+        with db.engine.begin() as conn:
+            conn.execute(User.__table__.update().where(User.__table__.c.id == user_id).values(score=95))
+
+        loaded.add_score(10)
+        db.session.commit()
+        assert (loaded.score, loaded.level) == (105, 2)
@@ -0,0 +1,37 @@
+"""
+Shared library search on a SQLite build without FTS5: the app must keep
+working on the LIKE scan, and uploads must still be writable.
+"""
+import utils.search_index as search_index
+
+
+def test_search_without_fts5_falls_back_to_like(app, client, monkeypatch):
+    from models import db, Upload, User
+
+    with app.app_context():
+        engine = db.engine
+        user = db.session.query(User).order_by(User.id).first()
+    monkeypatch.setattr(search_index, '_probe_fts5', lambda engine: False)
+    search_index._fts_support.pop(engine, None)
+    try:
+        assert search_index.init_upload_search(app, db) is False
+        with app.app_context():
+            # Would fail with "no such module: fts5" if the index triggers were still there
+            db.session.add(Upload(filename='zebrafish.txt', summary='Zebrafish regrow fins.',
+                                  user_id=user.id, is_shared=True))
+            db.session.commit()
+            hits, _ = search_index.search_uploads(db, 'Zebrafish')
+        assert hits
+
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+        assert client.get('/search?q=zebrafish').status_code == 200
+    finally:
+        monkeypatch.undo()
+        search_index._fts_support.pop(engine, None)
+
+    # With FTS5 back, the index is rebuilt to include what was written meanwhile
+    assert search_index.init_upload_search(app, db) is True
+    with app.app_context():
+        hits, _ = search_index.search_uploads(db, 'zebrafish')
+    assert hits
@@ -0,0 +1,60 @@
+"""
+Case-insensitive login lookups through the lowercase columns, including
+users the backfill could not fill because of a collision.
+"""
+import pytest
+from werkzeug.security import generate_password_hash
+
+PASSWORD = 'Passw0rdX'
+
+
+@pytest.fixture
+def legacy_users(app):
+    """carol and dave, created before the lowercase columns existed; their emails differ only in case"""
+    from models import db, User
+
+    table = User.__table__
+    password = generate_password_hash(PASSWORD, method='pbkdf2:sha256')
+    with app.app_context():
+        result = db.session.execute(table.insert(), [
+            {'username': 'Carol', 'email': 'Foo@x.test', 'password': password, 'score': 0, 'level': 1},
+            {'username': 'dave', 'email': 'foo@x.test', 'password': password, 'score': 0, 'level': 1},
+        ])
+        db.session.commit()
+        ids = [row.id for row in db.session.execute(
+            db.select(table.c.id).where(table.c.username.in_(['Carol', 'dave'])).order_by(table.c.id))]
+    yield ids
+    with app.app_context():
+        db.session.execute(table.delete().where(table.c.id.in_(ids)))
+        db.session.commit()
+
+
+def test_email_collision_does_not_block_username(app, client, legacy_users):
+    from models import db, User, backfill_normalized_identities
+
+    result = backfill_normalized_identities(app)
+    carol_id, dave_id = legacy_users
+    assert result['conflicts']['email_lower'] == [dave_id]
+    assert result['conflicts']['username_lower'] == []
+
+    with app.app_context():
+        dave = db.session.get(User, dave_id)
+        assert (dave.username_lower, dave.email_lower) == ('dave', None)
+
+    response = client.post('/login', data={'username': 'Dave', 'password': PASSWORD})
+    assert response.status_code == 302 and response.headers['Location'].endswith('/')
+
+
+def test_login_finds_users_left_unfilled(app, client, legacy_users):
+    from models import db, User
+
+    with app.app_context():
+        # As if the backfill had not reached (or could not fill) these rows
+        db.session.execute(User.__table__.update().where(User.__table__.c.id.in_(legacy_users)).values(
+            username_lower=None, email_lower=None))
+        db.session.commit()
+        assert User.find_by_username('CAROL').id == legacy_users[0]
+        assert User.find_by_email('FOO@x.test') is not None
+
+    response = client.post('/login', data={'username': 'DAVE', 'password': PASSWORD})
+    assert response.status_code == 302 and response.headers['Location'].endswith('/')
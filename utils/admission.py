@@ -0,0 +1,198 @@
+"""
+Admission control for the processing pipeline
+Each summarize request is charged an estimated cost (roughly CPU-seconds:
+OCR on a large image costs far more than a short paste) against two token
+buckets, one per user and one for the whole host. A user out of tokens is
+turned away at once; when only the global bucket is short, the request waits
+in a bounded queue for up to ADMISSION_MAX_WAIT seconds before it is
+rejected. Rejections carry a Retry-After computed from the refill rate.
+
+Buckets live in the same SQLite file as the rate-limit counters, so every
+worker on the host draws from the same budget.
+"""
+import time
+import zipfile
+import threading
+
+from werkzeug.exceptions import TooManyRequests
+
+from .extraction import MAX_PDF_PAGES, MAX_SLIDES
+from .rate_limit_storage import LocalConnection
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS token_bucket (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID"""
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'bmp', 'tiff', 'gif', 'webp'}
+
+
+def estimate_text_cost(text):
+    """Preprocessing, summarizing and quiz generation for pasted or stored text"""
+    return 1 + len(text or '') / 5000
+
+
+def estimate_file_cost(file, ext):
+    """
+    Cost of extracting and processing an uploaded file, from its type, size
+    and page count. Reads only the PDF cross-reference table or the PPTX zip
+    directory, and rewinds the stream afterwards.
+    """
+    stream = file.stream
+    stream.seek(0, 2)
+    size_mb = stream.tell() / (1024 * 1024)
+    stream.seek(0)
+
+    try:
+        if ext in IMAGE_EXTENSIONS:
+            # Tesseract OCR dominates everything else
+            return 8 + 4 * size_mb
+        if ext == 'pdf':
+            import PyPDF2
+            pages = len(PyPDF2.PdfReader(stream).pages)
+            return 1 + 0.5 * min(pages, MAX_PDF_PAGES)
+        if ext == 'pptx':
+            slides = sum(1 for name in zipfile.ZipFile(stream).namelist()
+                         if name.startswith('ppt/slides/slide') and name.endswith('.xml'))
+            return 1 + 0.3 * min(slides, MAX_SLIDES)
+        if ext == 'docx':
+            return 1 + 2 * size_mb
+        return 1 + size_mb
+    except Exception:
+        # Unreadable files fail later in extraction; charge as if they were full size
+        return 1 + 0.5 * MAX_PDF_PAGES
+    finally:
+        stream.seek(0)
+
+
+class AdmissionRejected(TooManyRequests):
+    """429 with Retry-After; reason is 'user', 'global' or 'queue_full'"""
+
+    def __init__(self, reason, retry_after):
+        self.reason = reason
+        super().__init__(
+            description=f'Server is busy processing other documents. Try again in {retry_after} seconds.',
+            retry_after=retry_after
+        )
+
+
+class TokenBucketStore:
+    """Token buckets refilled continuously, updated atomically across processes"""
+
+    def __init__(self, path):
+        self._connection = LocalConnection(path)
+        self._connection().execute(SCHEMA)
+
+    def take(self, key, cost, capacity, rate):
+        """
+        Take cost tokens if available.
+
+        Returns:
+            0 when taken, otherwise seconds until enough tokens will have refilled
+        """
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            row = conn.execute('SELECT tokens, updated_at FROM token_bucket WHERE key = ?', (key,)).fetchone()
+            available = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            if available < cost:
+                conn.execute('COMMIT')
+                return (cost - available) / rate
+            conn.execute(
+                'INSERT INTO token_bucket (key, tokens, updated_at) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at',
+                (key, available - cost, now)
+            )
+            conn.execute('COMMIT')
+            return 0
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def refund(self, key, cost, capacity):
+        self._connection().execute(
+            'UPDATE token_bucket SET tokens = min(?, tokens + ?) WHERE key = ?', (capacity, cost, key)
+        )
+
+
+class AdmissionController:
+    """
+    Args:
+        store: TokenBucketStore
+        user_capacity / user_rate: per-user burst size and refill per second
+        global_capacity / global_rate: host-wide burst size and refill per second
+        max_queue: requests per worker allowed to wait for the global bucket
+        max_wait: longest a queued request waits before it is rejected
+    """
+
+    def __init__(self, store, user_capacity, user_rate, global_capacity, global_rate, max_queue=8, max_wait=10):
+        self.store = store
+        self.user_capacity = user_capacity
+        self.user_rate = user_rate
+        self.global_capacity = global_capacity
+        self.global_rate = global_rate
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._metrics = {
+            'admitted': 0, 'cost_admitted': 0.0, 'queued': 0, 'queue_depth': 0, 'max_queue_depth': 0,
+            'queue_wait_ms_total': 0.0, 'rejected_user': 0, 'rejected_global': 0, 'rejected_queue_full': 0
+        }
+
+    def _reject(self, reason, wait, user_key=None, cost=0):
+        if user_key is not None:
+            self.store.refund(user_key, cost, self.user_capacity)
+        with self._lock:
+            self._metrics[f'rejected_{reason}'] += 1
+        raise AdmissionRejected(reason, max(1, int(wait + 0.999)))
+
+    def admit(self, user_id, cost):
+        """Charge cost to the user and the host, waiting in the queue if needed; raises AdmissionRejected"""
+        # A request bigger than a bucket could never be admitted, so cap it at a full bucket
+        cost = min(cost, self.user_capacity, self.global_capacity)
+        user_key = f'user:{user_id}'
+
+        wait = self.store.take(user_key, cost, self.user_capacity, self.user_rate)
+        if wait:
+            self._reject('user', wait)
+
+        queued_at = None
+        try:
+            while True:
+                wait = self.store.take('global', cost, self.global_capacity, self.global_rate)
+                if not wait:
+                    break
+                if queued_at is None:
+                    with self._lock:
+                        full = self._metrics['queue_depth'] >= self.max_queue
+                        if not full:
+                            self._metrics['queue_depth'] += 1
+                            self._metrics['queued'] += 1
+                            self._metrics['max_queue_depth'] = max(self._metrics['max_queue_depth'],
+                                                                   self._metrics['queue_depth'])
+                    if full:
+                        self._reject('queue_full', wait, user_key, cost)
+                    queued_at = time.monotonic()
+                if time.monotonic() - queued_at + wait > self.max_wait:
+                    self._reject('global', wait, user_key, cost)
+                # Other workers draw from the same bucket, so re-check rather than sleep the full wait
+                time.sleep(min(wait, 0.25))
+        finally:
+            if queued_at is not None:
+                with self._lock:
+                    self._metrics['queue_depth'] -= 1
+                    self._metrics['queue_wait_ms_total'] += (time.monotonic() - queued_at) * 1000
+
+        with self._lock:
+            self._metrics['admitted'] += 1
+            self._metrics['cost_admitted'] += cost
+        return cost
+
+    def metrics(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics['cost_admitted'] = round(metrics['cost_admitted'], 2)
+        metrics['queue_wait_ms_total'] = round(metrics['queue_wait_ms_total'], 1)
+        return metrics
@@ -0,0 +1,177 @@
+"""
+Chart rendering service
+Renders every chart at most once: output files are keyed by a hash of their
+inputs and kept in a size-capped directory with least-recently-used eviction.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+CHART_CACHE_MAX_BYTES = int(os.environ.get('CHART_CACHE_MAX_MB', 64)) * 1024 * 1024
+LOCK_STRIPES = 64
+
+
+def hash_inputs(*parts):
+    """Stable hash of everything that affects how an artifact looks"""
+    payload = json.dumps(parts, default=str, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:20]
+
+
+class ChartStore:
+    """
+    Size-capped directory of rendered files with LRU eviction.
+    File mtimes record recency so all workers sharing the directory agree on it.
+    """
+
+    def __init__(self, folder, max_bytes=CHART_CACHE_MAX_BYTES, extension='png'):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self._entries = None  # name -> size, oldest first
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, key):
+        return os.path.join(self.folder, f'{key}.{self.extension}')
+
+    def _scan(self):
+        """Rebuild the index from disk, ordered by last use"""
+        entries = []
+        suffix = f'.{self.extension}'
+        try:
+            with os.scandir(self.folder) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.endswith(suffix) and entry.name.count('.') == 1:
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.name, stat.st_size))
+        except FileNotFoundError:
+            pass
+        entries.sort()
+        self._entries = OrderedDict((name, size) for _, name, size in entries)
+        self._total = sum(self._entries.values())
+
+    def lookup(self, key):
+        """Return the cached path and mark it as recently used, or None"""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if self._entries is not None and os.path.basename(path) in self._entries:
+                self._entries.move_to_end(os.path.basename(path))
+        return path
+
+    def add(self, key):
+        """Record a freshly written file and evict old ones if over the cap"""
+        path = self.path_for(key)
+        name = os.path.basename(path)
+        size = os.path.getsize(path)
+        with self._lock:
+            if self._entries is None:
+                self._scan()
+            else:
+                self._total += size - self._entries.pop(name, 0)
+                self._entries[name] = size
+            if self._total > self.max_bytes:
+                self._evict(keep=name)
+        return path
+
+    def _evict(self, keep):
+        # Other workers write to the same folder, so re-read it before deleting
+        self._scan()
+        low_watermark = self.max_bytes * 0.9
+        for name in list(self._entries):
+            if self._total <= low_watermark:
+                break
+            if name == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except FileNotFoundError:
+                pass
+            self._total -= self._entries.pop(name)
+
+    def trim(self, stale_seconds=3600):
+        """
+        Periodic cleanup: delete temp files left by crashed renders and
+        evict down to the cap even if no new chart has been added lately.
+
+        Returns:
+            Number of files removed
+        """
+        removed = 0
+        cutoff = time.time() - stale_seconds
+        suffix = f'.{self.extension}'
+        try:
+            with os.scandir(self.folder) as it:
+                for entry in it:
+                    # name.pid.tid.ext is a render in progress (see ChartRenderService)
+                    if entry.is_file() and entry.name.endswith(suffix) and entry.name.count('.') > 1 \
+                            and entry.stat().st_mtime < cutoff:
+                        try:
+                            os.remove(entry.path)
+                            removed += 1
+                        except FileNotFoundError:
+                            pass
+        except FileNotFoundError:
+            return removed
+
+        with self._lock:
+            self._scan()
+            before = len(self._entries)
+            if self._total > self.max_bytes:
+                self._evict(keep=None)
+            removed += before - len(self._entries)
+        return removed
+
+    def usage(self):
+        with self._lock:
+            if self._entries is None:
+                self._scan()
+            return {'files': len(self._entries), 'bytes': self._total, 'max_bytes': self.max_bytes}
+
+
+class ChartRenderService:
+    """
+    Renders charts through a caller-supplied function exactly once per key.
+    Concurrent requests for the same key wait for the first render instead of repeating it.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    def get_or_render(self, key, render):
+        """
+        Args:
+            key: hash of the chart inputs (see hash_inputs)
+            render: callable(output_path) that writes the file
+
+        Returns:
+            Absolute path of the rendered file
+        """
+        path = self.store.lookup(key)
+        if path:
+            return path
+
+        with self._locks[zlib.crc32(key.encode('utf-8')) % LOCK_STRIPES]:
+            path = self.store.lookup(key)
+            if path:
+                return path
+
+            os.makedirs(self.store.folder, exist_ok=True)
+            final_path = self.store.path_for(key)
+            # Render under a temporary name so readers never see a half-written file
+            tmp_path = f'{final_path[:-len(self.store.extension) - 1]}.{os.getpid()}.{threading.get_ident()}.{self.store.extension}'
+            try:
+                render(tmp_path)
+                os.replace(tmp_path, final_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            return self.store.add(key)
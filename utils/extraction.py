@@ -0,0 +1,95 @@
+"""
+Text extraction for uploaded documents
+Only the start of a document is read: the first MAX_PDF_PAGES pages of a
+PDF, MAX_SLIDES slides of a presentation and at most MAX_CHARS characters,
+which is all the summarizer uses.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_CHARS = 10000
+MAX_PDF_PAGES = 15
+MAX_SLIDES = 10
+
+
+def extract_text_from_file(filepath, ext):
+    """Text of an uploaded TXT, PDF, DOCX or PPTX file, capped at MAX_CHARS; "" when it can't be read"""
+    try:
+        file_text = ""
+        
+        if ext == 'txt':
+            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+                file_text = f.read(MAX_CHARS)
+            logger.debug("✅ TXT extracted: %d chars", len(file_text))
+        
+        elif ext == 'pdf':
+            import PyPDF2
+            with open(filepath, 'rb') as f:
+                reader = PyPDF2.PdfReader(f)
+                total_pages = len(reader.pages)
+                pages_to_read = min(MAX_PDF_PAGES, total_pages)
+                
+                text_chunks = []
+                for i in range(pages_to_read):
+                    try:
+                        page_text = reader.pages[i].extract_text() or ""
+                        if page_text.strip():
+                            text_chunks.append(page_text)
+                    except:
+                        continue
+                
+                file_text = "\n".join(text_chunks)[:MAX_CHARS]
+            logger.debug("✅ PDF extracted: %d chars (%d/%d pages)", len(file_text), pages_to_read, total_pages)
+        
+        elif ext == 'docx':
+            import docx
+            doc = docx.Document(filepath)
+            
+            paragraphs = []
+            for i, para in enumerate(doc.paragraphs):
+                if i >= 100:
+                    break
+                text = para.text.strip()
+                if text and len(text) > 10:
+                    paragraphs.append(text)
+            
+            file_text = "\n".join(paragraphs)[:MAX_CHARS]
+            logger.debug("✅ DOCX extracted: %d chars (%d paragraphs)", len(file_text), len(paragraphs))
+        
+        elif ext == 'pptx':
+            from pptx import Presentation
+            prs = Presentation(filepath)
+            total_slides = len(prs.slides)
+            slides_to_read = min(MAX_SLIDES, total_slides)
+            extracted_text = []
+            
+            for slide_num, slide in enumerate(list(prs.slides)[:slides_to_read]):
+                if len(extracted_text) >= 50:
+                    break
+                
+                for shape in slide.shapes:
+                    if not hasattr(shape, "text"):
+                        continue
+                    
+                    text_content = shape.text.strip()
+                    if not text_content or len(text_content) > 300:
+                        continue
+                    
+                    if hasattr(shape, 'text_frame') and shape.text_frame.paragraphs:
+                        if len(shape.text_frame.paragraphs) == 1:
+                            extracted_text.append(text_content)
+                        else:
+                            for para in shape.text_frame.paragraphs[:5]:
+                                bullet_text = para.text.strip()
+                                if bullet_text and len(bullet_text) > 5:
+                                    extracted_text.append(bullet_text)
+            
+            file_text = "\n".join(extracted_text)[:MAX_CHARS]
+            logger.debug("✅ PPTX extracted: %d chars (%d/%d slides)", len(file_text), slides_to_read, total_slides)
+        
+        return file_text
+    
+    except Exception as e:
+        logger.warning("❌ Error extracting from %s: %s", ext, e)
+        return ""
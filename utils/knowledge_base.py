@@ -2,6 +2,12 @@
 Knowledge Base - مستودع المعلومات الجاهزة
 مواضيع دراسية جاهزة للطلاب
 """
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+from .preprocessing import preprocess_text
+from .summarizer import summarize_text_with_style, SUMMARY_STYLES, SUMMARY_LENGTHS
 
 KNOWLEDGE_BASE = {
     # ============= Computer Science =============
@@ -467,24 +473,70 @@ Provided timeless insights into human experience.
     }
 }
 
+# ============= Precomputed index =============
+# المحتوى ثابت، لذلك تُبنى الفهارس والملخصات مرة واحدة عند تحميل الوحدة في كل عامل
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def _topic_card(key, item, with_category=False):
+    card = {'id': key, 'title': item['title'], 'icon': item['icon']}
+    if with_category:
+        card['category'] = item['category']
+    return card
+
+
+def _build_index():
+    """فهرس مقلوب: كلمة -> مواضيع، وخريطة الفئة -> المواضيع"""
+    index = defaultdict(set)
+    haystacks = {}
+    by_category = defaultdict(list)
+    for key, item in KNOWLEDGE_BASE.items():
+        haystack = f"{item['title']}\n{item['content']}".lower()
+        haystacks[key] = haystack
+        for token in TOKEN_PATTERN.findall(haystack):
+            index[token].add(key)
+        by_category[item['category']].append(_topic_card(key, item))
+    return dict(index), sorted(index), haystacks, dict(by_category)
+
+
+TOKEN_INDEX, VOCABULARY, TOPIC_TEXT, CATEGORY_TOPICS = _build_index()
+CATEGORIES = sorted(CATEGORY_TOPICS)
+TOPIC_ORDER = {key: position for position, key in enumerate(KNOWLEDGE_BASE)}
+
+
+def _topics_with_prefix(prefix):
+    """المواضيع التي تحتوي كلمة تبدأ بالبادئة (بحث ثنائي في المفردات المرتبة)"""
+    topics = set()
+    for position in range(bisect_left(VOCABULARY, prefix), len(VOCABULARY)):
+        token = VOCABULARY[position]
+        if not token.startswith(prefix):
+            break
+        topics |= TOKEN_INDEX[token]
+    return topics
+
+
+def _precompute_summaries():
+    """ملخص جاهز لكل موضوع بكل نمط وطول"""
+    summaries = {}
+    for key, item in KNOWLEDGE_BASE.items():
+        cleaned_text = preprocess_text(item['content'])
+        for style in SUMMARY_STYLES:
+            for length in SUMMARY_LENGTHS:
+                summaries[(key, style, length)] = summarize_text_with_style(cleaned_text, style=style, length=length)
+    return summaries
+
+
+TOPIC_SUMMARIES = _precompute_summaries()
+
+
 def get_all_categories():
     """الحصول على جميع الفئات المتاحة"""
-    categories = set()
-    for item in KNOWLEDGE_BASE.values():
-        categories.add(item['category'])
-    return sorted(list(categories))
+    return list(CATEGORIES)
 
 def get_topics_by_category(category):
     """الحصول على المواضيع حسب الفئة"""
-    topics = []
-    for key, item in KNOWLEDGE_BASE.items():
-        if item['category'] == category:
-            topics.append({
-                'id': key,
-                'title': item['title'],
-                'icon': item['icon']
-            })
-    return topics
+    return list(CATEGORY_TOPICS.get(category, []))
 
 def get_topic_content(topic_id):
     """الحصول على محتوى موضوع معين"""
@@ -492,16 +544,28 @@ def get_topic_content(topic_id):
         return KNOWLEDGE_BASE[topic_id]
     return None
 
+def get_topic_summary(topic_id, style='paragraphs', length='medium'):
+    """الملخص المحسوب مسبقاً لموضوع (الأنماط والأطوال غير المعروفة تعامل كالافتراضية)"""
+    if style not in SUMMARY_STYLES:
+        style = 'paragraphs'
+    if length not in SUMMARY_LENGTHS:
+        length = 'medium'
+    return TOPIC_SUMMARIES.get((topic_id, style, length))
+
 def search_topics(query):
     """البحث في المواضيع"""
     query = query.lower()
-    results = []
-    for key, item in KNOWLEDGE_BASE.items():
-        if query in item['title'].lower() or query in item['content'].lower():
-            results.append({
-                'id': key,
-                'title': item['title'],
-                'category': item['category'],
-                'icon': item['icon']
-            })
-    return results
\ No newline at end of file
+    tokens = TOKEN_PATTERN.findall(query)
+    if tokens:
+        # كل كلمة في الاستعلام يجب أن تكون بادئة لكلمة في الموضوع
+        candidates = _topics_with_prefix(tokens[0])
+        for token in tokens[1:]:
+            if not candidates:
+                break
+            candidates &= _topics_with_prefix(token)
+    else:
+        candidates = KNOWLEDGE_BASE.keys()
+    
+    # التحقق من العبارة كاملة على المرشحين فقط
+    matches = sorted((key for key in candidates if query in TOPIC_TEXT[key]), key=TOPIC_ORDER.get)
+    return [_topic_card(key, KNOWLEDGE_BASE[key], with_category=True) for key in matches]
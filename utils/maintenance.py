@@ -0,0 +1,42 @@
+"""
+Artifact garbage collection
+Sweeps files that nothing references any more: timestamped charts from the
+legacy visualization helpers and uploads orphaned by a crashed request.
+"""
+import os
+import re
+import time
+
+# table_/chart_/pie_/line_YYYYmmdd_HHMMSS.png written by utils.visualization without a cache key
+LEGACY_CHART_PATTERN = re.compile(r'^(table|chart|pie|line)_\d{8}_\d{6}\.png$')
+
+
+def remove_stale_files(folder, max_age_seconds, pattern=None):
+    """
+    Delete regular files in folder (not subfolders) older than max_age_seconds.
+
+    Args:
+        pattern: optional compiled regex; only matching file names are removed
+
+    Returns:
+        (files removed, bytes freed)
+    """
+    removed, freed = 0, 0
+    cutoff = time.time() - max_age_seconds
+    try:
+        with os.scandir(folder) as it:
+            for entry in it:
+                if not entry.is_file() or (pattern and not pattern.match(entry.name)):
+                    continue
+                stat = entry.stat()
+                if stat.st_mtime >= cutoff:
+                    continue
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                removed += 1
+                freed += stat.st_size
+    except FileNotFoundError:
+        pass
+    return removed, freed
@@ -0,0 +1,274 @@
+"""
+Lightweight metrics with a Prometheus text endpoint
+Counters, gauges and histograms are kept in memory per worker. Each worker
+writes a snapshot to METRICS_DIR every few seconds, and /metrics merges every
+worker's file, so a scrape sees totals across all gunicorn workers whichever
+worker answers it. Files of workers that are no longer running are removed
+when a new worker starts, so counters restart from zero after a restart or
+worker recycle (Prometheus treats that as a counter reset).
+
+init_metrics(app, db) adds per-endpoint request latency, SQL query durations
+and queries per request; stage timers come from metrics.timer().
+"""
+import os
+import json
+import logging
+import time
+import threading
+from contextlib import contextmanager
+
+from flask import g, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# OCR and long summaries run well past the request buckets
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metrics:
+    """Per-worker registry of metric families, merged across workers through METRICS_DIR"""
+
+    def __init__(self):
+        self.folder = None
+        self.flush_interval = 5
+        self._families = {}    # name -> {'type', 'help', 'buckets'}
+        self._samples = {}     # name -> {label key: value, or [bucket counts..., sum, count]}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._pid = None
+
+    # ---------- definition ----------
+    def _define(self, name, kind, help, buckets=None):
+        self._families[name] = {'type': kind, 'help': help, 'buckets': list(buckets) if buckets else None}
+        self._samples.setdefault(name, {})
+
+    def counter(self, name, help):
+        self._define(name, 'counter', help)
+
+    def gauge(self, name, help):
+        self._define(name, 'gauge', help)
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        self._define(name, 'histogram', help, buckets)
+
+    def add_collector(self, collect):
+        """collect() returns (name, labels dict, value) tuples, read on every snapshot (for gauges/counters kept elsewhere)"""
+        self._collectors.append(collect)
+
+    # ---------- recording ----------
+    def inc(self, name, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            samples = self._samples[name]
+            samples[key] = samples.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._samples[name][_label_key(labels)] = value
+
+    def observe(self, name, value, **labels):
+        buckets = self._families[name]['buckets']
+        key = _label_key(labels)
+        with self._lock:
+            sample = self._samples[name].get(key)
+            if sample is None:
+                sample = self._samples[name][key] = [0] * len(buckets) + [0.0, 0]
+            for position, bound in enumerate(buckets):
+                if value <= bound:
+                    sample[position] += 1
+            sample[-2] += value
+            sample[-1] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of the block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    # ---------- aggregation ----------
+    def snapshot(self):
+        for collect in self._collectors:
+            for name, labels, value in collect():
+                self.set(name, value, **labels)
+        with self._lock:
+            return {
+                name: [[list(key), value if not isinstance(value, list) else list(value)]
+                       for key, value in samples.items()]
+                for name, samples in self._samples.items()
+            }
+
+    def _path(self, pid):
+        return os.path.join(self.folder, f'worker-{pid}.json')
+
+    def flush(self):
+        """Write this worker's snapshot for the other workers' /metrics to read"""
+        if not self.folder:
+            return
+        path = self._path(os.getpid())
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def _remove_dead_workers(self):
+        for name in os.listdir(self.folder):
+            if not (name.startswith('worker-') and name.endswith('.json')):
+                continue
+            try:
+                os.kill(int(name[len('worker-'):-len('.json')]), 0)
+            except (ValueError, ProcessLookupError):
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                except FileNotFoundError:
+                    pass
+            except PermissionError:
+                pass  # running, owned by someone else
+
+    def ensure_started(self):
+        """Start this worker's flush thread (per process, so it also runs in forked workers)"""
+        if not self.folder or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        os.makedirs(self.folder, exist_ok=True)
+        self._remove_dead_workers()
+        threading.Thread(target=self._flush_loop, name='vortex-metrics', daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning("⚠️ Metrics flush failed: %s", e)
+
+    def collect(self):
+        """Merged samples of every worker: counters, gauges and histogram buckets are summed"""
+        if not self.folder:
+            snapshots = [self.snapshot()]
+        else:
+            self.flush()
+            snapshots = []
+            for name in os.listdir(self.folder):
+                if name.startswith('worker-') and name.endswith('.json'):
+                    try:
+                        with open(os.path.join(self.folder, name)) as f:
+                            snapshots.append(json.load(f))
+                    except (OSError, ValueError):
+                        continue  # worker exited or is mid-write
+
+        merged = {name: {} for name in self._families}
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                if name not in merged:
+                    continue
+                for key, value in samples:
+                    key = tuple(tuple(pair) for pair in key)
+                    current = merged[name].get(key)
+                    if current is None:
+                        merged[name][key] = value
+                    elif isinstance(value, list):
+                        merged[name][key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        merged[name][key] = current + value
+        return merged
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for name, samples in self.collect().items():
+            family = self._families[name]
+            lines.append(f'# HELP {name} {family["help"]}')
+            lines.append(f'# TYPE {name} {family["type"]}')
+            for key, value in sorted(samples.items()):
+                if family['type'] != 'histogram':
+                    lines.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+                    continue
+                for bound, count in zip(family['buckets'], value):
+                    lines.append(f'{name}_bucket{_format_labels(key + (("le", _format_value(bound)),))} {count}')
+                lines.append(f'{name}_bucket{_format_labels(key + (("le", "+Inf"),))} {value[-1]}')
+                lines.append(f'{name}_sum{_format_labels(key)} {_format_value(round(value[-2], 6))}')
+                lines.append(f'{name}_count{_format_labels(key)} {value[-1]}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+metrics.histogram('vortex_http_request_duration_seconds', 'Request latency by endpoint')
+metrics.counter('vortex_http_requests_total', 'Requests by endpoint, method and status')
+metrics.histogram('vortex_http_request_queries', 'SQL queries per request by endpoint', QUERY_COUNT_BUCKETS)
+metrics.histogram('vortex_db_query_duration_seconds', 'SQL statement duration by operation', QUERY_BUCKETS)
+metrics.histogram('vortex_pipeline_stage_duration_seconds', 'Processing pipeline stage duration', STAGE_BUCKETS)
+
+
+
+def stage_timer(stage):
+    """Time one stage of the processing pipeline (extract, ocr, preprocess, summarize, quiz, mindmap...)"""
+    return metrics.timer('vortex_pipeline_stage_duration_seconds', stage=stage)
+
+
+def init_metrics(app, db):
+    """Time every request and SQL statement on the app; METRICS_DIR enables cross-worker aggregation"""
+    metrics.folder = app.config.get('METRICS_DIR')
+    metrics.flush_interval = app.config.get('METRICS_FLUSH_SECONDS', 5)
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        # A connection runs one statement at a time; a failed one is simply overwritten
+        conn.info['query_started'] = time.perf_counter()
+
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop('query_started', time.perf_counter())
+        operation = statement.lstrip()[:6].lower()
+        if operation not in ('select', 'insert', 'update', 'delete'):
+            operation = 'other'
+        metrics.observe('vortex_db_query_duration_seconds', elapsed, operation=operation)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', before_execute)
+        event.listen(db.engine, 'after_cursor_execute', after_execute)
+
+    @app.before_request
+    def start_request_timer():
+        metrics.ensure_started()
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.get('request_started')
+        if started is not None:
+            # Unmatched URLs share one label so scanners can't create unbounded series
+            endpoint = request.endpoint or 'unmatched'
+            metrics.observe('vortex_http_request_duration_seconds', time.perf_counter() - started,
+                            endpoint=endpoint, method=request.method)
+            metrics.inc('vortex_http_requests_total', endpoint=endpoint, method=request.method,
+                        status=response.status_code)
+            metrics.observe('vortex_http_request_queries', g.get('query_count', 0), endpoint=endpoint)
+        return response
@@ -1,4 +1,7 @@
 import os
+import logging
+
+logger = logging.getLogger(__name__)
 
 def extract_text_from_image(image_path):
     """
@@ -8,7 +11,7 @@ def extract_text_from_image(image_path):
         # محاولة استخدام Tesseract OCR
         return _extract_with_tesseract(image_path)
     except Exception as e:
-        print(f"❌ OCR Error: {str(e)}")
+        logger.warning("❌ OCR Error: %s", e)
         # إذا فشل Tesseract، جرب PIL فقط
         return _extract_with_pil(image_path)
 
@@ -33,11 +36,11 @@ def _extract_with_tesseract(image_path):
             if path == 'tesseract' or os.path.exists(path):
                 pytesseract.pytesseract.tesseract_cmd = path
                 tesseract_found = True
-                print(f"✅ Tesseract found at: {path}")
+                logger.debug("✅ Tesseract found at: %s", path)
                 break
 
         if not tesseract_found:
-            print("❌ Tesseract not found! Trying PIL fallback...")
+            logger.warning("❌ Tesseract not found! Trying PIL fallback...")
             return _extract_with_pil(image_path)
 
         # قراءة الصورة
@@ -48,7 +51,7 @@ def _extract_with_tesseract(image_path):
             from PIL import Image
             pil_img = Image.open(image_path)
             text = pytesseract.image_to_string(pil_img, lang='eng')
-            print(f"✅ OCR (PIL) extracted {len(text)} characters")
+            logger.debug("✅ OCR (PIL) extracted %d characters", len(text))
             return text.strip()
 
         # تحسين الصورة
@@ -62,14 +65,14 @@ def _extract_with_tesseract(image_path):
         except:
             text = pytesseract.image_to_string(threshold, lang='eng')
 
-        print(f"✅ OCR extracted {len(text)} characters from image")
+        logger.debug("✅ OCR extracted %d characters from image", len(text))
         return text.strip()
 
     except ImportError as e:
-        print(f"❌ Missing library: {e}")
+        logger.warning("❌ Missing library: %s", e)
         return _extract_with_pil(image_path)
     except Exception as e:
-        print(f"❌ Tesseract error: {e}")
+        logger.warning("❌ Tesseract error: %s", e)
         return _extract_with_pil(image_path)
 
 def _extract_with_pil(image_path):
@@ -77,11 +80,11 @@ def _extract_with_pil(image_path):
     try:
         from PIL import Image
         img = Image.open(image_path)
-        print(f"✅ Image opened with PIL: {img.size}")
+        logger.debug("✅ Image opened with PIL: %s", img.size)
         # PIL وحده لا يستطيع OCR - نرجع رسالة توضيحية
         return ""
     except Exception as e:
-        print(f"❌ PIL error: {e}")
+        logger.warning("❌ PIL error: %s", e)
         return ""
 
 def is_image_file(filename):
@@ -104,5 +107,5 @@ def preprocess_image_for_ocr(image_path, output_path=None):
             cv2.imwrite(output_path, binary)
         return binary
     except Exception as e:
-        print(f"❌ Image preprocessing error: {e}")
+        logger.warning("❌ Image preprocessing error: %s", e)
         return None
\ No newline at end of file
@@ -0,0 +1,64 @@
+"""
+Keyset (cursor) pagination
+Pages are fetched with WHERE (sort, id) < (last sort, last id) on an indexed
+column instead of OFFSET, so every page costs the same however deep it is.
+"""
+import json
+import base64
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+PAGE_SIZE = 20
+
+KeysetPage = namedtuple('KeysetPage', ['items', 'next_cursor'])
+
+
+def encode_cursor(value, row_id):
+    """Opaque, URL-safe cursor for the last row of a page"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_column):
+    """Returns (sort value, id), or None when the cursor is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if sort_column.type.python_type is datetime:
+            value = datetime.fromisoformat(value)
+        return value, int(row_id)
+    except (ValueError, TypeError, NotImplementedError):
+        return None
+
+
+def paginate_keyset(query, sort_column, id_column, cursor=None, per_page=PAGE_SIZE):
+    """
+    Newest/highest first page of query ordered by (sort_column, id_column) descending
+
+    Args:
+        query: filtered SQLAlchemy query
+        sort_column: indexed, non-null column to order by (e.g. Upload.uploaded_at)
+        id_column: primary key, breaks ties between equal sort values
+        cursor: next_cursor of the previous page
+
+    Returns:
+        KeysetPage(items, next_cursor); next_cursor is None on the last page
+    """
+    after = decode_cursor(cursor, sort_column)
+    if after:
+        # Row-value comparison lets the database seek straight into the index
+        query = query.filter(tuple_(sort_column, id_column) < tuple_(*after))
+
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(per_page + 1).all()
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return KeysetPage(items, next_cursor)
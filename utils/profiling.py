@@ -0,0 +1,210 @@
+"""
+Opt-in request profiling
+A request is profiled when an admin asks for it (the X-Profile: 1 header
+or a _profile=1 query argument, honoured only for an admin session or the
+PROFILE_TOKEN bearer token), or when it is picked by sampling one in
+PROFILE_SAMPLE_RATE requests to PROFILE_ENDPOINTS. A profiled request
+runs under cProfile and, optionally, tracemalloc.
+
+Each profile is saved as a .prof file (pstats format, for snakeviz or
+`python -m pstats`) plus a JSON summary with the slowest functions and the
+top allocation sites. The folder is capped by file count and total size,
+oldest first. One request per worker is profiled at a time, since
+tracemalloc is process-wide and the overhead should stay bounded.
+"""
+import io
+import os
+import re
+import json
+import time
+import random
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from datetime import datetime
+
+from flask import g, request, session
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ARG = '_profile'
+# Generated names only, so a name taken from a URL can't point outside the folder
+PROFILE_NAME = re.compile(r'^\d{8}-\d{6}-[0-9a-f]{8}-[\w.-]{1,80}$')
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+
+class ProfileStore:
+    """Profiles on disk, trimmed to max_files and max_bytes after every write"""
+
+    def __init__(self, folder, max_files=50, max_bytes=100 * 1024 * 1024):
+        self.folder = folder
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+
+    def path(self, name, extension):
+        if not PROFILE_NAME.match(name or ''):
+            raise ValueError(f'Invalid profile name: {name!r}')
+        return os.path.join(self.folder, f'{name}.{extension}')
+
+    def save(self, name, profiler, summary):
+        os.makedirs(self.folder, exist_ok=True)
+        profiler.dump_stats(self.path(name, 'prof'))
+        with open(self.path(name, 'json'), 'w') as f:
+            json.dump(summary, f)
+        self.trim()
+
+    def _names(self):
+        """Profile names, newest first"""
+        try:
+            files = os.listdir(self.folder)
+        except FileNotFoundError:
+            return []
+        return sorted((name[:-len('.json')] for name in files if name.endswith('.json')), reverse=True)
+
+    def trim(self):
+        kept_bytes = 0
+        for position, name in enumerate(self._names()):
+            paths = [self.path(name, 'json'), self.path(name, 'prof')]
+            size = sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+            kept_bytes += size
+            if position >= self.max_files or kept_bytes > self.max_bytes:
+                for path in paths:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+    def list(self):
+        summaries = []
+        for name in self._names():
+            summary = self.load(name)
+            if summary is not None:
+                summaries.append(summary)
+        return summaries
+
+    def load(self, name):
+        try:
+            with open(self.path(name, 'json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+class RequestProfiler:
+    """
+    Args:
+        store: ProfileStore
+        sample_rate: profile one in this many requests to the sampled endpoints (0 disables sampling)
+        endpoints: endpoint names eligible for sampling (empty means every endpoint)
+        trace_memory: also take a tracemalloc snapshot
+        token: bearer token that may request a profile without an admin session
+    """
+
+    def __init__(self, store, sample_rate=0, endpoints=(), trace_memory=True, token=None):
+        self.store = store
+        self.sample_rate = sample_rate
+        self.endpoints = set(endpoints)
+        self.trace_memory = trace_memory
+        self.token = token
+        self._busy = threading.Lock()
+
+    def _trigger(self):
+        """'requested', 'sampled' or None for the current request"""
+        asked = request.headers.get(PROFILE_HEADER) == '1' or request.args.get(PROFILE_ARG) == '1'
+        if asked:
+            authorized = session.get('is_admin') or (
+                self.token and request.headers.get('Authorization') == f'Bearer {self.token}'
+            )
+            if authorized:
+                return 'requested'
+        if self.sample_rate and (not self.endpoints or request.endpoint in self.endpoints):
+            if random.randrange(self.sample_rate) == 0:
+                return 'sampled'
+        return None
+
+    def start(self):
+        trigger = self._trigger()
+        if trigger is None or not self._busy.acquire(blocking=False):
+            return
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            g.profile_tracemalloc = True
+        profiler = cProfile.Profile()
+        g.profile = (profiler, trigger, time.perf_counter())
+        profiler.enable()
+
+    def finish(self, response):
+        active = g.pop('profile', None)
+        if active is None:
+            return response
+        profiler, trigger, started = active
+        profiler.disable()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        try:
+            allocations, peak = None, None
+            if g.pop('profile_tracemalloc', False):
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                allocations = [
+                    {'where': str(stat.traceback[0]), 'size': stat.size, 'count': stat.count}
+                    for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]
+                ]
+
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+            endpoint = request.endpoint or 'unmatched'
+            name = f"{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}-{os.urandom(4).hex()}-{endpoint}"
+            self.store.save(name, profiler, {
+                'name': name,
+                'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+                'trigger': trigger,
+                'request_id': g.get('request_id'),
+                'method': request.method,
+                'path': request.path,
+                'endpoint': endpoint,
+                'status': response.status_code,
+                'duration_ms': round(elapsed_ms, 1),
+                'user_id': session.get('_user_id'),
+                'peak_traced_bytes': peak,
+                'allocations': allocations,
+                'functions': report.getvalue(),
+            })
+            response.headers['X-Profile-Id'] = name
+            logger.info("🔬 Profiled %s %s (%s) in %.0f ms: %s", request.method, request.path, trigger, elapsed_ms, name)
+        except OSError as e:
+            logger.warning("⚠️ Could not save profile: %s", e)
+        finally:
+            self._busy.release()
+        return response
+
+    def abandon(self, exc=None):
+        """Teardown: release a profile that finish() never saw (the response failed before after_request)"""
+        active = g.pop('profile', None)
+        if active is None:
+            return
+        active[0].disable()
+        if g.pop('profile_tracemalloc', False):
+            tracemalloc.stop()
+        self._busy.release()
+
+
+def init_profiling(app):
+    """Hook the profiler around every request; returns it so the admin pages can reach its store"""
+    store = ProfileStore(app.config['PROFILE_DIR'], app.config.get('PROFILE_MAX_FILES', 50),
+                         app.config.get('PROFILE_MAX_BYTES', 100 * 1024 * 1024))
+    profiler = RequestProfiler(
+        store,
+        sample_rate=app.config.get('PROFILE_SAMPLE_RATE', 0),
+        endpoints=[name.strip() for name in app.config.get('PROFILE_ENDPOINTS', '').split(',') if name.strip()],
+        trace_memory=app.config.get('PROFILE_TRACEMALLOC', True),
+        token=app.config.get('PROFILE_TOKEN'),
+    )
+    app.before_request(profiler.start)
+    app.after_request(profiler.finish)
+    app.teardown_request(profiler.abandon)
+    return profiler
@@ -0,0 +1,60 @@
+"""
+Per-request SQL query counter with optional query budgets
+
+Every statement executed while handling a request is counted. Views decorated
+with @query_budget(n) are checked after the request: under TESTING an overrun
+raises QueryBudgetExceeded (so the test fails), otherwise a warning is logged.
+"""
+import logging
+from functools import wraps
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in testing when a page runs more queries than its budget"""
+
+
+def query_budget(max_queries):
+    """Declare the maximum number of SQL queries a view may run"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            return view(*args, **kwargs)
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
+
+
+def get_query_count():
+    """Queries executed so far in the current request"""
+    return g.get('query_count', 0) if has_request_context() else 0
+
+
+def init_query_counter(app, db):
+    """Attach the counter to the app's engine and check budgets after each request"""
+
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            g.query_count = g.get('query_count', 0) + 1
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count_query)
+
+    @app.after_request
+    def check_query_budget(response):
+        count = get_query_count()
+        if app.config.get('QUERY_COUNT_HEADER') or app.testing:
+            response.headers['X-Query-Count'] = str(count)
+
+        view = app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', None)
+        if budget is not None and count > budget:
+            message = f"{request.endpoint} ran {count} queries (budget {budget})"
+            if app.testing:
+                raise QueryBudgetExceeded(message)
+            logger.warning("⚠️ Query budget exceeded: %s", message)
+        return response
@@ -0,0 +1,126 @@
+"""
+Shared rate-limit storage
+A `limits` storage backend kept in a small SQLite file, so every gunicorn
+worker on the host counts against the same limits and counters survive
+worker restarts. Each hit is a single UPSERT statement, atomic across
+processes, on a per-thread connection in WAL mode.
+
+Importing this module registers the ``sqlite://`` scheme with `limits`,
+so Flask-Limiter accepts e.g. ``sqlite:////srv/vortex/instance/ratelimit.db``.
+Only the fixed-window strategy (Flask-Limiter's default) is supported.
+"""
+import os
+import time
+import random
+import sqlite3
+import threading
+
+from limits.storage import Storage
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS rate_limit (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID"""
+
+# Counters are cheap to lose in an OS crash, so skip fsync on every hit
+PRAGMAS = ('journal_mode=WAL', 'synchronous=OFF', 'busy_timeout=5000')
+
+# Expired rows are deleted by roughly one hit in this many
+PURGE_EVERY = 1000
+
+INCR_SQL = """INSERT INTO rate_limit (key, value, expires_at) VALUES (:key, :amount, :expires_at)
+ON CONFLICT (key) DO UPDATE SET
+    value = CASE WHEN rate_limit.expires_at <= :now THEN excluded.value ELSE rate_limit.value + excluded.value END,
+    expires_at = CASE WHEN rate_limit.expires_at <= :now THEN excluded.expires_at ELSE rate_limit.expires_at END"""
+
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+def sqlite_path(uri):
+    """File path of a sqlite:// URI, in SQLAlchemy's form (sqlite:///relative.db, sqlite:////absolute.db)"""
+    if not uri.startswith('sqlite:///') or len(uri) == len('sqlite:///'):
+        raise ValueError(f'Not a sqlite:// file URI: {uri}')
+    return uri[len('sqlite:///'):]
+
+
+class LocalConnection:
+    """
+    Autocommit sqlite3 connection to one file, opened per thread.
+    Connections can't be shared between threads, and a forked worker must
+    not reuse its parent's, so the cache is keyed on both.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+
+    def __call__(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            for pragma in PRAGMAS:
+                conn.execute(f'PRAGMA {pragma}')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+
+class SQLiteStorage(Storage):
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        self.path = sqlite_path(uri)
+        self._connection = LocalConnection(self.path)
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._connection().execute(SCHEMA)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def incr(self, key, expiry, amount=1):
+        conn = self._connection()
+        now = time.time()
+        params = {'key': key, 'amount': amount, 'expires_at': now + expiry, 'now': now}
+        if HAS_RETURNING:
+            value = conn.execute(INCR_SQL + ' RETURNING value', params).fetchone()[0]
+        else:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute(INCR_SQL, params)
+                value = conn.execute('SELECT value FROM rate_limit WHERE key = ?', (key,)).fetchone()[0]
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+        if random.randrange(PURGE_EVERY) == 0:
+            conn.execute('DELETE FROM rate_limit WHERE expires_at <= ?', (now,))
+        return value
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value FROM rate_limit WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self._connection().execute(
+            'SELECT expires_at FROM rate_limit WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self):
+        try:
+            self._connection().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._connection().execute('DELETE FROM rate_limit').rowcount
+
+    def clear(self, key):
+        self._connection().execute('DELETE FROM rate_limit WHERE key = ?', (key,))
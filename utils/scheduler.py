@@ -0,0 +1,215 @@
+"""
+Maintenance scheduler
+Runs periodic jobs on a daemon thread inside each worker. A row per job in
+the job_lease table decides which worker runs it: claiming a job is a single
+conditional UPDATE, so with any number of gunicorn workers every job runs
+once per interval and a worker that dies mid-run loses its lease when it
+expires.
+"""
+import os
+import json
+import logging
+import time
+import uuid
+import socket
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """
+    Args:
+        name: unique job name (primary key of its lease row)
+        func: callable run inside an app context; its return value is stored as JSON
+        interval: seconds between runs across all workers
+        lease: seconds a run may take before another worker can take over
+    """
+
+    def __init__(self, name, func, interval, lease=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.lease = lease or max(60, min(interval, 900))
+
+
+class Scheduler:
+    """
+    Args:
+        app: Flask app the jobs run against
+        db: Flask-SQLAlchemy instance
+        lease_model: model with the job_lease columns (see models.JobLease)
+        tick: seconds between checks for due jobs
+    """
+
+    def __init__(self, app, db, lease_model, tick=30):
+        self.app = app
+        self.db = db
+        self.lease_model = lease_model
+        self.tick = tick
+        self.jobs = {}
+        self.metrics = {}
+        self._pid = None
+        self._owner = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def add(self, name, func, interval, lease=None):
+        self.jobs[name] = Job(name, func, interval, lease)
+        self.metrics[name] = {'runs': 0, 'failures': 0, 'skipped': 0, 'total_ms': 0.0, 'last_ms': None, 'max_ms': 0.0}
+
+    @property
+    def owner(self):
+        return self._owner
+
+    def ensure_started(self):
+        """
+        Start the thread in this process if it isn't running yet.
+        Called per request so it also starts in workers forked after import.
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._owner = f'{socket.gethostname()}:{self._pid}:{uuid.uuid4().hex[:8]}'
+            self._stop.clear()
+            thread = threading.Thread(target=self._loop, name='vortex-scheduler', daemon=True)
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        # Nothing may escape this loop: a dead thread would leave the worker without maintenance
+        # for good, since ensure_started already counts it as started
+        leases_ready = self._guarded(self._create_leases, 'create job leases')
+        # Spread workers out so they don't all hit the lease table at once
+        self._stop.wait(self.tick * (os.getpid() % 10) / 10)
+        while not self._stop.is_set():
+            if not leases_ready:
+                leases_ready = self._guarded(self._create_leases, 'create job leases')
+            self._guarded(self.run_pending, 'run pending jobs')
+            self._stop.wait(self.tick)
+
+    def _guarded(self, func, action):
+        """Run func, logging and discarding the session on any error (e.g. database is locked); returns success"""
+        try:
+            func()
+            return True
+        except Exception:
+            logger.exception("❌ Scheduler could not %s; retrying in %ss", action, self.tick)
+            try:
+                with self.app.app_context():
+                    self.db.session.rollback()
+                    self.db.session.remove()
+            except Exception:
+                logger.exception("❌ Scheduler could not reset its database session")
+            return False
+
+    def _create_leases(self):
+        with self.app.app_context():
+            for name in self.jobs:
+                if self.db.session.get(self.lease_model, name) is None:
+                    self.db.session.add(self.lease_model(name=name, run_count=0, failure_count=0))
+                    try:
+                        self.db.session.commit()
+                    except IntegrityError:
+                        # Another worker created it first
+                        self.db.session.rollback()
+            self.db.session.remove()
+
+    def run_pending(self):
+        """Run every due job this worker manages to claim; returns the names that ran"""
+        ran = []
+        with self.app.app_context():
+            if self._owner is None:
+                self._owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+            for job in self.jobs.values():
+                try:
+                    claimed = self._acquire(job)
+                except Exception as e:
+                    self.db.session.rollback()
+                    logger.warning("⚠️ Scheduler could not claim %s: %s", job.name, e)
+                    continue
+                if not claimed:
+                    self.metrics[job.name]['skipped'] += 1
+                    continue
+                self._run(job)
+                ran.append(job.name)
+            self.db.session.remove()
+        return ran
+
+    def _acquire(self, job):
+        """Atomically take the lease if the job is due and nobody holds it"""
+        model = self.lease_model
+        now = datetime.utcnow()
+        result = self.db.session.execute(
+            update(model)
+            .where(
+                model.name == job.name,
+                or_(model.lease_until.is_(None), model.lease_until < now),
+                or_(model.last_started_at.is_(None), model.last_started_at <= now - timedelta(seconds=job.interval))
+            )
+            .values(owner=self._owner, lease_until=now + timedelta(seconds=job.lease), last_started_at=now)
+        )
+        self.db.session.commit()
+        return result.rowcount == 1
+
+    def _run(self, job):
+        start = time.perf_counter()
+        try:
+            result = job.func()
+            status, detail = 'ok', json.dumps(result, default=str)
+        except Exception as e:
+            self.db.session.rollback()
+            status, detail = 'failed', f'{type(e).__name__}: {e}'
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        metrics = self.metrics[job.name]
+        metrics['runs'] += 1
+        metrics['failures'] += status == 'failed'
+        metrics['total_ms'] += elapsed_ms
+        metrics['last_ms'] = round(elapsed_ms, 2)
+        metrics['max_ms'] = max(metrics['max_ms'], round(elapsed_ms, 2))
+
+        model = self.lease_model
+        try:
+            self.db.session.execute(
+                update(model)
+                .where(model.name == job.name, model.owner == self._owner)
+                .values(
+                    lease_until=None,
+                    last_finished_at=datetime.utcnow(),
+                    last_duration_ms=round(elapsed_ms, 2),
+                    last_status=status,
+                    last_result=detail[:2000],
+                    run_count=model.run_count + 1,
+                    failure_count=model.failure_count + (1 if status == 'failed' else 0)
+                )
+            )
+            self.db.session.commit()
+        except Exception:
+            # The lease still expires on its own, so the job only waits for lease_until
+            self.db.session.rollback()
+            logger.exception("❌ Could not release the lease for job %s", job.name)
+
+        if status == 'ok':
+            logger.info("✅ Job %s ok in %.0f ms: %s", job.name, elapsed_ms, detail[:200])
+        else:
+            logger.error("❌ Job %s %s in %.0f ms: %s", job.name, status, elapsed_ms, detail[:200])
+
+    def snapshot(self):
+        """Lease rows from the database plus this worker's timing metrics"""
+        leases = {lease.name: lease.to_dict() for lease in self.lease_model.query.all()}
+        jobs = []
+        for job in self.jobs.values():
+            local = dict(self.metrics[job.name])
+            local['avg_ms'] = round(local['total_ms'] / local['runs'], 2) if local['runs'] else None
+            jobs.append({'name': job.name, 'interval': job.interval, 'lease': leases.get(job.name), 'local': local})
+        return {'owner': self._owner, 'jobs': jobs}
@@ -0,0 +1,177 @@
+"""
+Full-text search for shared uploads
+SQLite FTS5 index over upload filename and summary, ranked with BM25.
+Other databases, and SQLite builds without FTS5, fall back to a LIKE scan
+with the same interface.
+"""
+import re
+import logging
+import weakref
+
+from markupsafe import Markup, escape
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'upload_fts'
+SEARCH_PAGE_SIZE = 20
+
+# Only shared uploads are searchable, so the triggers index exactly those rows
+# and keep the index in step with inserts, edits, deletes and share toggles.
+FTS_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        filename, summary, content='upload', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS upload_fts_insert AFTER INSERT ON upload WHEN new.is_shared BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, filename, summary) VALUES (new.id, new.filename, new.summary);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS upload_fts_delete AFTER DELETE ON upload WHEN old.is_shared BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, filename, summary) VALUES ('delete', old.id, old.filename, old.summary);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS upload_fts_update AFTER UPDATE OF filename, summary, is_shared ON upload BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, filename, summary)
+            SELECT 'delete', old.id, old.filename, old.summary WHERE old.is_shared;
+        INSERT INTO {FTS_TABLE}(rowid, filename, summary)
+            SELECT new.id, new.filename, new.summary WHERE new.is_shared;
+    END""",
+]
+FTS_TRIGGERS = ['upload_fts_insert', 'upload_fts_delete', 'upload_fts_update']
+
+# Private-use markers survive snippet() and are swapped for <mark> after HTML escaping
+HIGHLIGHT_START = '\ue000'
+HIGHLIGHT_END = '\ue001'
+
+
+# engine -> whether it can use FTS5, probed once
+_fts_support = weakref.WeakKeyDictionary()
+
+
+def fts_enabled(db):
+    """Whether the database is SQLite with the FTS5 module available"""
+    engine = db.engine
+    if engine not in _fts_support:
+        _fts_support[engine] = engine.dialect.name == 'sqlite' and _probe_fts5(engine)
+    return _fts_support[engine]
+
+
+def _probe_fts5(engine):
+    """SQLite can be built without FTS5; creating a throwaway temp table is the reliable test"""
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(body)"))
+            conn.execute(text("DROP TABLE temp.fts5_probe"))
+        return True
+    except OperationalError:
+        return False
+
+
+def init_upload_search(app, db):
+    """Create the FTS5 index and its triggers, populating it on first run"""
+    with app.app_context():
+        if not fts_enabled(db):
+            if db.engine.dialect.name == 'sqlite':
+                logger.warning("⚠️ SQLite has no FTS5 module; shared library search uses a LIKE scan")
+                # Triggers left by a build with FTS5 would make every upload write fail on this one
+                with db.engine.begin() as conn:
+                    for trigger in FTS_TRIGGERS:
+                        conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+            return False
+        with db.engine.begin() as conn:
+            existing = {row.name for row in conn.execute(
+                text("SELECT name FROM sqlite_master WHERE name IN (:table, :trigger)"),
+                {'table': FTS_TABLE, 'trigger': FTS_TRIGGERS[0]}
+            )}
+            for statement in FTS_SCHEMA:
+                conn.execute(text(statement))
+            if FTS_TABLE in existing and FTS_TRIGGERS[0] not in existing:
+                # The index missed every write made while its triggers were gone
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"))
+            if FTS_TRIGGERS[0] not in existing:
+                conn.execute(text(
+                    f"INSERT INTO {FTS_TABLE}(rowid, filename, summary) "
+                    f"SELECT id, filename, summary FROM upload WHERE is_shared"
+                ))
+        return True
+
+
+def build_match_query(query):
+    """Turn free text into a safe FTS5 query: every term required, last one as a prefix"""
+    terms = re.findall(r'\w+', query.lower())
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms[:12]]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def encode_cursor(score, upload_id):
+    return f'{score!r}:{upload_id}'
+
+
+def decode_cursor(cursor):
+    try:
+        score, upload_id = cursor.rsplit(':', 1)
+        return float(score), int(upload_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def highlight(snippet):
+    return Markup(str(escape(snippet)).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
+
+
+def search_uploads(db, query, cursor=None, limit=SEARCH_PAGE_SIZE):
+    """
+    Search shared uploads
+
+    Returns:
+        (hits, next_cursor) where hits is a list of {'id', 'score', 'snippet'} in rank order
+        and next_cursor is None on the last page
+    """
+    if not fts_enabled(db):
+        return _search_uploads_like(db, query, cursor, limit)
+
+    match = build_match_query(query)
+    if not match:
+        return [], None
+
+    after = decode_cursor(cursor) if cursor else None
+    # Filename matches weigh more than summary matches
+    sql = f"""
+        SELECT id, score, snippet FROM (
+            SELECT upload.id AS id,
+                   bm25({FTS_TABLE}, 10.0, 1.0) AS score,
+                   snippet({FTS_TABLE}, 1, :start, :end, '…', 24) AS snippet
+            FROM {FTS_TABLE} JOIN upload ON upload.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH :match AND upload.is_shared
+        )
+        {'WHERE score > :after_score OR (score = :after_score AND id > :after_id)' if after else ''}
+        ORDER BY score, id
+        LIMIT :limit
+    """
+    params = {'match': match, 'start': HIGHLIGHT_START, 'end': HIGHLIGHT_END, 'limit': limit + 1}
+    if after:
+        params.update(after_score=after[0], after_id=after[1])
+
+    rows = db.session.execute(text(sql), params).all()
+    hits = [{'id': row.id, 'score': row.score, 'snippet': highlight(row.snippet)} for row in rows[:limit]]
+    next_cursor = encode_cursor(rows[limit - 1].score, rows[limit - 1].id) if len(rows) > limit else None
+    return hits, next_cursor
+
+
+def _search_uploads_like(db, query, cursor, limit):
+    """Unranked fallback for databases without FTS5, newest first"""
+    from models import Upload
+
+    q = Upload.query.with_entities(Upload.id, Upload.summary).filter(
+        Upload.is_shared == True,
+        db.or_(Upload.filename.contains(query), Upload.summary.contains(query))
+    )
+    if cursor and cursor.isdigit():
+        q = q.filter(Upload.id < int(cursor))
+    rows = q.order_by(Upload.id.desc()).limit(limit + 1).all()
+
+    hits = [{'id': row.id, 'score': 0.0, 'snippet': escape((row.summary or '')[:200])} for row in rows[:limit]]
+    next_cursor = str(rows[limit - 1].id) if len(rows) > limit else None
+    return hits, next_cursor
@@ -0,0 +1,30 @@
+"""
+SQLite connection tuning
+Sets the configured PRAGMAs on every new DB-API connection, since most of them
+(synchronous, busy_timeout, mmap_size) only last for the connection they run on.
+"""
+from sqlalchemy import event
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def init_sqlite_pragmas(app, db):
+    """Register the connect hook on the app's engine; no-op for other databases"""
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name != 'sqlite' or not pragmas:
+            return False
+
+        def on_connect(dbapi_connection, connection_record):
+            apply_pragmas(dbapi_connection, pragmas)
+
+        event.listen(engine, 'connect', on_connect)
+    return True
@@ -0,0 +1,217 @@
+"""
+Structured, non-blocking logging
+Application code logs through ordinary module loggers
+(``logging.getLogger(__name__)``). Records are put on an in-memory queue
+by the request thread and written to stdout by one listener thread per
+worker, so a slow pipe or a busy terminal never stalls a request. When the
+queue is full, records are dropped and counted rather than waited for.
+
+Every record carries the request ID (taken from a valid X-Request-ID
+header, or generated) which is also echoed in the response, and levels can
+be set per logger, e.g. ``LOG_LEVELS=utils.ocr=DEBUG,vortex.access=WARNING``.
+A call below its logger's level costs one cached level check, so hot paths
+log with %-style arguments that are only formatted when the record is kept.
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+from flask import g, request, has_request_context
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+# Client-supplied IDs are echoed into logs and headers, so only accept plain tokens
+VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._:-]{1,64}$')
+
+access_logger = logging.getLogger('vortex.access')
+
+# Attributes every LogRecord has; anything else was passed through extra= and is a structured field
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+
+def current_request_id():
+    if has_request_context():
+        return g.get('request_id', '-')
+    return '-'
+
+
+def _extra_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp the request ID on the record in the thread that logged it"""
+
+    def filter(self, record):
+        record.request_id = current_request_id()
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    """time level logger [request_id] message key=value ..."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = '-'
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with extra= fields as top-level keys"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage(),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: a full queue drops the record and counts it"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._formatter = logging.Formatter()
+
+    def prepare(self, record):
+        # Merge args now, since they may change after the call returns, but leave the
+        # rest of formatting (timestamps, JSON encoding) to the listener thread
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = self._formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Stopping must not fail on a full queue; wait for the thread to make room
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    """Per-worker queue and listener thread; restarted in forked workers like the other background threads"""
+
+    def __init__(self):
+        self.handler = None
+        self.listener = None
+        self._output = None
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def configure(self, output_handler, queue_size):
+        self._output = output_handler
+        self.handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        self.handler.addFilter(RequestIdFilter())
+        self.ensure_started()
+
+    def ensure_started(self):
+        if self.handler is None or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            # A forked worker inherits the parent's queue contents but not its thread
+            self.handler.queue = queue.Queue(maxsize=self.handler.queue.maxsize)
+            self.listener = _Listener(self.handler.queue, self._output, respect_handler_level=True)
+            self.listener.start()
+
+    def stop(self):
+        """Write out everything still queued (at exit, or before reading the output in tests)"""
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+            self._pid = None
+
+    def stats(self):
+        if self.handler is None:
+            return {'mode': 'sync', 'queued': 0, 'dropped': 0}
+        return {'mode': 'queue', 'queued': self.handler.queue.qsize(), 'dropped': self.handler.dropped}
+
+
+pipeline = LogPipeline()
+atexit.register(pipeline.stop)
+
+
+def parse_levels(spec):
+    """'utils.ocr=DEBUG,werkzeug=WARNING' -> {'utils.ocr': 'DEBUG', 'werkzeug': 'WARNING'}"""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, sep, level = item.partition('=')
+        if sep and name.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def init_logging(app):
+    """
+    Route every logger through the root logger's queue handler, apply
+    LOG_LEVEL / LOG_LEVELS, and tag requests with an ID and an access log line.
+    """
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if app.config.get('LOG_FORMAT') == 'json' else TextFormatter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    if app.config.get('LOG_ASYNC', True):
+        pipeline.configure(output, app.config.get('LOG_QUEUE_SIZE', 10000))
+        root.addHandler(pipeline.handler)
+    else:
+        output.addFilter(RequestIdFilter())
+        root.addHandler(output)
+
+    root.setLevel(app.config.get('LOG_LEVEL', 'INFO').upper())
+    for name, level in parse_levels(app.config.get('LOG_LEVELS')).items():
+        logging.getLogger(name).setLevel(level)
+
+    @app.before_request
+    def assign_request_id():
+        pipeline.ensure_started()
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        g.request_id = incoming if VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex[:16]
+        g.log_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        if access_logger.isEnabledFor(logging.INFO) and 'log_started' in g:
+            access_logger.info('%s %s', request.method, request.path, extra={
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - g.log_started) * 1000, 1),
+            })
+        return response
@@ -1,7 +1,10 @@
 import re
+import logging
 import nltk
 from collections import Counter
 
+logger = logging.getLogger(__name__)
+
 try:
     nltk.data.find('tokenizers/punkt')
 except LookupError:
@@ -15,6 +18,13 @@ except LookupError:
 from nltk.corpus import stopwords
 from nltk.tokenize import sent_tokenize, word_tokenize
 
+SUMMARY_STYLES = ('paragraphs', 'bullets', 'numbered', 'very_short', 'detailed')
+SUMMARY_LENGTHS = {
+    'short': 3,      # 3 sentences
+    'medium': 5,     # 5 sentences
+    'long': 8        # 8 sentences
+}
+
 def summarize_text(text, max_sentences=5, use_nlp=True):
     """
     Original summarize function (kept for backward compatibility)
@@ -69,14 +79,7 @@ def summarize_text_with_style(text, style='paragraphs', length='medium'):
     if not text or len(text) < 50:
         return text
     
-    # Length configuration
-    length_config = {
-        'short': 3,      # 3 sentences
-        'medium': 5,     # 5 sentences
-        'long': 8        # 8 sentences
-    }
-    
-    max_sentences = length_config.get(length, 5)
+    max_sentences = SUMMARY_LENGTHS.get(length, 5)
     
     try:
         # Tokenize sentences
@@ -142,7 +145,7 @@ def summarize_text_with_style(text, style='paragraphs', length='medium'):
         return formatted if formatted else ' '.join(selected_sentences)
         
     except Exception as e:
-        print(f"⚠️ Summarization with style failed: {e}")
+        logger.warning("⚠️ Summarization with style failed: %s", e)
         # Fallback to basic summary
         sentences = text.split('.')
         sentences = [s.strip() for s in sentences if len(s.split()) > 5]
@@ -0,0 +1,178 @@
+"""
+Synthetic data for capacity testing
+Bulk-loads users, subjects, chapters, uploads, reviews, quiz battles and
+quiz results shaped like real usage: a few heavy users and a long tail,
+scores with a Pareto spread, about one upload in five shared, and activity
+spread over the past year. Text comes from the KNOWLEDGE_BASE corpus.
+
+Rows are inserted with executemany in batches, bypassing the ORM, so the
+maintained counters are recomputed with repair_counters() at the end. Every
+generated user's password is SYNTHETIC_PASSWORD.
+"""
+import json
+import random
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from models import (db, repair_counters, User, Subject, Chapter, Upload, Review, QuizResult,
+                    QuizBattle, BattleParticipant)
+from .knowledge_base import KNOWLEDGE_BASE
+
+SYNTHETIC_PASSWORD = 'Vortex-load-2026'
+SYNTHETIC_EMAIL_DOMAIN = 'synthetic.vortex.test'
+BATCH_SIZE = 20000
+HISTORY_DAYS = 365
+
+
+def _next_id(model):
+    return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+
+class _BulkWriter:
+    """Buffers rows per table and inserts them in batches, parents before children"""
+
+    def __init__(self, order):
+        self.order = order
+        self.rows = {model: [] for model in order}
+        self.counts = {model.__tablename__: 0 for model in order}
+
+    def add(self, model, row):
+        self.rows[model].append(row)
+        if len(self.rows[model]) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        for model in self.order:
+            rows = self.rows[model]
+            if rows:
+                db.session.execute(model.__table__.insert(), rows)
+                self.counts[model.__tablename__] += len(rows)
+                rows.clear()
+        db.session.commit()
+
+
+def _corpus():
+    sentences, titles = [], []
+    for item in KNOWLEDGE_BASE.values():
+        titles.append(item['title'])
+        for line in item['content'].replace('\n', ' ').split('. '):
+            line = line.strip()
+            if len(line.split()) >= 6:
+                sentences.append(line.rstrip('.') + '.')
+    categories = sorted({item['category'] for item in KNOWLEDGE_BASE.values()})
+    return sentences, titles, categories
+
+
+def generate_data(app, users=1000, subjects_per_user=2, chapters_per_subject=3, uploads_per_user=3,
+                  quiz_results_per_user=20, reviews_per_user=1, battles_per_user=0.1, seed=42):
+    """
+    Append synthetic rows to the app's database. Per-user figures are
+    averages; individual users get anywhere from none to several times more.
+
+    Returns:
+        dict of rows inserted per table
+    """
+    rng = random.Random(seed)
+    sentences, titles, categories = _corpus()
+    now = datetime.utcnow()
+    password = generate_password_hash(SYNTHETIC_PASSWORD, method='pbkdf2:sha256')
+
+    def count_around(mean):
+        # Exponential spread: most users near or below the mean, a few far above it
+        return int(rng.expovariate(1 / mean)) if mean > 0 else 0
+
+    def moment_after(start):
+        return start + (now - start) * rng.random()
+
+    with app.app_context():
+        ids = {model: _next_id(model) for model in (User, Subject, Chapter, Upload, QuizBattle)}
+        writer = _BulkWriter([User, Subject, Chapter, Upload, Review, QuizResult, QuizBattle, BattleParticipant])
+        shared_uploads, user_ids = [], []
+
+        for _ in range(users):
+            user_id = ids[User]
+            ids[User] += 1
+            user_ids.append(user_id)
+            created_at = now - timedelta(days=rng.random() * HISTORY_DAYS)
+            score = min(int(rng.paretovariate(1.3) * 40) - 40, 50000)
+            username, email = f'learner{user_id}', f'learner{user_id}@{SYNTHETIC_EMAIL_DOMAIN}'
+            writer.add(User, {
+                'id': user_id, 'username': username, 'email': email,
+                'username_lower': username, 'email_lower': email,
+                'password': password, 'score': score, 'level': score // 100 + 1, 'created_at': created_at,
+            })
+
+            chapter_ids = []
+            for _ in range(count_around(subjects_per_user)):
+                subject_id = ids[Subject]
+                ids[Subject] += 1
+                writer.add(Subject, {
+                    'id': subject_id, 'name': rng.choice(categories).split(' ', 1)[-1], 'description': None,
+                    'user_id': user_id, 'created_at': moment_after(created_at), 'chapter_count': 0,
+                })
+                for order in range(1, count_around(chapters_per_subject) + 1):
+                    chapter_ids.append(ids[Chapter])
+                    writer.add(Chapter, {
+                        'id': ids[Chapter], 'name': f'Chapter {order}', 'description': None, 'order': order,
+                        'subject_id': subject_id, 'created_at': moment_after(created_at), 'upload_count': 0,
+                    })
+                    ids[Chapter] += 1
+
+            for _ in range(count_around(uploads_per_user)):
+                upload_id = ids[Upload]
+                ids[Upload] += 1
+                summary = ' '.join(rng.sample(sentences, rng.randint(3, 8)))
+                is_shared = rng.random() < 0.2
+                if is_shared:
+                    shared_uploads.append(upload_id)
+                writer.add(Upload, {
+                    'id': upload_id, 'filename': f'{rng.choice(titles)} notes.pdf', 'summary': summary,
+                    'quiz_data': json.dumps([{'question': sentence, 'type': 'true_false', 'answer': True}
+                                             for sentence in rng.sample(sentences, 3)]),
+                    'keywords': json.dumps(rng.sample(summary.split(), 5)), 'is_shared': is_shared,
+                    'uploaded_at': moment_after(created_at), 'user_id': user_id,
+                    'chapter_id': rng.choice(chapter_ids) if chapter_ids and rng.random() < 0.7 else None,
+                    'review_count': 0, 'rating_sum': 0, 'rating_avg': 0,
+                })
+
+            for _ in range(count_around(quiz_results_per_user)):
+                total = rng.choice((5, 10, 10, 15))
+                writer.add(QuizResult, {
+                    'score': min(total, int(rng.betavariate(5, 2) * (total + 1))), 'total_questions': total,
+                    'completed_at': moment_after(created_at), 'user_id': user_id,
+                })
+
+        reviewed = set()  # one review per user and upload
+        for _ in range(int(users * reviews_per_user) if shared_uploads else 0):
+            pair = (rng.choice(shared_uploads), rng.choice(user_ids))
+            if pair in reviewed:
+                continue
+            reviewed.add(pair)
+            writer.add(Review, {
+                'upload_id': pair[0], 'user_id': pair[1],
+                'rating': rng.choices((1, 2, 3, 4, 5), weights=(1, 1, 3, 5, 4))[0],
+                'comment': rng.choice((None, 'Helpful summary', 'Clear and short', 'Needs more detail')),
+                'created_at': now - timedelta(days=rng.random() * HISTORY_DAYS),
+            })
+
+        for _ in range(int(users * battles_per_user) if len(user_ids) > 1 else 0):
+            battle_id = ids[QuizBattle]
+            ids[QuizBattle] += 1
+            players = rng.sample(user_ids, min(len(user_ids), rng.randint(2, 4)))
+            status = rng.choices(('completed', 'active', 'cancelled'), weights=(8, 1, 1))[0]
+            scores = {player: rng.randint(0, 100) for player in players}
+            created_at = now - timedelta(days=rng.random() * HISTORY_DAYS)
+            writer.add(QuizBattle, {
+                'id': battle_id, 'title': f'{rng.choice(titles)} Battle', 'created_at': created_at, 'status': status,
+                'winner_id': max(scores, key=scores.get) if status == 'completed' else None,
+            })
+            for player in players:
+                writer.add(BattleParticipant, {
+                    'battle_id': battle_id, 'user_id': player, 'score': scores[player],
+                    'completed': status == 'completed', 'joined_at': created_at,
+                })
+
+        writer.flush()
+    repair_counters(app)
+    return writer.counts
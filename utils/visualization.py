@@ -1,15 +1,25 @@
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import pandas as pd
 import os
 from datetime import datetime
 
+from .chart_service import ChartStore, ChartRenderService, hash_inputs
+
+# Charts are drawn on standalone Figure objects instead of the global pyplot
+# state machine, so request threads and the background executor can render
+# at the same time without corrupting each other's figures.
+
+CHART_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'images', 'charts')
+chart_service = ChartRenderService(ChartStore(CHART_FOLDER))
+
 def create_table_visualization(data, title="Data Table", output_path=None):
     if not output_path:
         output_path = f'static/images/table_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
     
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
     ax.axis('tight')
     ax.axis('off')
     
@@ -28,9 +38,8 @@ def create_table_visualization(data, title="Data Table", output_path=None):
         table[(0, i)].set_facecolor('#6C63FF')
         table[(0, i)].set_text_props(weight='bold', color='white')
     
-    plt.title(title, fontsize=14, weight='bold')
-    plt.savefig(output_path, bbox_inches='tight', dpi=150)
-    plt.close()
+    ax.set_title(title, fontsize=14, weight='bold')
+    fig.savefig(output_path, bbox_inches='tight', dpi=150)
     
     return output_path
 
@@ -38,15 +47,17 @@ def create_bar_chart(labels, values, title="Performance Chart", output_path=None
     if not output_path:
         output_path = f'static/images/chart_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
     
-    plt.figure(figsize=(10, 6))
-    plt.bar(labels, values, color='#6C63FF', alpha=0.8)
-    plt.xlabel('Categories', fontsize=12)
-    plt.ylabel('Values', fontsize=12)
-    plt.title(title, fontsize=14, weight='bold')
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=150)
-    plt.close()
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.bar(labels, values, color='#6C63FF', alpha=0.8)
+    ax.set_xlabel('Categories', fontsize=12)
+    ax.set_ylabel('Values', fontsize=12)
+    ax.set_title(title, fontsize=14, weight='bold')
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+    fig.tight_layout()
+    fig.savefig(output_path, dpi=150)
     
     return output_path
 
@@ -54,13 +65,13 @@ def create_pie_chart(labels, values, title="Distribution", output_path=None):
     if not output_path:
         output_path = f'static/images/pie_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
     
-    plt.figure(figsize=(8, 8))
+    fig = Figure(figsize=(8, 8))
+    ax = fig.subplots()
     colors = ['#6C63FF', '#8A76FF', '#A68EFF', '#C2A6FF', '#DEBEFF']
-    plt.pie(values, labels=labels, autopct='%1.1f%%', colors=colors, startangle=90)
-    plt.title(title, fontsize=14, weight='bold')
-    plt.axis('equal')
-    plt.savefig(output_path, dpi=150)
-    plt.close()
+    ax.pie(values, labels=labels, autopct='%1.1f%%', colors=colors, startangle=90)
+    ax.set_title(title, fontsize=14, weight='bold')
+    ax.axis('equal')
+    fig.savefig(output_path, dpi=150)
     
     return output_path
 
@@ -68,18 +79,36 @@ def create_line_chart(x_data, y_data, title="Trend Analysis", output_path=None):
     if not output_path:
         output_path = f'static/images/line_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
     
-    plt.figure(figsize=(10, 6))
-    plt.plot(x_data, y_data, marker='o', color='#6C63FF', linewidth=2, markersize=8)
-    plt.xlabel('Time', fontsize=12)
-    plt.ylabel('Score', fontsize=12)
-    plt.title(title, fontsize=14, weight='bold')
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=150)
-    plt.close()
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.plot(x_data, y_data, marker='o', color='#6C63FF', linewidth=2, markersize=8)
+    ax.set_xlabel('Time', fontsize=12)
+    ax.set_ylabel('Score', fontsize=12)
+    ax.set_title(title, fontsize=14, weight='bold')
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(output_path, dpi=150)
     
     return output_path
 
+CHART_RENDERERS = {
+    'bar': create_bar_chart,
+    'line': create_line_chart,
+    'pie': create_pie_chart
+}
+
+def get_cached_chart(kind, labels, values, title):
+    """
+    Server-side fallback for the client-rendered charts.
+    The PNG is keyed by a hash of its data, so identical charts are rendered once.
+    """
+    labels, values = list(labels), list(values)
+    key = f'{kind}_{hash_inputs(kind, labels, values, title)}'
+    return chart_service.get_or_render(
+        key,
+        lambda output_path: CHART_RENDERERS[kind](labels, values, title, output_path=output_path)
+    )
+
 def analyze_quiz_performance(quiz_results):
     if not quiz_results:
         return None
@@ -87,12 +116,11 @@ def analyze_quiz_performance(quiz_results):
     scores = [r.score for r in quiz_results]
     dates = [r.completed_at.strftime('%m/%d') for r in quiz_results]
     
-    chart_path = create_line_chart(dates, scores, "Your Performance Trend")
-    
     return {
-        'chart': chart_path,
+        'labels': dates,
+        'scores': scores,
         'avg_score': sum(scores) / len(scores),
         'max_score': max(scores),
         'min_score': min(scores),
         'total_quizzes': len(scores)
-    }
\ No newline at end of file
+    }
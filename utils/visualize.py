@@ -1,51 +1,327 @@
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import networkx as nx
 import os
+import logging
+import re
+import math
 import numpy as np
+from collections import Counter
+from xml.sax.saxutils import escape
 from matplotlib.patches import FancyBboxPatch, Circle
 from matplotlib.path import Path
 import matplotlib.patches as patches
 
-def create_mindmap(keywords):
+from .chart_service import ChartStore, ChartRenderService, hash_inputs
+
+logger = logging.getLogger(__name__)
+
+# Every upload gets its own mind map, stored under a hash of its tree
+MINDMAP_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'images', 'mindmaps')
+mindmap_service = ChartRenderService(ChartStore(MINDMAP_FOLDER))
+
+
+def get_mindmap_keywords(summary):
+    """Pick the six main topics of a summary's mind map"""
+    words = summary.split()
+    important_words = [
+        word.strip('.,;:!?"\'•1234567890') 
+        for word in words 
+        if len(word) > 4 and word.isalpha()
+    ]
+    
+    if len(important_words) < 6:
+        important_words = [
+            word.strip('.,;:!?"\'•1234567890') 
+            for word in words 
+            if word.isalpha()
+        ]
+    
+    return important_words[:6]
+
+
+# Level-2 branches attached to each main topic, by topic position
+DEFAULT_SUBTOPICS = {
+    0: ['Definition', 'Examples', 'Benefits'],
+    1: ['Methods', 'Tools', 'Resources'],
+    2: ['Practice', 'Theory', 'Application'],
+    3: ['Key Points', 'Summary', 'Overview'],
+    4: ['Details', 'Analysis', 'Insights'],
+    5: ['Concepts', 'Ideas', 'Principles']
+}
+
+PASTEL_COLORS = ['#FFB3BA', '#FFDFBA', '#BAFFC9', '#BAE1FF', '#E0BBE4', '#FFDFD3', '#C9E4DE', '#F8E6FF']
+
+
+def build_mindmap_tree(keywords):
     """
-    Create a DETAILED mind map with main topics, subtopics, and connections
-    Features: 3 levels (Center -> Main Topics -> Subtopics), curved edges, shadows, legend
+    Build the three-level mind map tree consumed by all renderers
+
+    Returns:
+        {'center': str, 'topics': [{'label': str, 'subtopics': [str, ...]}, ...]}
     """
     if not keywords or len(keywords) == 0:
         keywords = ['Learning', 'Knowledge', 'Education', 'Growth', 'Success', 'Innovation']
     
+    topics = []
+    for word in keywords[:6]:
+        if word and word.strip():
+            subtopics = DEFAULT_SUBTOPICS.get(len(topics), ['Detail 1', 'Detail 2', 'Detail 3'])
+            topics.append({'label': word, 'subtopics': list(subtopics[:3])})
+    
+    return {'center': 'Main Topic', 'topics': topics}
+
+
+MINDMAP_STOP_WORDS = {
+    'the', 'and', 'for', 'with', 'that', 'this', 'these', 'those', 'from', 'into', 'than',
+    'then', 'they', 'them', 'their', 'there', 'which', 'while', 'where', 'when', 'what',
+    'also', 'such', 'each', 'other', 'some', 'many', 'more', 'most', 'much', 'very',
+    'have', 'has', 'had', 'been', 'being', 'were', 'was', 'are', 'will', 'would', 'should',
+    'could', 'can', 'may', 'might', 'must', 'does', 'did', 'doing', 'about', 'over', 'under',
+    'between', 'through', 'during', 'before', 'after', 'both', 'only', 'same', 'just',
+    'because', 'however', 'often', 'used', 'using', 'uses', 'make', 'makes', 'made', 'like',
+    'well', 'your', 'ours', 'its', 'it\'s', 'who', 'whom', 'how', 'all', 'any', 'not', 'but'
+}
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n+')
+TERM_PATTERN = re.compile(r'[a-z][a-z\-]{3,}')
+
+
+def build_cooccurrence_tree(text, max_topics=6, max_subtopics=3, vocabulary_size=40, max_sentences=2000):
+    """
+    Derive a mind map tree from the text itself using sentence-level term co-occurrence
+
+    The most frequent term becomes the center, the next most frequent unused terms become
+    topics, and each topic's subtopics are the unused terms that co-occur with it most
+    (cosine-normalised). Tokenising is a single pass over the text and the co-occurrence
+    matrix is vocabulary_size x vocabulary_size, so the cost is linear in document length.
+
+    Returns:
+        Same structure as build_mindmap_tree, or None if the text has too few terms
+    """
+    sentence_terms = []
+    term_freq = Counter()
+    for sentence in SENTENCE_SPLIT.split(text.lower())[:max_sentences]:
+        # dict keeps first-seen order so ties break the same way in every worker
+        terms = dict.fromkeys(t for t in TERM_PATTERN.findall(sentence) if t not in MINDMAP_STOP_WORDS)
+        if terms:
+            sentence_terms.append(terms)
+            term_freq.update(terms.keys())
+    
+    vocabulary = [term for term, _ in term_freq.most_common(vocabulary_size)]
+    if len(vocabulary) < 3:
+        return None
+    index = {term: i for i, term in enumerate(vocabulary)}
+    
+    # Sentence x term incidence matrix, then term x term co-occurrence counts
+    incidence = np.zeros((len(sentence_terms), len(vocabulary)), dtype=np.float32)
+    for row, terms in enumerate(sentence_terms):
+        for term in terms:
+            col = index.get(term)
+            if col is not None:
+                incidence[row, col] = 1.0
+    cooccurrence = incidence.T @ incidence
+    doc_freq = np.diag(cooccurrence).copy()
+    similarity = cooccurrence / np.sqrt(np.outer(doc_freq, doc_freq))
+    np.fill_diagonal(similarity, 0.0)
+    
+    used = np.zeros(len(vocabulary), dtype=bool)
+    used[0] = True
+    topics = []
+    for topic_idx in range(1, len(vocabulary)):
+        if len(topics) >= max_topics:
+            break
+        if used[topic_idx]:
+            continue
+        used[topic_idx] = True
+        
+        subtopics = []
+        for candidate in np.argsort(-similarity[topic_idx], kind='stable'):
+            if len(subtopics) >= max_subtopics or similarity[topic_idx, candidate] <= 0:
+                break
+            if not used[candidate]:
+                used[candidate] = True
+                subtopics.append(vocabulary[candidate].title())
+        
+        topics.append({'label': vocabulary[topic_idx].title(), 'subtopics': subtopics})
+    
+    return {'center': vocabulary[0].title(), 'topics': topics}
+
+
+def get_mindmap_tree(text):
+    """Mind map tree for a text, falling back to keyword topics for very short input"""
+    tree = build_cooccurrence_tree(text or '')
+    if tree and tree['topics']:
+        return tree
+    return build_mindmap_tree(get_mindmap_keywords(text or ''))
+
+
+def _as_mindmap_tree(data):
+    """Accept either a mind map tree or a plain keyword list"""
+    if isinstance(data, dict):
+        return data
+    return build_mindmap_tree(list(data or []))
+
+
+def radial_layout(tree, topic_radius=1.0, subtopic_radius=2.1):
+    """
+    Deterministic radial layout in a single pass over the tree (O(n))
+    Topics split the circle into equal wedges; subtopics fan out inside their topic's wedge.
+    """
+    nodes = [{'id': 'c', 'label': tree['center'], 'level': 0, 'group': -1, 'x': 0.0, 'y': 0.0}]
+    edges = []
+    
+    topics = tree['topics']
+    wedge = 2 * math.pi / max(len(topics), 1)
+    
+    for i, topic in enumerate(topics):
+        angle = math.pi / 2 - i * wedge  # start at the top, go clockwise
+        topic_id = f't{i}'
+        nodes.append({
+            'id': topic_id, 'label': topic['label'], 'level': 1, 'group': i,
+            'x': round(topic_radius * math.cos(angle), 4),
+            'y': round(topic_radius * math.sin(angle), 4)
+        })
+        edges.append({'source': 'c', 'target': topic_id, 'level': 1})
+        
+        subtopics = topic['subtopics']
+        step = wedge * 0.8 / max(len(subtopics), 1)
+        for j, subtopic in enumerate(subtopics):
+            sub_angle = angle + (j - (len(subtopics) - 1) / 2) * step
+            sub_id = f's{i}_{j}'
+            nodes.append({
+                'id': sub_id, 'label': subtopic, 'level': 2, 'group': i,
+                'x': round(subtopic_radius * math.cos(sub_angle), 4),
+                'y': round(subtopic_radius * math.sin(sub_angle), 4)
+            })
+            edges.append({'source': topic_id, 'target': sub_id, 'level': 2})
+    
+    return {'nodes': nodes, 'edges': edges}
+
+
+def mindmap_to_json(tree):
+    """Laid-out mind map as plain data for drawing in the browser"""
+    layout = radial_layout(tree)
+    return {
+        'center': tree['center'],
+        'topics': len(tree['topics']),
+        'subtopics': sum(len(t['subtopics']) for t in tree['topics']),
+        'nodes': layout['nodes'],
+        'edges': layout['edges']
+    }
+
+
+def _svg_label(label, x, y, font_size, color):
+    """Centered SVG text, split over two lines when long"""
+    words = label.split()
+    lines = [label]
+    if len(label) > 12 and len(words) > 1:
+        mid = len(words) // 2
+        lines = [' '.join(words[:mid]), ' '.join(words[mid:])]
+    
+    first_dy = -(len(lines) - 1) * 0.6
+    spans = ''.join(
+        f'<tspan x="{x:.1f}" dy="{(first_dy if k == 0 else 1.2):.1f}em">{escape(line)}</tspan>'
+        for k, line in enumerate(lines)
+    )
+    return (f'<text x="{x:.1f}" y="{y:.1f}" font-size="{font_size}" fill="{color}" '
+            f'text-anchor="middle" dominant-baseline="central">{spans}</text>')
+
+
+def render_mindmap_svg(tree, width=1000, height=820):
+    """
+    Lightweight vector mind map: a few KB of SVG instead of a multi-megabyte PNG
+    """
+    layout = radial_layout(tree)
+    scale = min(width, height) / 2 / 2.6
+    cx, cy = width / 2, height / 2 + 20
+    points = {n['id']: (cx + n['x'] * scale, cy - n['y'] * scale) for n in layout['nodes']}
+    
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+        f'font-family="sans-serif" font-weight="bold">',
+        f'<rect x="4" y="4" width="{width - 8}" height="{height - 8}" rx="24" '
+        f'fill="#E8D5F2" stroke="#C4A7D7" stroke-width="5"/>',
+        f'<text x="{width / 2:.1f}" y="44" font-size="26" fill="#2C2C54" text-anchor="middle">'
+        f'Detailed Mind Map: {len(tree["topics"])} Main Topics</text>'
+    ]
+    
+    for edge in layout['edges']:
+        x1, y1 = points[edge['source']]
+        x2, y2 = points[edge['target']]
+        mx, my = (x1 + x2) / 2, (y1 + y2) / 2 - 15
+        color, width_, alpha = ('#5DBAA4', 5, 0.8) if edge['level'] == 1 else ('#C4A7D7', 3, 0.6)
+        parts.append(
+            f'<path d="M{x1:.1f} {y1:.1f} Q{mx:.1f} {my:.1f} {x2:.1f} {y2:.1f}" fill="none" '
+            f'stroke="{color}" stroke-width="{width_}" stroke-opacity="{alpha}"/>'
+        )
+    
+    for node in layout['nodes']:
+        x, y = points[node['id']]
+        if node['level'] == 0:
+            radius, fill, font_size, text_color = 62, '#5DBAA4', 20, 'white'
+        elif node['level'] == 1:
+            radius, fill, font_size, text_color = 48, PASTEL_COLORS[node['group'] % len(PASTEL_COLORS)], 14, '#2C2C54'
+        else:
+            radius, fill, font_size, text_color = 34, '#FFE4E1', 10, '#2C2C54'
+        
+        parts.append(f'<circle cx="{x - 2:.1f}" cy="{y + 3:.1f}" r="{radius}" fill="gray" fill-opacity="0.25"/>')
+        parts.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="{radius}" fill="{fill}" stroke="white" stroke-width="4"/>')
+        parts.append(_svg_label(node['label'], x, y, font_size, text_color))
+    
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def get_mindmap_key(tree):
+    """Content hash that names a mind map's file"""
+    return f"mindmap_{hash_inputs('mindmap', _as_mindmap_tree(tree))}"
+
+
+def get_cached_mindmap(key):
+    """Path of an already rendered mind map, or None"""
+    return mindmap_service.store.lookup(key)
+
+
+def render_mindmap_cached(tree):
+    """Render a mind map once per distinct tree and return its path"""
+    tree = _as_mindmap_tree(tree)
+    return mindmap_service.get_or_render(
+        get_mindmap_key(tree),
+        lambda output_path: create_mindmap(tree, output_path=output_path)
+    )
+
+
+def create_mindmap(keywords, output_path=None):
+    """
+    Create a DETAILED mind map with main topics, subtopics, and connections
+    Features: 3 levels (Center -> Main Topics -> Subtopics), curved edges, shadows, legend
+    
+    Args:
+        keywords: list of main topics, or a tree from build_mindmap_tree / build_cooccurrence_tree
+    """
+    tree = _as_mindmap_tree(keywords)
+    
     # Create graph
     G = nx.Graph()
-    center = "Main\nTopic"
+    center = tree['center'].replace(' ', '\n')
+    G.add_node(center)
     
-    # Add main branches (keywords) - LEVEL 1
+    # Add main branches (topics) - LEVEL 1
     main_topics = []
-    for i, word in enumerate(keywords[:6]):  # Limit to 6 main topics
-        if word and word.strip():
-            main_topics.append(word)
-            G.add_edge(center, word)
+    for topic in tree['topics']:
+        main_topics.append(topic['label'])
+        G.add_edge(center, topic['label'])
     
     # Add SUBTOPICS for each main topic - LEVEL 2 (THIS MAKES IT DETAILED!)
-    subtopics_map = {
-        0: ['Definition', 'Examples', 'Benefits'],
-        1: ['Methods', 'Tools', 'Resources'],
-        2: ['Practice', 'Theory', 'Application'],
-        3: ['Key Points', 'Summary', 'Overview'],
-        4: ['Details', 'Analysis', 'Insights'],
-        5: ['Concepts', 'Ideas', 'Principles']
-    }
-    
-    for i, main_topic in enumerate(main_topics):
-        # Add 3 subtopics for each main topic
-        subtopics = subtopics_map.get(i, ['Detail 1', 'Detail 2', 'Detail 3'])
-        for j, subtopic in enumerate(subtopics[:3]):
-            subtopic_name = f"{subtopic}"
-            G.add_edge(main_topic, subtopic_name)
+    for topic in tree['topics']:
+        for subtopic in topic['subtopics']:
+            G.add_edge(topic['label'], subtopic)
     
     # Create figure - LARGER for more details
-    fig, ax = plt.subplots(figsize=(20, 16), facecolor='#E8D5F2')
+    fig = Figure(figsize=(20, 16), facecolor='#E8D5F2')
+    ax = fig.subplots()
     ax.set_facecolor('#E8D5F2')
     
     # Spring layout with MORE spacing
@@ -213,7 +489,7 @@ def create_mindmap(keywords):
     total_edges = G.number_of_edges()
     subtopics_count = total_nodes - len(main_topics) - 1
     
-    plt.title(
+    ax.set_title(
         f'🧠 Detailed Mind Map\n{len(main_topics)} Main Topics • {subtopics_count} Subtopics', 
         fontsize=30, 
         fontweight='bold', 
@@ -256,10 +532,11 @@ def create_mindmap(keywords):
     ax.set_ylim(-3.5, 3.5)
     
     # Save with VERY high quality
-    output_path = os.path.join('static', 'images', 'mindmap.png')
+    if not output_path:
+        output_path = os.path.join('static', 'images', 'mindmap.png')
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
-    plt.savefig(
+    fig.savefig(
         output_path, 
         bbox_inches='tight', 
         dpi=250,  # VERY HIGH DPI
@@ -267,9 +544,8 @@ def create_mindmap(keywords):
         edgecolor='none',
         pad_inches=0.5
     )
-    plt.close()
     
-    print(f"✅ DETAILED mind map created: {total_nodes} nodes, {total_edges} connections, {subtopics_count} subtopics")
+    logger.debug("✅ DETAILED mind map created: %d nodes, %d connections, %d subtopics", total_nodes, total_edges, subtopics_count)
     return output_path
 
 
@@ -277,6 +553,8 @@ def create_simple_mindmap(keywords):
     """
     Alternative simple version with circular layout and enhanced styling
     """
+    if isinstance(keywords, dict):
+        keywords = [topic['label'] for topic in keywords['topics']]
     if not keywords or len(keywords) == 0:
         keywords = ['Learning', 'Knowledge', 'Education']
     
@@ -287,7 +565,8 @@ def create_simple_mindmap(keywords):
         if word and word.strip():
             G.add_edge(center, word)
     
-    fig, ax = plt.subplots(figsize=(12, 9), facecolor='#E8D5F2')
+    fig = Figure(figsize=(12, 9), facecolor='#E8D5F2')
+    ax = fig.subplots()
     ax.set_facecolor('#E8D5F2')
     
     # Circular layout
@@ -329,7 +608,7 @@ def create_simple_mindmap(keywords):
     )
     
     ax.axis('off')
-    plt.title(
+    ax.set_title(
         '🧠 Mind Map - Circular View', 
         fontsize=22, 
         fontweight='bold', 
@@ -340,13 +619,12 @@ def create_simple_mindmap(keywords):
     output_path = os.path.join('static', 'images', 'mindmap.png')
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
-    plt.savefig(
+    fig.savefig(
         output_path, 
         bbox_inches='tight', 
         dpi=180, 
         facecolor='#E8D5F2'
     )
-    plt.close()
     
     return output_path
 
@@ -355,6 +633,8 @@ def create_hierarchical_mindmap(keywords):
     """
     Hierarchical tree-style mind map with enhanced visuals
     """
+    if isinstance(keywords, dict):
+        keywords = [topic['label'] for topic in keywords['topics']]
     if not keywords or len(keywords) == 0:
         keywords = ['Learning', 'Knowledge', 'Education']
     
@@ -365,7 +645,8 @@ def create_hierarchical_mindmap(keywords):
         if word and word.strip():
             G.add_edge(center, word)
     
-    fig, ax = plt.subplots(figsize=(16, 12), facecolor='#E8D5F2')
+    fig = Figure(figsize=(16, 12), facecolor='#E8D5F2')
+    ax = fig.subplots()
     ax.set_facecolor('#E8D5F2')
     
     # Tree layout
@@ -443,7 +724,7 @@ def create_hierarchical_mindmap(keywords):
             family='sans-serif'
         )
     
-    plt.title(
+    ax.set_title(
         '🌳 Hierarchical Mind Map', 
         fontsize=28, 
         fontweight='bold', 
@@ -458,13 +739,12 @@ def create_hierarchical_mindmap(keywords):
     output_path = os.path.join('static', 'images', 'mindmap_hierarchical.png')
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
-    plt.savefig(
+    fig.savefig(
         output_path, 
         bbox_inches='tight', 
         dpi=200, 
         facecolor='#E8D5F2'
     )
-    plt.close()
     
-    print(f"✅ Hierarchical mind map created: {output_path}")
+    logger.debug("✅ Hierarchical mind map created: %s", output_path)
     return output_path
\ No newline at end of file